@@ -0,0 +1,5 @@
+import os
+
+# Benchmarks run offline and ingest nothing they chunk, so token counts may be
+# estimated when the cl100k_base BPE file cannot be downloaded
+os.environ.setdefault("TOKENIZER_FALLBACK", "estimate")
@@ -0,0 +1,137 @@
+"""Benchmark the chunk builder on a synthetic multi-million-row TSV.
+
+Modes, each run in its own subprocess so peak RSS is measured in isolation:
+
+  legacy     read the whole file, group with iterrows() (the original builder)
+  vectorized read the whole file, create_moon_chunks with groupby string joins
+  streaming  iter_moon_chunks + iter_chunks_for_embedding, block by block
+
+Every mode consumes the resulting records one at a time without keeping
+them, the way the upsert pipeline does. ``--stage build`` stops at the
+per-moon MoonChunk records so the builder can be timed without the
+embedding splitter; ``--stage full`` (the default) includes it.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_chunking --rows 2000000
+    python -m benchmarks.bench_chunking --rows 200000 --modes legacy vectorized streaming
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("legacy", "vectorized", "streaming")
+
+WORDS = (
+    "ice ocean crater volcano plume magnetic field orbit resonance tidal heating "
+    "surface mission flyby spacecraft spectrometer sulfur silicate water vapor "
+    "aurora radiation belt subsurface crust mantle core density albedo"
+).split()
+
+
+def write_synthetic_tsv(path: str, rows: int, moons: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    moon_names = [f"Moon {i}" for i in range(moons)]
+    with open(path, "w") as f:
+        f.write("Moon Name\tDocument Title\tDocument Content\tSource URL\n")
+        for i in range(rows):
+            moon = moon_names[rng.randrange(moons)]
+            title = " ".join(rng.choices(WORDS, k=4)).title()
+            content = " ".join(rng.choices(WORDS, k=25))
+            f.write(f"{moon}\t{title} {i}\t{content}\thttps://example.org/{moon.replace(' ', '-').lower()}\n")
+
+
+def legacy_create_moon_chunks(df):
+    """The original row-by-row builder, kept here as the baseline."""
+    from src.chunk import MoonChunk
+
+    moon_chunks = []
+    for moon_name, group in df.groupby('Moon Name'):
+        combined_content = []
+        for _, row in group.iterrows():
+            combined_content.append(f"{row['Document Title']}:\n{row['Document Content']}")
+        content = f"# {moon_name}\n\n" + "\n\n".join(combined_content)
+        metadata = {
+            "moon_name": moon_name,
+            "document_count": len(group),
+            "source_urls": group['Source URL'].unique().tolist()
+        }
+        moon_chunks.append(MoonChunk(moon_name=moon_name, content=content,
+                                     metadata=metadata, source_url=group['Source URL'].iloc[0]))
+    return moon_chunks
+
+
+def run_mode(mode: str, path: str, rows_per_block: int, stage: str) -> dict:
+    from src.chunk import (
+        read_moons_data, create_moon_chunks, iter_moon_chunks, iter_chunks_for_embedding
+    )
+
+    start = time.perf_counter()
+    if mode == "legacy":
+        records = legacy_create_moon_chunks(read_moons_data(path))
+    elif mode == "vectorized":
+        records = create_moon_chunks(read_moons_data(path))
+    else:
+        records = iter_moon_chunks(path, rows_per_block=rows_per_block)
+
+    if stage == "full":
+        records = (record["text"] for record in iter_chunks_for_embedding(records))
+    else:
+        records = (record.content for record in records)
+
+    count = 0
+    characters = 0
+    for text in records:
+        count += 1
+        characters += len(text)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mib = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return {"mode": mode, "seconds": elapsed, "records": count, "characters": characters, "peak_rss_mib": peak_mib}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--moons", type=int, default=80)
+    parser.add_argument("--rows-per-block", type=int, default=100_000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=["vectorized", "streaming"])
+    parser.add_argument("--stage", choices=["build", "full"], default="full")
+    parser.add_argument("--file", help="use an existing TSV instead of generating one")
+    parser.add_argument("--run-mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args.run_mode, args.file, args.rows_per_block, args.stage)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if not path:
+            path = os.path.join(tmp, "synthetic_moons.tsv")
+            start = time.perf_counter()
+            write_synthetic_tsv(path, args.rows, args.moons)
+            print(f"Generated {args.rows:,} rows ({os.path.getsize(path) / 2**20:.0f} MiB) "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'mode':>10} {'seconds':>8} {'records':>8} {'peak RSS MiB':>13}")
+        for mode in args.modes:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_chunking", "--run-mode", mode,
+                 "--file", path, "--rows-per-block", str(args.rows_per_block), "--stage", args.stage],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['mode']:>10} {result['seconds']:>8.2f} {result['records']:>8} {result['peak_rss_mib']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Cold vs. warm run of the persistent embedding cache.
+
+Embeds every chunk of jupiter_moons.tsv plus a set of repeated questions
+through CachedEmbeddings twice, against a fresh SQLite file. The first (cold)
+run pays for every text; the second (warm) run, as a re-ingestion in a new
+process would, should make zero upstream calls.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_embedding_cache --latency 0.2
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.embedding_cache import CachedEmbeddings
+
+from .fakes import FakeEmbeddings, load_moon_documents
+
+QUESTIONS = [
+    "How big is Ganymede?",
+    "Does Europa have an ocean?",
+    "Why is Io volcanically active?",
+    "What is Callisto's surface like?",
+]
+
+
+def run(cache_path: str, texts, latency: float, batch_size: int) -> dict:
+    upstream = FakeEmbeddings(dimension=1536, latency=latency)
+    embeddings = CachedEmbeddings(upstream, cache_path=cache_path, model_name="fake-ada-002")
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        embeddings.embed_documents(texts[i:i + batch_size])
+    for question in QUESTIONS * 5:
+        embeddings.embed_query(question)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": elapsed,
+        "upstream_calls": upstream.calls,
+        "texts_embedded_upstream": upstream.texts_embedded,
+        **embeddings.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake embedding call")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    texts = [doc.page_content for doc in load_moon_documents()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "embedding_cache.sqlite")
+        for label in ("cold", "warm"):
+            result = run(cache_path, texts, args.latency, args.batch_size)
+            print(
+                f"{label}: {result['seconds']:.3f}s, {result['upstream_calls']} upstream calls, "
+                f"{result['texts_embedded_upstream']} texts embedded upstream, "
+                f"{result['hits']} hits / {result['misses']} misses, {result['entries']} cached vectors"
+            )
+        # Count the write-ahead log too; it holds rows not yet checkpointed
+        size = sum(
+            os.path.getsize(path) for path in (cache_path, cache_path + "-wal")
+            if os.path.exists(path)
+        )
+        print(f"Cache size on disk: {size / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Throughput of the ingestion pipeline against fake embedding and index services.
+
+Compares the original strictly sequential loop (embed 100, wait, upsert,
+repeat) with pipeline.run_pipeline at several worker counts, optionally with
+an emulated embedding rate limit to exercise backoff and adaptive batching.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_ingestion --chunks 5000
+    python -m benchmarks.bench_ingestion --chunks 5000 --rate-limit 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+from .fakes import FakeEmbeddings, FakeIndex
+
+# The ingestion scripts use flat imports, as when run from backend/src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pipeline import AdaptiveBatchSize, run_pipeline  # noqa: E402
+
+
+def synthetic_chunks(count: int):
+    for i in range(count):
+        text = f"# Moon {i % 80}\nSynthetic document {i} about ice, orbits and magnetic fields."
+        yield {
+            "id": f"moon-{i % 80}-{i}",
+            "text": text,
+            "metadata": {"moon_name": f"Moon {i % 80}", "content_hash": str(i)},
+            "source_url": "https://example.org",
+        }
+
+
+def sequential(chunks, embeddings, index, batch_size: int = 100) -> float:
+    """The pre-pipeline loop from embeddings.upsert_documents."""
+    chunks = list(chunks)
+    start = time.perf_counter()
+    for i in range(0, len(chunks), batch_size):
+        batch = chunks[i:i + batch_size]
+        vectors = embeddings.embed_documents([chunk["text"] for chunk in batch])
+        index.upsert(vectors=[
+            {"id": chunk["id"], "values": vector, "metadata": chunk["metadata"]}
+            for chunk, vector in zip(batch, vectors)
+        ])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--embed-latency", type=float, default=0.3, help="seconds per fake embedding call")
+    parser.add_argument("--upsert-latency", type=float, default=0.1, help="seconds per fake upsert call")
+    parser.add_argument("--rate-limit", type=float, help="fake embedding limit in texts per second")
+    parser.add_argument("--workers", nargs="+", default=["1x1", "2x1", "4x2", "8x4"],
+                        help="embed x upsert worker combinations to try")
+    args = parser.parse_args()
+
+    def services():
+        return (
+            FakeEmbeddings(dimension=64, latency=args.embed_latency, max_texts_per_second=args.rate_limit),
+            FakeIndex(latency=args.upsert_latency),
+        )
+
+    print(f"{'mode':>12} {'seconds':>8} {'chunks/s':>9} {'retries':>8} {'final batch':>11}")
+
+    if not args.rate_limit:
+        # The old loop has no retry logic, so it cannot run against a rate limit
+        embeddings, index = services()
+        elapsed = sequential(synthetic_chunks(args.chunks), embeddings, index)
+        print(f"{'sequential':>12} {elapsed:>8.2f} {args.chunks / elapsed:>9.1f} {'-':>8} {100:>11}")
+
+    for combo in args.workers:
+        embed_workers, upsert_workers = (int(n) for n in combo.split("x"))
+        embeddings, index = services()
+        report = run_pipeline(
+            synthetic_chunks(args.chunks), embeddings, index,
+            embed_workers=embed_workers, upsert_workers=upsert_workers,
+            batch_size=AdaptiveBatchSize(initial=100, maximum=500),
+            max_retries=20
+        )
+        print(f"{'pipeline ' + combo:>12} {report.seconds:>8.2f} {report.chunks_per_second:>9.1f} "
+              f"{report.retries:>8} {report.final_batch_size:>11}")
+
+
+if __name__ == "__main__":
+    main()
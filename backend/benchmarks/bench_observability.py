@@ -0,0 +1,83 @@
+"""Request latency with batched Galileo export versus the old inline upload.
+
+Sends sequential /chat requests through the API with a fake Galileo client
+whose every upload takes ``--upload-latency`` seconds. "inline" reproduces
+the previous behaviour by uploading each interaction before returning;
+"batched" is the current path through the background exporter. A final
+phase makes the fake Galileo unreachable to check that requests keep
+succeeding while the exporter retries and drops.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_observability --requests 50 --upload-latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from .fakes import FakeObserveWorkflows, install_fake_chain
+
+
+async def run_requests(api, count: int, inline: bool) -> dict:
+    transport = httpx.ASGITransport(app=api.app)
+    latencies = []
+    statuses = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for i in range(count):
+            question = f"What is the surface of Europa like? ({i}, {time.time()})"
+            start = time.perf_counter()
+            response = await client.post("/chat", json={"question": question, "messages": []})
+            if inline:
+                # What process_interaction used to do on the request path
+                api.observer._upload_batch([{
+                    "question": question, "context": [], "answer": "", "messages": "", "message_count": 0
+                }])
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return {
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--upload-latency", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GALILEO_EXPORT_BATCH_SIZE", "20")
+    os.environ.setdefault("GALILEO_EXPORT_INTERVAL_SECONDS", "1")
+    os.environ["SEMANTIC_CACHE_MAX_SIZE"] = "0"
+    FakeObserveWorkflows.upload_latency = args.upload_latency
+    api = install_fake_chain(llm_latency=args.llm_latency, retriever_latency=0.0)
+
+    print(f"{'mode':>12} {'mean ms':>8} {'max ms':>8} statuses")
+    for mode in ("inline", "batched"):
+        # Inline uploads replace the exporter rather than adding to it
+        api.galileo_enabled = mode == "batched"
+        FakeObserveWorkflows.uploads.clear()
+        result = asyncio.run(run_requests(api, args.requests, inline=mode == "inline"))
+        print(f"{mode:>12} {result['mean_ms']:>8.1f} {result['max_ms']:>8.1f} {result['statuses']}")
+    api.observer.flush()
+    print(f"{'':>12} batched upload sizes: {FakeObserveWorkflows.uploads}")
+    FakeObserveWorkflows.uploads.clear()
+
+    FakeObserveWorkflows.unreachable = True
+    result = asyncio.run(run_requests(api, args.requests, inline=False))
+    print(f"{'unreachable':>12} {result['mean_ms']:>8.1f} {result['max_ms']:>8.1f} {result['statuses']}")
+
+    FakeObserveWorkflows.unreachable = False
+    api.observer.shutdown()
+    print(f"{'':>12} upload sizes after recovery: {FakeObserveWorkflows.uploads}")
+    print(f"exporter: {api.observer.exporter.stats()}")
+
+
+if __name__ == "__main__":
+    main()
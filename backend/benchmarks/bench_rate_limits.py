@@ -0,0 +1,161 @@
+"""Behaviour of /chat when the chat model's rate limit is the bottleneck.
+
+Starts ``benchmarks.fake_openai`` with a small requests- and tokens-per-minute
+quota, then fires a burst of questions at the API, whose chain uses a real
+ChatOpenAI pointed at the fake server (retrieval and embeddings stay local
+fakes). It runs once with UPSTREAM_RATE_LIMITING=off and once with it on,
+each in its own process. It reports:
+
+  ok       answers, with p50/p95 latency
+  shed     503s with Retry-After: requests the rate limit or the queue
+           would have held past CHAT_LATENCY_SLO_SECONDS (``--slo``), plus
+           any still throttled after the SDK's retries
+  failed   any other status
+  429s     throttled responses the fake server sent
+
+Without the limiter, the burst reaches OpenAI at once and comes back as
+429s that the SDK retries with its own backoff. With it, requests are paced
+to the quota the response headers report, and those that cannot be answered
+in time are turned away straight away.
+
+Run from the backend directory (needs uvicorn):
+
+    python -m benchmarks.bench_rate_limits --requests 60 --concurrency 20 --rpm 60 --tpm 40000
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .bench_workers import BACKEND_DIR, free_port
+from .suite import percentile
+
+
+def start_fake_openai(port: int, args) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        FAKE_OPENAI_RPM=str(args.rpm),
+        FAKE_OPENAI_TPM=str(args.tpm),
+        FAKE_OPENAI_LATENCY=str(args.upstream_latency),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_openai:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/stats", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Fake OpenAI server did not start within {timeout:.0f}s")
+
+
+def run_mode(args) -> dict:
+    """One burst against the API in this process, with the limiter as set in the environment."""
+    from src.clients import CHAT_MODEL, chat_model
+
+    from .fakes import install_fake_chain
+
+    llm = chat_model(model_name=CHAT_MODEL, base_url=f"{args.base_url}/v1", api_key="fake")
+    api = install_fake_chain(retriever_latency=0.01, llm=llm)
+    transport = httpx.ASGITransport(app=api.app)
+    latencies, statuses = [], {}
+
+    async def burst():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            async def one(i: int):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/chat", json={"question": f"How big is Ganymede? ({i})"})
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(args.requests)))
+            return time.perf_counter() - start
+
+    seconds = asyncio.run(burst())
+    latencies.sort()
+    return {
+        "seconds": seconds,
+        "ok": statuses.get(200, 0),
+        "shed": statuses.get(503, 0),
+        "failed": sum(count for status, count in statuses.items() if status not in (200, 503)),
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight from the client")
+    parser.add_argument("--rpm", type=float, default=60, help="fake OpenAI requests per minute")
+    parser.add_argument("--tpm", type=float, default=40000, help="fake OpenAI tokens per minute")
+    parser.add_argument("--upstream-latency", type=float, default=0.2, help="seconds per fake completion")
+    parser.add_argument("--slo", type=float, default=10, help="CHAT_LATENCY_SLO_SECONDS for the API")
+    parser.add_argument("--max-retries", type=int, default=2, help="OPENAI_MAX_RETRIES for the SDK")
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--run-mode", choices=["on", "off"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args)))
+        return
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    upstream = start_fake_openai(port, args)
+    try:
+        wait_until_up(base_url)
+        print(f"Fake OpenAI: {args.rpm:.0f} requests and {args.tpm:.0f} tokens per minute; "
+              f"{args.requests} questions, {args.concurrency} at a time, SLO {args.slo:.0f}s")
+        print(f"{'limiter':>7} {'seconds':>8} {'ok':>4} {'shed':>5} {'failed':>6} {'429s':>5} "
+              f"{'p50 ms':>8} {'p95 ms':>8}")
+        for mode in ("off", "on"):
+            httpx.post(f"{base_url}/reset")
+            env = dict(
+                os.environ,
+                UPSTREAM_RATE_LIMITING=mode,
+                CHAT_LATENCY_SLO_SECONDS=str(args.slo),
+                OPENAI_MAX_RETRIES=str(args.max_retries),
+                # Every question must reach the model
+                SEMANTIC_CACHE_MAX_SIZE="0",
+                CHAT_COALESCING="off",
+                CHAT_MAX_CONCURRENCY=str(args.concurrency),
+                CHAT_MAX_QUEUE=str(args.requests),
+            )
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_rate_limits", *sys.argv[1:],
+                 "--base-url", base_url, "--run-mode", mode],
+                cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            throttled = httpx.get(f"{base_url}/stats").json()["throttled"]
+            p50 = f"{result['p50_ms']:>8.0f}" if result["p50_ms"] is not None else f"{'-':>8}"
+            p95 = f"{result['p95_ms']:>8.0f}" if result["p95_ms"] is not None else f"{'-':>8}"
+            print(f"{mode:>7} {result['seconds']:>8.1f} {result['ok']:>4} {result['shed']:>5} "
+                  f"{result['failed']:>6} {throttled:>5} {p50} {p95}")
+    finally:
+        upstream.send_signal(signal.SIGTERM)
+        upstream.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
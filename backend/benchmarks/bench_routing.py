@@ -0,0 +1,100 @@
+"""Retrieval recall, latency and context size with and without moon-name routing.
+
+Builds a LocalVectorStore from the chunks of jupiter_moons.tsv and asks one
+question per TSV row, naming the row's moon. Each question is retrieved
+twice: unrouted (plain top 4 over every moon) and routed (MoonRouter's
+filter and k). Reported per mode:
+
+  hit rate   questions where at least one chunk of the named moon came back
+  precision  share of retrieved chunks that belong to the named moon
+  tokens     mean context tokens handed to the prompt per question
+  latency    mean and p95 retrieval time, router included
+
+``--replicas`` adds noisy copies of every chunk to emulate a larger index.
+Embeddings are the deterministic fakes with no latency, so the timings are
+search plus routing only.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_routing --replicas 50
+"""
+import argparse
+import csv
+import statistics
+import time
+
+from src.local_index import LocalVectorStore
+from src.routing import DEFAULT_MOONS_PATH, MoonRouter, RoutedRetriever
+from src.tokens import count_tokens
+
+from .fakes import FakeEmbeddings, load_moon_documents
+
+
+def load_questions(file_path: str = DEFAULT_MOONS_PATH):
+    with open(file_path, newline="", encoding="utf-8") as f:
+        return [
+            (f"{row['Document Title']}: what does this tell us about {row['Moon Name']}?", row["Moon Name"])
+            for row in csv.DictReader(f, delimiter="\t")
+        ]
+
+
+def build_store(replicas: int) -> LocalVectorStore:
+    documents = load_moon_documents()
+    texts, metadatas, ids = [], [], []
+    for copy in range(replicas):
+        for i, doc in enumerate(documents):
+            # Copies past the first get a distinct suffix so their vectors differ
+            texts.append(doc.page_content if copy == 0 else f"{doc.page_content}\nrevision {copy}")
+            metadatas.append(doc.metadata)
+            ids.append(f"{i}-{copy}")
+    return LocalVectorStore.from_texts(texts, FakeEmbeddings(dimension=1536, latency=0), metadatas=metadatas, ids=ids)
+
+
+def run(retriever, questions) -> dict:
+    hits, precisions, tokens, latencies = 0, [], [], []
+    for question, moon in questions:
+        start = time.perf_counter()
+        documents = retriever.invoke(question)
+        latencies.append(time.perf_counter() - start)
+
+        relevant = sum(1 for doc in documents if doc.metadata.get("moon_name") == moon)
+        hits += relevant > 0
+        precisions.append(relevant / len(documents) if documents else 0.0)
+        tokens.append(sum(count_tokens(doc.page_content) for doc in documents))
+
+    latencies.sort()
+    return {
+        "hit_rate": hits / len(questions),
+        "precision": statistics.mean(precisions),
+        "tokens": statistics.mean(tokens),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=1, help="copies of every chunk in the index")
+    parser.add_argument("--k", type=int, default=4, help="unrouted top k, also the router's default")
+    args = parser.parse_args()
+
+    store = build_store(args.replicas)
+    questions = load_questions()
+    router = MoonRouter.from_tsv(default_k=args.k)
+    retrievers = {
+        "unrouted": store.as_retriever(search_kwargs={"k": args.k}),
+        "routed": RoutedRetriever(vector_store=store, router=router),
+    }
+
+    print(f"{len(store)} vectors, {len(questions)} questions")
+    print(f"{'mode':>9} {'hit rate':>9} {'precision':>10} {'tokens':>7} {'mean ms':>8} {'p95 ms':>7}")
+    for label, retriever in retrievers.items():
+        result = run(retriever, questions)
+        print(
+            f"{label:>9} {result['hit_rate']:>9.1%} {result['precision']:>10.1%} {result['tokens']:>7.0f} "
+            f"{result['mean_ms']:>8.3f} {result['p95_ms']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
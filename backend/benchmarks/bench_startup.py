@@ -0,0 +1,106 @@
+"""Import time and time to liveness/readiness for the API server.
+
+Modes, each in a fresh interpreter so module caches do not carry over:
+
+  eager  what importing the API used to do: import the chatbot module and
+         build embeddings and chain before the app object exists
+  lazy   import src.api, start the app's lifespan, then poll /health/live
+         and /health/ready until each answers 200
+
+Both use VECTOR_BACKEND=local with a small generated index and no Galileo
+key, so the real initialisation code runs offline. Times are measured from
+the first import, excluding interpreter start-up.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("eager", "lazy")
+HEAVY_MODULES = ("langchain", "langchain_openai", "langchain_pinecone", "pinecone", "galileo_observe", "pandas")
+
+
+def build_index(path: str) -> None:
+    from .fakes import FakeEmbeddings
+    from src.local_index import LocalVectorStore
+
+    texts = [f"Moon {i} has a thin atmosphere and an icy crust." for i in range(200)]
+    LocalVectorStore.from_texts(texts, FakeEmbeddings(dimension=1536)).save(path)
+
+
+def heavy_modules_loaded() -> list:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def run_mode(mode: str) -> dict:
+    start = time.perf_counter()
+
+    if mode == "eager":
+        from src import chatbot
+        imported = time.perf_counter() - start
+        chatbot.init_chatbot(chatbot.init_query_embeddings())
+        ready = time.perf_counter() - start
+        return {"mode": mode, "import": imported, "live": ready, "ready": ready, "heavy": heavy_modules_loaded()}
+
+    from src import api
+    imported = time.perf_counter() - start
+    heavy = heavy_modules_loaded()
+
+    from fastapi.testclient import TestClient
+
+    live = None
+    with TestClient(api.app) as client:
+        while True:
+            if live is None and client.get("/health/live").status_code == 200:
+                live = time.perf_counter() - start
+            if client.get("/health/ready").status_code == 200:
+                ready = time.perf_counter() - start
+                break
+            time.sleep(0.05)
+    return {"mode": mode, "import": imported, "live": live, "ready": ready, "heavy": heavy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--run-mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args.run_mode)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "local_index")
+        build_index(index_path)
+        env = {
+            **os.environ,
+            "VECTOR_BACKEND": "local",
+            "LOCAL_INDEX_PATH": index_path,
+            "EMBEDDING_CACHE_PATH": os.path.join(tmp, "embedding_cache.sqlite"),
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "fake"),
+            "GALILEO_API_KEY": "",
+        }
+
+        print(f"{'mode':>6} {'import s':>9} {'live s':>7} {'ready s':>8}  heavy modules loaded by import")
+        for mode in args.modes:
+            for _ in range(args.repeat):
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_startup", "--run-mode", mode],
+                    check=True, capture_output=True, text=True, env=env
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"{result['mode']:>6} {result['import']:>9.2f} {result['live']:>7.2f} "
+                      f"{result['ready']:>8.2f}  {', '.join(result['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Throughput of the multi-worker deployment against the number of workers.
+
+For each worker count, starts gunicorn with ``gunicorn.conf.py`` (so
+SHARED_STATE=sqlite: answer cache, sessions and batch slots in SQLite and
+lock files under a temporary directory) serving the API with the fake LLM
+and retriever, waits until the workers report ready, then fires requests at
+``/chat`` over real HTTP and reports requests per second and latency.
+
+The fake model only sleeps, so a single worker already overlaps the waits;
+what extra workers buy is the per-request CPU work (routing, prompt
+building, compression, JSON and SQLite) running on more than one core.
+Lower ``--llm-latency`` to make that work dominate. The answer cache is off
+unless ``--cache`` is given, so every request runs the chain.
+
+Run from the backend directory (needs gunicorn):
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --requests 400 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, state_dir: str, args) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        SHARED_STATE="sqlite",
+        SHARED_STATE_DIR=state_dir,
+        CONVERSATION_DB_PATH=os.path.join(state_dir, "conversations.sqlite"),
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}",
+        # Measure the workers, not the per-worker admission limits
+        CHAT_MAX_CONCURRENCY="1000",
+        CHAT_MAX_QUEUE="1000",
+        SEMANTIC_CACHE_MAX_SIZE="1000" if args.cache else "0",
+        FAKE_LLM_LATENCY=str(args.llm_latency),
+        FAKE_RETRIEVER_LATENCY=str(args.retriever_latency),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning",
+         "benchmarks.fake_server:app"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+def wait_until_ready(base_url: str, workers: int, timeout: float = 60.0) -> int:
+    """Poll readiness on fresh connections until every worker has answered 200.
+
+    Returns how many distinct workers were seen ready.
+    """
+    ready_pids = set()
+    deadline = time.monotonic() + timeout
+    while len(ready_pids) < workers and time.monotonic() < deadline:
+        try:
+            response = httpx.get(f"{base_url}/health/ready", timeout=5)
+            if response.status_code == 200:
+                ready_pids.add(response.json()["worker_pid"])
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    if not ready_pids:
+        raise RuntimeError(f"No worker became ready within {timeout:.0f}s")
+    return len(ready_pids)
+
+
+async def run_load(base_url: str, total: int, concurrency: int) -> dict:
+    statuses = {}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/chat", json={"question": f"How big is Ganymede? ({i})"})
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "seconds": elapsed,
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=400, help="requests per worker count")
+    parser.add_argument("--concurrency", type=int, default=64, help="requests in flight from the client")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake completion")
+    parser.add_argument("--retriever-latency", type=float, default=0.01, help="seconds per fake retrieval")
+    parser.add_argument("--cache", action="store_true", help="leave the shared answer cache on")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'ready':>5} {'requests':>8} {'seconds':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}  statuses")
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        with tempfile.TemporaryDirectory() as state_dir:
+            server = start_server(workers, port, state_dir, args)
+            try:
+                ready = wait_until_ready(base_url, workers)
+                # A short warm-up so first-request costs do not count
+                asyncio.run(run_load(base_url, min(args.concurrency, args.requests), args.concurrency))
+                result = asyncio.run(run_load(base_url, args.requests, args.concurrency))
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+
+        baseline = baseline or result["rps"]
+        print(
+            f"{workers:>7} {ready:>5} {args.requests:>8} {result['seconds']:>8.2f} {result['rps']:>8.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}  {result['statuses']} "
+            f"(x{result['rps'] / baseline:.2f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
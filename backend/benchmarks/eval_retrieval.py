@@ -0,0 +1,124 @@
+"""Offline retrieval evaluation: vector-only vs. BM25-only vs. hybrid (RRF) vs. reranked.
+
+Every TSV row becomes one question, its Document Title (e.g. "Volcanic
+Activity on Io"); a retrieval is a hit when a returned chunk contains that
+row's Document Content. Reported per mode: hit rate and MRR at k, and mean
+and p95 retrieval latency. The "rerank" mode over-fetches ``--overfetch``
+times k hybrid candidates and keeps the k that LocalReranker scores best,
+as the API does with RERANKING on (the rerank cache is off here).
+
+By default the vector side is a LocalVectorStore over the deterministic
+fake embeddings, which only checks the plumbing since they are themselves
+word-based. Pass ``--index`` to evaluate the real local index written by
+``python vector_store.py --backend local``; questions are then embedded with
+text-embedding-ada-002 through the embedding cache, so OPENAI_API_KEY is
+needed on the first run only.
+
+Run from the backend directory:
+
+    python -m benchmarks.eval_retrieval --k 4
+    python -m benchmarks.eval_retrieval --k 4 --index src/data/local_index
+"""
+import argparse
+import csv
+import statistics
+import time
+
+from src.bm25 import BM25Index, BM25Retriever
+from src.hybrid import HybridRetriever
+from src.local_index import LocalVectorStore
+from src.rerank import LocalReranker, RerankingRetriever
+from src.routing import DEFAULT_MOONS_PATH, MoonRouter, RoutedRetriever
+
+from .fakes import FakeEmbeddings, load_moon_documents
+
+
+def load_questions(file_path: str = DEFAULT_MOONS_PATH):
+    with open(file_path, newline="", encoding="utf-8") as f:
+        # The chunker may split long content, so match on its opening words
+        return [
+            (row["Document Title"], row["Document Content"][:60])
+            for row in csv.DictReader(f, delimiter="\t")
+        ]
+
+
+def build_vector_store(index_path: str = None) -> LocalVectorStore:
+    if index_path:
+        from src.chatbot import init_query_embeddings
+        return LocalVectorStore.load(index_path, init_query_embeddings())
+    documents = load_moon_documents()
+    return LocalVectorStore.from_texts(
+        [doc.page_content for doc in documents],
+        FakeEmbeddings(dimension=1536, latency=0),
+        metadatas=[doc.metadata for doc in documents],
+        ids=[str(i) for i in range(len(documents))]
+    )
+
+
+def evaluate(retriever, questions, k: int) -> dict:
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for question, expected in questions:
+        start = time.perf_counter()
+        documents = retriever.invoke(question)[:k]
+        latencies.append(time.perf_counter() - start)
+
+        rank = next((i for i, doc in enumerate(documents, start=1) if expected in doc.page_content), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+    latencies.sort()
+    return {
+        "hit_rate": hits / len(questions),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=4, help="documents retrieved per question")
+    parser.add_argument("--index", help="path of a local index built with real embeddings")
+    parser.add_argument("--routing", action="store_true", help="narrow both sides with MoonRouter")
+    parser.add_argument("--overfetch", type=int, default=5, help="candidates per kept document in rerank mode")
+    parser.add_argument("--lexical-weight", type=float, default=0.3, help="LocalReranker's term coverage weight")
+    args = parser.parse_args()
+
+    store = build_vector_store(args.index)
+    index = BM25Index.from_tsv()
+    router = MoonRouter.from_tsv(default_k=args.k) if args.routing else None
+
+    def hybrid(factor: int = 1) -> HybridRetriever:
+        if router is not None:
+            vector = RoutedRetriever(vector_store=store, router=router.scaled(factor))
+        else:
+            vector = store.as_retriever(search_kwargs={"k": args.k * factor})
+        lexical = BM25Retriever(index=index, k=args.k * factor, router=router.scaled(factor) if router else None)
+        return HybridRetriever(retrievers=[vector, lexical])
+
+    fused = hybrid()
+    retrievers = {
+        "vector": fused.retrievers[0],
+        "bm25": fused.retrievers[1],
+        "hybrid": fused,
+        "rerank": RerankingRetriever(
+            base_retriever=hybrid(args.overfetch),
+            reranker=LocalReranker(store.embeddings, vectors=store, lexical_weight=args.lexical_weight),
+            k=args.k,
+            router=router
+        ),
+    }
+
+    questions = load_questions()
+    print(f"{len(store)} vectors, {len(index)} BM25 documents, {len(questions)} questions, k={args.k}")
+    print(f"{'mode':>7} {'hit rate':>9} {'MRR':>6} {'mean ms':>8} {'p95 ms':>7}")
+    for label, retriever in retrievers.items():
+        result = evaluate(retriever, questions, args.k)
+        print(
+            f"{label:>7} {result['hit_rate']:>9.1%} {result['mrr']:>6.3f} "
+            f"{result['mean_ms']:>8.3f} {result['p95_ms']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
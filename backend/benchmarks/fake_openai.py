@@ -0,0 +1,185 @@
+"""A local stand-in for the OpenAI HTTP API that enforces rate limits like the real one.
+
+Serves ``/v1/chat/completions`` (plain and streamed) and ``/v1/embeddings``
+after FAKE_OPENAI_LATENCY seconds. Requests and tokens are counted per
+minute against FAKE_OPENAI_RPM and FAKE_OPENAI_TPM. Every response carries
+the x-ratelimit-* headers OpenAI sends, and a request over either limit is
+answered 429 with Retry-After. ``GET /stats`` reports what was served and
+``POST /reset`` zeroes the counters and refills the limits.
+
+Serve it and point the OpenAI clients at it:
+
+    uvicorn benchmarks.fake_openai:app --port 8100
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=fake ...
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .fakes import DEFAULT_ANSWER
+
+DIMENSION = 1536
+
+
+class Quota:
+    """A per-minute allowance refilled continuously, as OpenAI's limits behave."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.available = per_minute
+        self._updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.per_minute, self.available + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        return max(0.0, amount - self.available) * 60 / self.per_minute
+
+
+class FakeOpenAI:
+    def __init__(self, rpm: float, tpm: float, latency: float):
+        self.latency = latency
+        self.requests = Quota(rpm)
+        self.tokens = Quota(tpm)
+        self.served = 0
+        self.throttled = 0
+        self.tokens_served = 0
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: int):
+        """Charge one request and ``tokens`` tokens; return ``(ok, headers)``."""
+        with self._lock:
+            self.requests.refill()
+            self.tokens.refill()
+            wait = max(self.requests.seconds_until(1), self.tokens.seconds_until(tokens))
+            ok = wait == 0
+            if ok:
+                self.requests.available -= 1
+                self.tokens.available -= tokens
+                self.served += 1
+                self.tokens_served += tokens
+            else:
+                self.throttled += 1
+            headers = {
+                "x-ratelimit-limit-requests": str(int(self.requests.per_minute)),
+                "x-ratelimit-limit-tokens": str(int(self.tokens.per_minute)),
+                "x-ratelimit-remaining-requests": str(max(0, int(self.requests.available))),
+                "x-ratelimit-remaining-tokens": str(max(0, int(self.tokens.available))),
+                "x-ratelimit-reset-requests": f"{self.requests.seconds_until(self.requests.per_minute):.3f}s",
+                "x-ratelimit-reset-tokens": f"{self.tokens.seconds_until(self.tokens.per_minute):.3f}s",
+            }
+            if not ok:
+                headers["retry-after"] = f"{wait:.3f}"
+            return ok, headers
+
+    def stats(self) -> dict:
+        return {"served": self.served, "throttled": self.throttled, "tokens_served": self.tokens_served}
+
+
+def count_tokens(value) -> int:
+    # Token id lists count exactly; text at roughly four characters per token
+    if isinstance(value, list):
+        return sum(count_tokens(item) if not isinstance(item, int) else 1 for item in value)
+    return len(str(value)) // 4 + 1
+
+
+def fake_vector(value) -> list:
+    digest = hashlib.sha256(json.dumps(value).encode()).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(DIMENSION)]
+
+
+def rate_limited(headers: dict) -> JSONResponse:
+    return JSONResponse(status_code=429, headers=headers, content={"error": {
+        "message": "Rate limit reached (fake server)", "type": "requests", "code": "rate_limit_exceeded"
+    }})
+
+
+upstream = FakeOpenAI(
+    rpm=float(os.getenv("FAKE_OPENAI_RPM", "60")),
+    tpm=float(os.getenv("FAKE_OPENAI_TPM", "40000")),
+    latency=float(os.getenv("FAKE_OPENAI_LATENCY", "0.2"))
+)
+app = FastAPI(title="Fake OpenAI")
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt_tokens = sum(count_tokens(message.get("content") or "") for message in body.get("messages", []))
+    completion_tokens = count_tokens(DEFAULT_ANSWER)
+    ok, headers = upstream.admit(prompt_tokens + int(body.get("max_tokens") or completion_tokens))
+    if not ok:
+        return rate_limited(headers)
+    await asyncio.sleep(upstream.latency)
+
+    model = body.get("model", "gpt-4")
+    if body.get("stream"):
+        async def events():
+            for word in DEFAULT_ANSWER.split(" "):
+                chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": model, "choices": [{"index": 0, "delta": {"content": word + " "},
+                                                      "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    return JSONResponse(headers=headers, content={
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": DEFAULT_ANSWER},
+                     "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    })
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input") or []
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    tokens = sum(count_tokens(item) for item in inputs)
+    ok, headers = upstream.admit(tokens)
+    if not ok:
+        return rate_limited(headers)
+    await asyncio.sleep(upstream.latency)
+
+    data = []
+    for i, item in enumerate(inputs):
+        vector = fake_vector(item)
+        if body.get("encoding_format") == "base64":
+            # The SDK asks for base64 little-endian float32 and decodes it itself
+            vector = base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode()
+        data.append({"object": "embedding", "index": i, "embedding": vector})
+    return JSONResponse(headers=headers, content={
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "text-embedding-ada-002"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    })
+
+
+@app.get("/stats")
+async def stats():
+    return upstream.stats()
+
+
+@app.post("/reset")
+async def reset():
+    global upstream
+    upstream = FakeOpenAI(upstream.requests.per_minute, upstream.tokens.per_minute, upstream.latency)
+    return upstream.stats()
@@ -0,0 +1,18 @@
+"""The API with the fake chain installed, for benchmarks that start real server processes.
+
+Serve it like the real app, e.g. ``gunicorn -c gunicorn.conf.py
+benchmarks.fake_server:app``. Every worker imports this module and installs
+the fakes itself; FAKE_LLM_LATENCY and FAKE_RETRIEVER_LATENCY set their
+latency in seconds.
+"""
+import os
+
+from .fakes import install_fake_chain
+
+# The server runs the lifespan, which warms the components up
+api = install_fake_chain(
+    llm_latency=float(os.getenv("FAKE_LLM_LATENCY", "0.05")),
+    retriever_latency=float(os.getenv("FAKE_RETRIEVER_LATENCY", "0.01")),
+    warm=False
+)
+app = api.app
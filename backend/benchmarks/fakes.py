@@ -0,0 +1,346 @@
+"""Local stand-ins for the OpenAI and Pinecone pieces of the chat chain.
+
+They implement the same LangChain interfaces as ChatOpenAI and the Pinecone
+retriever, but answer from memory after a configurable delay, so the API can
+be exercised offline and under load without spending any API credits.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForLLMRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "data", "jupiter_moons.tsv")
+
+DEFAULT_ANSWER = (
+    "Ganymede is the largest moon in the Solar System, larger than the planet "
+    "Mercury, and the only moon known to generate its own magnetic field."
+)
+
+
+def load_moon_documents(file_path: str = DATA_PATH) -> List[Document]:
+    """Build the same documents the ingestion scripts would upsert."""
+    from src.chunk import read_moons_data, create_moon_chunks, chunk_for_embedding
+
+    df = read_moons_data(file_path)
+    chunks = chunk_for_embedding(create_moon_chunks(df))
+    return [
+        Document(page_content=chunk["text"], metadata=chunk["metadata"])
+        for chunk in chunks
+    ]
+
+
+class FakeRateLimitError(Exception):
+    """Raised by the fakes the way the OpenAI client reports HTTP 429."""
+
+    status_code = 429
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings built by hashing tokens into buckets.
+
+    Texts that share words get similar vectors, which is enough for caches and
+    retrieval code to behave realistically without calling OpenAI.
+    ``max_texts_per_second`` emulates a provider rate limit: calls that would
+    exceed it raise FakeRateLimitError instead of sleeping.
+    """
+
+    def __init__(self, dimension: int = 256, latency: float = 0.02,
+                 max_texts_per_second: Optional[float] = None):
+        self.dimension = dimension
+        self.latency = latency
+        self.max_texts_per_second = max_texts_per_second
+        self.calls = 0
+        self.texts_embedded = 0
+        self.rate_limited = 0
+        self._window_start = time.monotonic()
+        self._window_texts = 0
+        self._lock = threading.Lock()
+
+    def _admit(self, count: int) -> None:
+        with self._lock:
+            if self.max_texts_per_second:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_texts = now, 0
+                if self._window_texts + count > self.max_texts_per_second:
+                    self.rate_limited += 1
+                    raise FakeRateLimitError("rate_limit_exceeded: too many texts per second")
+                self._window_texts += count
+            self.calls += 1
+            self.texts_embedded += count
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for token in re.findall(r"\w+", text.lower()):
+            bucket = int(hashlib.md5(token.encode()).hexdigest(), 16) % self.dimension
+            vector[bucket] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._admit(len(texts))
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._admit(len(texts))
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that returns a canned answer after ``latency`` seconds."""
+
+    answer: str = DEFAULT_ANSWER
+    latency: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self) -> List[str]:
+        return [token for token in re.split(r"(\s)", self.answer) if token]
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tokens = self._tokens()
+        for token in tokens:
+            time.sleep(self.latency / len(tokens))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._tokens()
+        for token in tokens:
+            await asyncio.sleep(self.latency / len(tokens))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class FakeRetriever(BaseRetriever):
+    """Retriever that ranks in-memory documents by word overlap with the query."""
+
+    documents: List[Document]
+    k: int = 4
+    latency: float = 0.05
+
+    def _search(self, query: str) -> List[Document]:
+        terms = set(re.findall(r"\w+", query.lower()))
+        scored = sorted(
+            self.documents,
+            key=lambda doc: len(terms & set(re.findall(r"\w+", doc.page_content.lower()))),
+            reverse=True,
+        )
+        return scored[:self.k]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        time.sleep(self.latency)
+        return self._search(query)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return self._search(query)
+
+
+class FakeIndex:
+    """In-memory stand-in for a Pinecone ``Index`` with per-call latency.
+
+    Covers the subset of the data-plane API the scripts use: paginated
+    ``list``, ``fetch``, ``upsert``, ``delete`` and ``describe_index_stats``.
+    """
+
+    def __init__(self, latency: float = 0.02, page_size: int = 100):
+        self.latency = latency
+        self.page_size = page_size
+        self.namespaces: Dict[str, Dict[str, dict]] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        time.sleep(self.latency)
+
+    def list(self, namespace: str = "", prefix: Optional[str] = None):
+        self._call("list")
+        ids = sorted(
+            vector_id for vector_id in self.namespaces.get(namespace, {})
+            if prefix is None or vector_id.startswith(prefix)
+        )
+        for i in range(0, len(ids), self.page_size):
+            yield ids[i:i + self.page_size]
+
+    def fetch(self, ids: List[str], namespace: str = ""):
+        self._call("fetch")
+        stored = self.namespaces.get(namespace, {})
+        return SimpleNamespace(vectors={
+            vector_id: SimpleNamespace(id=vector_id, **stored[vector_id])
+            for vector_id in ids if vector_id in stored
+        })
+
+    def upsert(self, vectors: List[dict], namespace: str = ""):
+        self._call("upsert")
+        with self._lock:
+            stored = self.namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                stored[vector["id"]] = {
+                    "values": list(vector["values"]),
+                    "metadata": dict(vector.get("metadata") or {}),
+                }
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: str = "", delete_all: bool = False):
+        self._call("delete")
+        with self._lock:
+            stored = self.namespaces.get(namespace, {})
+            for vector_id in list(stored) if delete_all else ids:
+                stored.pop(vector_id, None)
+
+    def describe_index_stats(self):
+        self._call("describe_index_stats")
+        return {
+            "namespaces": {
+                name: {"vector_count": len(vectors)} for name, vectors in self.namespaces.items()
+            },
+            "total_vector_count": sum(len(vectors) for vectors in self.namespaces.values()),
+        }
+
+
+class FakeWorkflow:
+    def add_retriever(self, **kwargs) -> None:
+        pass
+
+    def add_llm(self, **kwargs) -> None:
+        pass
+
+    def conclude(self, **kwargs) -> None:
+        pass
+
+
+class FakeObserveWorkflows:
+    """Stands in for galileo_observe.ObserveWorkflows, whose constructor logs in to Galileo.
+
+    ``upload_workflows`` sleeps for ``upload_latency`` per call, or raises while
+    ``unreachable`` is set, and records in the class-wide ``uploads`` how many
+    workflows each upload carried.
+    """
+
+    upload_latency = 0.2
+    unreachable = False
+    uploads: List[int] = []
+
+    def __init__(self, project_name: str = ""):
+        self.project_name = project_name
+        self.workflows: List[FakeWorkflow] = []
+
+    def add_workflow(self, **kwargs) -> FakeWorkflow:
+        workflow = FakeWorkflow()
+        self.workflows.append(workflow)
+        return workflow
+
+    def upload_workflows(self) -> None:
+        time.sleep(self.upload_latency)
+        if self.unreachable:
+            raise ConnectionError("Galileo is unreachable")
+        self.uploads.append(len(self.workflows))
+        self.workflows = []
+
+
+def install_fake_chain(llm_latency: float = 0.5, retriever_latency: float = 0.05, warm: bool = True,
+                       llm: Optional[BaseChatModel] = None):
+    """Import ``src.api`` with the chain and the Galileo client swapped for the fakes.
+
+    Returns the imported api module. Must run before anything else imports it.
+    httpx's ASGITransport does not run the app's lifespan, so with ``warm``
+    the components are built here, as the lifespan would at server start.
+    ``llm`` replaces the fake chat model, e.g. with a real ChatOpenAI pointed
+    at ``benchmarks.fake_openai``.
+    """
+    for var in ("OPENAI_API_KEY", "PINECONE_API_KEY", "PINECONE_ENVIRONMENT", "GALILEO_API_KEY"):
+        os.environ.setdefault(var, "fake")
+    if llm is None:
+        # The fake chat model never reaches OpenAI, so there is no quota to pace or shed to
+        os.environ.setdefault("UPSTREAM_RATE_LIMITING", "off")
+
+    from src import chatbot
+
+    chain = chatbot.build_chain(
+        FakeRetriever(documents=load_moon_documents(), latency=retriever_latency),
+        llm or FakeChatModel(latency=llm_latency),
+    )
+    chatbot.init_chatbot = lambda embeddings=None: chain
+    chatbot.init_summarizer = lambda: chatbot.build_summarizer(
+        FakeChatModel(answer="The user asked about Jupiter's moons.", latency=llm_latency)
+    )
+    chatbot.init_query_embeddings = FakeEmbeddings
+    chatbot.ObserveWorkflows = FakeObserveWorkflows
+
+    from src import api
+    if warm:
+        asyncio.run(api.warm_up())
+    return api
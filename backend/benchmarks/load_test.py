@@ -0,0 +1,96 @@
+"""Load test for the /chat endpoint using the local fake LLM and retriever.
+
+Fires a fixed number of requests at increasing client concurrency and reports
+requests per second. With the chain running through ``ainvoke`` throughput
+should scale roughly linearly until CHAT_MAX_CONCURRENCY is reached, after
+which extra requests queue and, past CHAT_MAX_QUEUE, are rejected with 429.
+
+With ``--identical`` every request asks the same question, as in a spike of
+traffic about one news item. Concurrent copies then share one chain
+execution, and the executions and coalesced requests are printed per level.
+
+The answer cache is off so every request exercises the chain; pass
+``--answer-cache`` to leave it on and measure cached throughput instead.
+
+Run from the backend directory:
+
+    python -m benchmarks.load_test --requests 64 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from .fakes import install_fake_chain
+
+
+async def run_level(app, concurrency: int, total: int, identical: bool = False) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one(i: int):
+            async with semaphore:
+                response = await client.post("/chat", json={
+                    "question": "How big is Ganymede?" if identical else f"How big is Ganymede? ({i})",
+                    "messages": []
+                })
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "seconds": elapsed,
+        "rps": total / elapsed,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake completion")
+    parser.add_argument("--retriever-latency", type=float, default=0.05, help="seconds per fake retrieval")
+    parser.add_argument("--identical", action="store_true", help="send the same question in every request")
+    parser.add_argument("--answer-cache", action="store_true",
+                        help="keep the answer cache on; repeated levels are then answered from it")
+    args = parser.parse_args()
+
+    if not args.answer_cache:
+        # Measure the chain, not the answer cache: later levels would repeat earlier questions
+        os.environ["SEMANTIC_CACHE_MAX_SIZE"] = "0"
+
+    api = install_fake_chain(args.llm_latency, args.retriever_latency)
+    print(f"Limiter: {api.chat_limiter.stats()}")
+    print(f"{'concurrency':>11} {'requests':>8} {'seconds':>8} {'req/s':>8}  statuses")
+
+    async def run_all():
+        # One event loop for every level: the API's limiter is bound to it
+        for level in args.levels:
+            before = api.chat_flights.stats() if api.chat_flights is not None else None
+            result = await run_level(api.app, level, args.requests, args.identical)
+            line = (
+                f"{result['concurrency']:>11} {result['requests']:>8} "
+                f"{result['seconds']:>8.2f} {result['rps']:>8.2f}  {result['statuses']}"
+            )
+            if before is not None:
+                after = api.chat_flights.stats()
+                line += (
+                    f"  executions={after['executions'] - before['executions']}"
+                    f" coalesced={after['coalesced'] - before['coalesced']}"
+                )
+            print(line)
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
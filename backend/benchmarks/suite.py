@@ -0,0 +1,369 @@
+"""Benchmark suite that stores its results as JSON and flags regressions.
+
+Benchmarks, each run in its own subprocess so memory is measured in isolation:
+
+  chat       POST /chat through api.app with the fake LLM, retriever,
+             embeddings and Galileo client, at every ``--levels`` client
+             concurrency, with the ``--mix`` of questions: p50/p95/p99
+             latency, requests per second, error rate and peak RSS
+  chunks     chunk.create_moon_chunks and chunk.chunk_for_embedding on the
+             moons TSV and on a synthetic one: median and min time per call
+             and peak Python allocation
+  ingestion  pipeline.run_pipeline into the fake embedding and index
+             services: chunks per second and peak RSS
+
+The question mix is a comma-separated list of kind=weight:
+
+  unique     a question no other request asks, so every one runs the chain
+  repeated   one of a few popular questions, served by the answer cache or
+             joined to an identical in-flight request
+  followup   "Tell me more" with the session_id of an earlier answer, which
+             skips the answer cache and adds server-side history
+
+Questions are drawn with a fixed ``--seed``, so two runs send the same
+requests. With pytest-socket installed (it is in requirements.txt), the
+benchmark processes cannot open network sockets, so a code path that
+reaches a real OpenAI, Pinecone or Galileo endpoint fails loudly instead of
+skewing the numbers and spending credits.
+
+``--output`` writes the results with the git commit, Python version and
+configuration. ``--baseline`` compares against an earlier results file and
+exits with status 1 when a latency, time or memory figure grew, or a
+throughput figure fell, by more than ``--tolerance``. Run from the backend
+directory:
+
+    python -m benchmarks.suite --output bench-results/current.json
+    python -m benchmarks.suite --baseline bench-results/v1.json --tolerance 0.2
+    python -m benchmarks.suite --only chat --levels 1 8 32 --mix unique=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+BENCHMARKS = ("chat", "chunks", "ingestion")
+QUESTION_KINDS = ("unique", "repeated", "followup")
+DEFAULT_MIX = "unique=0.6,repeated=0.3,followup=0.1"
+RESULTS_FORMAT = 1
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse ``unique=0.6,repeated=0.3`` into weights that sum to 1."""
+    weights = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in QUESTION_KINDS:
+            raise argparse.ArgumentTypeError(f"unknown question kind {kind!r}, expected one of {QUESTION_KINDS}")
+        weights[kind] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("question mix weights must add up to more than 0")
+    return {kind: weight / total for kind, weight in weights.items()}
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def block_network() -> bool:
+    """Forbid TCP sockets in this process when pytest-socket is available."""
+    try:
+        from pytest_socket import disable_socket
+    except ImportError:
+        return False
+    # The event loop's self-pipe is a Unix socket pair
+    disable_socket(allow_unix_socket=True)
+    return True
+
+
+class QuestionMix:
+    """Deterministic stream of /chat request bodies following a mix of kinds."""
+
+    def __init__(self, mix: Dict[str, float], titles: List[str], seed: int = 0, popular: int = 8, tag: str = ""):
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.titles = titles
+        self.popular = titles[:popular]
+        self.sessions: List[str] = []
+        self.tag = tag
+        self._rng = random.Random(seed)
+        self._count = 0
+
+    def next(self) -> Dict:
+        self._count += 1
+        kind = self._rng.choices(self.kinds, self.weights)[0]
+        if kind == "followup" and self.sessions:
+            return {"question": "Tell me more about that.", "session_id": self._rng.choice(self.sessions)}
+        if kind == "repeated":
+            return {"question": f"What is known about {self._rng.choice(self.popular)}?"}
+        return {"question": f"What is known about {self._rng.choice(self.titles)}? ({self.tag}{self._count})"}
+
+
+async def run_chat_level(app, mix: QuestionMix, concurrency: int, total: int) -> Dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one(body: Dict):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/chat", json=body)
+                latencies.append(time.perf_counter() - start)
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+                if response.status_code == 200 and response.json().get("session_id"):
+                    mix.sessions.append(response.json()["session_id"])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(mix.next()) for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    return {
+        "requests": total,
+        "seconds": elapsed,
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "error_rate": errors / total,
+        "statuses": statuses,
+    }
+
+
+def bench_chat(args) -> Dict:
+    from .eval_retrieval import load_questions
+    from .fakes import install_fake_chain
+
+    # Measure the server, not its admission limits
+    os.environ.setdefault("CHAT_MAX_CONCURRENCY", str(max(args.levels)))
+    os.environ.setdefault("CHAT_MAX_QUEUE", str(args.requests))
+    api = install_fake_chain(args.llm_latency, args.retriever_latency)
+    titles = [title for title, _ in load_questions()]
+
+    async def run_all():
+        # One event loop for every level: the API's limiter is bound to it
+        warmup = QuestionMix(parse_mix("unique=1"), titles, seed=args.seed, tag="warmup-")
+        await run_chat_level(api.app, warmup, min(args.levels), min(args.requests, 8))
+        results = {}
+        for level in args.levels:
+            # Unique questions stay unique across levels, so none hit the answer cache
+            mix = QuestionMix(args.mix, titles, seed=args.seed, tag=f"c{level}-")
+            results[f"c{level}"] = await run_chat_level(api.app, mix, level, args.requests)
+        return results
+
+    results = asyncio.run(run_all())
+    results["peak_rss_mib"] = peak_rss_mib()
+    return results
+
+
+def timed(fn: Callable, repeat: int) -> Dict:
+    """Median and min wall time of ``fn`` over ``repeat`` calls, then one traced call for peak allocation."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "peak_alloc_mib": peak / (1024 * 1024),
+    }
+
+
+def bench_chunks(args) -> Dict:
+    from src.chunk import chunk_for_embedding, create_moon_chunks, read_moons_data
+    from src.tokens import has_encoding
+
+    from .bench_chunking import write_synthetic_tsv
+    from .fakes import DATA_PATH
+
+    results = {"tokenizer": "tiktoken" if has_encoding() else "estimate"}
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = os.path.join(tmp, "synthetic_moons.tsv")
+        write_synthetic_tsv(synthetic, args.synthetic_rows, moons=80, seed=args.seed)
+        for label, path in (("moons", DATA_PATH), ("synthetic", synthetic)):
+            df = read_moons_data(path)
+            moon_chunks = create_moon_chunks(df)
+            results[label] = {
+                "rows": len(df),
+                "create_moon_chunks": timed(lambda: create_moon_chunks(df), args.repeat),
+                "chunk_for_embedding": timed(lambda: chunk_for_embedding(moon_chunks), args.repeat),
+            }
+    return results
+
+
+def bench_ingestion(args) -> Dict:
+    from .bench_ingestion import synthetic_chunks
+    from .fakes import FakeEmbeddings, FakeIndex
+
+    from pipeline import AdaptiveBatchSize, run_pipeline
+
+    report = run_pipeline(
+        synthetic_chunks(args.chunks),
+        FakeEmbeddings(dimension=64, latency=args.embed_latency),
+        FakeIndex(latency=args.upsert_latency),
+        batch_size=AdaptiveBatchSize(initial=100, maximum=500)
+    )
+    return {
+        "chunks": report.chunks,
+        "seconds": report.seconds,
+        "chunks_per_second": report.chunks_per_second,
+        "retries": report.retries,
+        "peak_rss_mib": peak_rss_mib(),
+    }
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """``{"chat": {"c8": {"p99_ms": 1.0}}}`` -> ``{"chat.c8.p99_ms": 1.0}``, numbers only."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def direction(metric: str) -> Optional[int]:
+    """+1 when a larger value is better, -1 when smaller is better, None for plain counts."""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf in ("rps", "chunks_per_second"):
+        return 1
+    if leaf.endswith(("_ms", "_mib")) or leaf in ("seconds", "error_rate"):
+        return -1
+    return None
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Print every comparable metric and return the names of the regressed ones."""
+    before, after = flatten(baseline["benchmarks"]), flatten(current["benchmarks"])
+    regressions = []
+    print(f"\nAgainst {baseline.get('git_commit') or 'baseline'} from {baseline.get('created_at', '?')}:")
+    print(f"{'metric':<52} {'baseline':>10} {'current':>10} {'change':>8}")
+    for metric in sorted(before.keys() & after.keys()):
+        sign = direction(metric)
+        if sign is None:
+            continue
+        old, new = before[metric], after[metric]
+        change = (new - old) / old if old else 0.0
+        regressed = sign * change < -tolerance
+        # An error rate going from 0 to anything is a regression however small
+        if metric.endswith("error_rate") and old == 0 and new > 0:
+            regressed = True
+        if regressed:
+            regressions.append(metric)
+        print(f"{metric:<52} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change allowed before failing")
+    parser.add_argument("--seed", type=int, default=0)
+    chat = parser.add_argument_group("chat")
+    chat.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    chat.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32])
+    chat.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"default {DEFAULT_MIX}")
+    chat.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake completion")
+    chat.add_argument("--retriever-latency", type=float, default=0.01, help="seconds per fake retrieval")
+    chunks = parser.add_argument_group("chunks")
+    chunks.add_argument("--synthetic-rows", type=int, default=20_000)
+    chunks.add_argument("--repeat", type=int, default=5, help="timed calls per function")
+    ingestion = parser.add_argument_group("ingestion")
+    ingestion.add_argument("--chunks", type=int, default=2000)
+    ingestion.add_argument("--embed-latency", type=float, default=0.02, help="seconds per fake embedding call")
+    ingestion.add_argument("--upsert-latency", type=float, default=0.01, help="seconds per fake upsert call")
+    parser.add_argument("--run", choices=BENCHMARKS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        network_blocked = block_network()
+        # The ingestion modules use flat imports, as when run from backend/src
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+        result = {"chat": bench_chat, "chunks": bench_chunks, "ingestion": bench_ingestion}[args.run](args)
+        result["network_blocked"] = network_blocked
+        print(json.dumps(result))
+        return
+
+    results = {
+        "format": RESULTS_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("only", "output", "baseline", "tolerance", "run")},
+        "benchmarks": {},
+    }
+    for name in args.only:
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", *sys.argv[1:], "--run", name],
+            check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+        results["benchmarks"][name] = json.loads(output.strip().splitlines()[-1])
+        print(f"{name}: done in {time.perf_counter() - start:.1f}s")
+        for metric, value in flatten(results["benchmarks"][name]).items():
+            print(f"  {metric:<50} {value:>10.2f}")
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Gunicorn settings for serving the API with several worker processes.
+
+Run from the backend directory:
+
+    gunicorn -c gunicorn.conf.py src.api:app
+
+Each worker is a uvicorn event loop with its own OpenAI/Pinecone clients,
+chain and chat limiter. The answer cache, conversations, batch slots and
+OpenAI rate-limit buckets are moved into SQLite and lock files under
+SHARED_STATE_DIR so that every worker sees the same state.
+"""
+import multiprocessing
+import os
+
+# Workers inherit the master's environment, so this reaches src.api in each one
+os.environ.setdefault("SHARED_STATE", "sqlite")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count(), 4))))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app in each worker after the fork rather than once in the master:
+# SQLite connections and client pools must not be shared across processes
+preload_app = False
+
+# Streaming answers and batches hold a request open for a long time
+timeout = int(os.getenv("WORKER_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
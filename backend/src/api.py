@@ -1,11 +1,96 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 from typing import List, Optional
+from dotenv import load_dotenv
+import asyncio
+import importlib
+import json
 import logging
-from .chatbot import init_chatbot, Message, JupiterObserver
+import math
+import os
+import time
+import uuid
+from .models import Message
+from .backoff import is_rate_limit_error, retry_after_seconds
+from .concurrency import ConcurrencyLimiter, FileSlotLimiter, LoadShedError, QueueFullError, SingleFlight
+from .semantic_cache import SemanticCache, SQLiteSemanticCache
+from .batch import answer_questions, parse_questions
+from .clients import (
+    CHAT_MODEL, UpstreamDeadlineError, add_listener, completion_token_estimate, connection_stats, rate_limiter,
+    rate_limiters, rate_limiting_enabled, release_upstream, reserve_upstream, share_rate_limits, was_refused
+)
+from .tokens import estimate_tokens
+from .conversation import (
+    DEFAULT_CONVERSATION_PATH, ConversationMemory, InMemoryConversationStore, SQLiteConversationStore
+)
+from .metrics import ChatMetrics, MetricsMiddleware
+from .startup import Warmup
+
+# Load environment variables before reading any settings below
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Chatbot components. They are created by warm_up() once the server is up,
+# which keeps langchain, Pinecone and Galileo out of the import path and lets
+# the process start (and keep retrying) when a dependency is unreachable.
+embeddings = None
+chain = None
+observer = None
+galileo_enabled = False
+stage_timer = None
+rerank_cache = None
+
+warmup = Warmup(max_delay=float(os.getenv("STARTUP_RETRY_MAX_DELAY", "30")))
+warmup.register("chatbot_module", "embeddings", "chain", "observer", "summarizer")
+
+async def warm_up():
+    """Import the chatbot module and build its components, retrying failures."""
+    global embeddings, chain, stage_timer, rerank_cache
+
+    chatbot = await warmup.run("chatbot_module", lambda: importlib.import_module(".chatbot", __package__))
+    stage_timing = importlib.import_module(".stage_timing", __package__)
+    stage_timer = stage_timing.StageTimingHandler(metrics)
+
+    async def init_observer():
+        global observer, galileo_enabled
+        if not os.getenv("GALILEO_API_KEY"):
+            warmup.disable("observer", "GALILEO_API_KEY is not set")
+            return
+        observer = await warmup.run("observer", chatbot.JupiterObserver)
+        galileo_enabled = observer.init_workflow()
 
-app = FastAPI(title="Jupiter Moons API")
+    # Galileo is optional, so it warms up alongside the chain and never blocks readiness
+    observer_task = asyncio.create_task(init_observer())
+
+    embeddings = await warmup.run(
+        "embeddings", lambda: stage_timing.TimedEmbeddings(chatbot.init_query_embeddings(), metrics)
+    )
+    chain = await warmup.run("chain", lambda: chatbot.init_chatbot(embeddings))
+    rerank_cache = chatbot.rerank_cache
+    # Until the summarizer is up, over-budget history is trimmed instead of summarized
+    conversation_memory.summarize = await warmup.run("summarizer", chatbot.init_summarizer)
+    await observer_task
+
+def is_ready() -> bool:
+    return warmup.is_ready("embeddings", "chain")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(warm_up())
+    yield
+    task.cancel()
+    # Upload interactions still waiting in the Galileo export queue
+    if observer is not None:
+        observer.shutdown()
+
+app = FastAPI(title="Jupiter Moons API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -16,34 +101,287 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize chatbot components
-chain = init_chatbot()
-observer = JupiterObserver()
-galileo_enabled = observer.init_workflow()
+# Per-stage latency, token and request metrics, served at /metrics
+metrics = ChatMetrics()
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+# New connections and TLS handshakes of the pooled OpenAI clients
+add_listener(metrics.observe_connection)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# SHARED_STATE=sqlite is for running several worker processes (see
+# gunicorn.conf.py): the answer cache, sessions, batch slots and the OpenAI
+# rate-limit buckets then live in files under SHARED_STATE_DIR that every
+# worker sees. Clients, the chain and the chat limiter stay per process.
+shared_state = os.getenv("SHARED_STATE", "off").lower() == "sqlite"
+shared_state_dir = os.getenv(
+    "SHARED_STATE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "shared")
+)
+if shared_state:
+    # Otherwise every worker would spend the whole per-minute quota on its own
+    share_rate_limits(os.path.join(shared_state_dir, "rate_limits.sqlite"))
+
+# Bound concurrent chain executions; requests beyond the queue get a 429.
+# With several workers these limits apply to each of them.
+chat_limiter = ConcurrencyLimiter(
+    max_concurrency=int(os.getenv("CHAT_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("CHAT_MAX_QUEUE", "32"))
+)
+
+# A request that cannot be answered within CHAT_LATENCY_SLO_SECONDS is shed
+# with a 503 and Retry-After instead of being queued: when the chat model's
+# rate limit would hold it (behind every request already admitted) for longer
+# than that, when no chat slot frees up in the time left, or when its OpenAI
+# call could no longer be answered before the deadline
+chat_latency_slo = float(os.getenv("CHAT_LATENCY_SLO_SECONDS", "30"))
+context_max_tokens = int(os.getenv("CONTEXT_MAX_TOKENS", "800"))
+
+# Identical questions (same normalized text and history) arriving while one
+# is being answered wait for that answer instead of running the chain again.
+# CHAT_COALESCING=off gives every request its own execution.
+chat_flights = SingleFlight() if os.getenv("CHAT_COALESCING", "on").lower() != "off" else None
+
+# Batch sweeps run with their own parallelism; BATCH_MAX_RUNNING batches at a
+# time, any more are rejected with a 429 rather than queued
+batch_running = int(os.getenv("BATCH_MAX_RUNNING", "1"))
+if shared_state:
+    batch_limiter = FileSlotLimiter(shared_state_dir, "batch", batch_running)
+else:
+    batch_limiter = ConcurrencyLimiter(max_concurrency=batch_running, max_queue=0)
+batch_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+batch_embed_size = int(os.getenv("BATCH_EMBED_SIZE", "100"))
+
+cache_router = None
+
+def question_moons(question: str) -> frozenset:
+    """The moons a question names. "How big is Io?" and "How big is Europa?"
+    embed above the threshold, so an answer is only reused for the same moons.
+    """
+    global cache_router
+    if cache_router is None:
+        # Imported here to keep langchain out of the import path, like the chatbot
+        from .routing import MoonRouter
+        try:
+            cache_router = MoonRouter.from_tsv()
+        except OSError as e:
+            logger.warning(f"Answer cache cannot tell moons apart, moon list unavailable: {str(e)}")
+            cache_router = MoonRouter([])
+    return frozenset(cache_router.detect(question))
+
+# Answers keyed on question embeddings, so near-duplicate questions skip the
+# retrieval and GPT-4 round trips. SEMANTIC_CACHE_MAX_SIZE=0 disables it.
+answer_cache_settings = dict(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+    max_size=int(os.getenv("SEMANTIC_CACHE_MAX_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600")),
+    scope=question_moons
+)
+if shared_state:
+    answer_cache = SQLiteSemanticCache(
+        os.path.join(shared_state_dir, "answer_cache.sqlite"),
+        dumps=lambda response: response.model_dump_json(),
+        loads=lambda text: ChatResponse.model_validate_json(text),
+        **answer_cache_settings
+    )
+else:
+    answer_cache = SemanticCache(**answer_cache_settings)
+
+# Chat history per session_id, trimmed to a token budget with older turns
+# summarized. CONVERSATION_STORE=sqlite keeps sessions across restarts, and
+# is the default with shared state so a session can move between workers.
+conversation_ttl = float(os.getenv("CONVERSATION_TTL_SECONDS", "86400"))
+if os.getenv("CONVERSATION_STORE", "sqlite" if shared_state else "memory").lower() == "sqlite":
+    conversation_store = SQLiteConversationStore(
+        os.path.join(shared_state_dir, "conversations.sqlite") if shared_state else DEFAULT_CONVERSATION_PATH,
+        ttl_seconds=conversation_ttl
+    )
+else:
+    conversation_store = InMemoryConversationStore(
+        max_sessions=int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000")),
+        ttl_seconds=conversation_ttl
+    )
+conversation_memory = ConversationMemory(
+    conversation_store,
+    max_tokens=int(os.getenv("CONVERSATION_HISTORY_TOKENS", "1000"))
+)
 
 @app.get("/")
 async def root():
     return {"status": "healthy", "message": "Jupiter Moons API is running"}
 
 @app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "galileo_enabled": galileo_enabled,
-        "chain_initialized": chain is not None
-    }
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving. Touches no dependencies."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once the chain can answer, 503 while components warm up."""
+    ready = is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "warming_up",
+            "worker_pid": os.getpid(),
+            "shared_state": shared_state,
+            "components": warmup.stats(),
+            "galileo_enabled": galileo_enabled,
+            "chat_concurrency": chat_limiter.stats(),
+            "batch_concurrency": batch_limiter.stats(),
+            "coalescing": chat_flights.stats() if chat_flights is not None else None,
+            "answer_cache": answer_cache.stats(),
+            "rerank_cache": rerank_cache.stats() if rerank_cache is not None else None,
+            "conversations": conversation_memory.stats(),
+            "galileo_export": observer.exporter.stats() if observer is not None else None,
+            "http_connections": connection_stats(),
+            "upstream_rate_limits": rate_limiters()
+        }
+    )
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of request and per-stage chain metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/cache/invalidate")
+async def invalidate_cache():
+    """Drop every cached answer and reranked list. Call this after the vector index is rebuilt."""
+    dropped = answer_cache.clear()
+    if rerank_cache is not None:
+        dropped += rerank_cache.clear()
+    logger.info(f"Invalidated answer cache, dropped {dropped} entries")
+    return {"status": "ok", "dropped": dropped}
+
+@app.delete("/chat/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Forget a conversation's history."""
+    if not conversation_memory.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return {"status": "ok"}
 
 class ChatRequest(BaseModel):
     question: str
-    messages: List[Message]
+    # Server-side history is used when set; send the session_id from the
+    # previous response instead of re-sending the transcript
+    session_id: Optional[str] = None
+    messages: List[Message] = []
 
 class ChatResponse(BaseModel):
     answer: str
     context: Optional[List[str]] = None
+    session_id: Optional[str] = None
+
+def load_history(request: ChatRequest):
+    """Return the request's session id, the chat history to prompt with, and
+    whether the session was seeded from this request.
+
+    A request without a session_id starts a new session, seeded with any
+    messages the client sent along.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    seeded = bool(request.messages) and not conversation_memory.exists(session_id)
+    if seeded:
+        conversation_memory.seed(session_id, request.messages)
+    return session_id, conversation_memory.history(session_id), seeded
+
+def remember_turn(session_id: str, question: str, answer: str, compact: bool = True) -> None:
+    # A session just seeded from a client transcript is not summarized in the
+    # same request; it is compacted on a later turn if the client keeps it
+    if conversation_memory.append(session_id, question, answer) and compact:
+        conversation_memory.schedule_compaction(session_id)
+
+def log_interaction(request: ChatRequest, response: ChatResponse) -> None:
+    """Queue the interaction for Galileo; this never blocks on the upload."""
+    if not galileo_enabled:
+        return
+    observer.process_interaction(
+        question=request.question,
+        context=response.context or [],
+        response={"answer": response.answer},
+        messages=request.messages + [
+            Message(role="user", content=request.question),
+            Message(role="assistant", content=response.answer)
+        ]
+    )
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+def upstream_budget(question: str, chat_history: list):
+    """Reserve this request's chat model call at admission, due within the latency SLO.
+
+    Returns ``(budget, timeout)``: the reservation, None with rate limiting
+    off, and the seconds the request may wait for a chat slot. Release the
+    budget with ``release_upstream`` once the chain has run. Raises
+    LoadShedError when the rate limit alone would hold the answer past the SLO.
+    """
+    if not rate_limiting_enabled():
+        return None, chat_latency_slo
+    prompt = question + "".join(content for _, content in chat_history)
+    tokens = estimate_tokens(prompt) + context_max_tokens + completion_token_estimate()
+    try:
+        budget = reserve_upstream(CHAT_MODEL, tokens, deadline=time.monotonic() + chat_latency_slo)
+    except UpstreamDeadlineError as e:
+        raise LoadShedError(str(e), retry_after=e.wait, reason="upstream_rate_limit")
+    # The rate-limit wait runs alongside the slot wait; only the answer itself must fit after both
+    return budget, budget.deadline - time.monotonic() - rate_limiter(CHAT_MODEL).response_seconds
+
+def upstream_error_reason(error: Exception) -> str:
+    # A call the rate limiter refused for missing the deadline never reached OpenAI
+    return "upstream_rate_limit" if was_refused(error) else "upstream_throttled"
+
+def shed_response(reason: str, detail: str, retry_after: Optional[float]) -> HTTPException:
+    """The 503 for a request shed to protect latency, counted by reason."""
+    logger.warning(f"Shedding chat request ({reason}): {detail}")
+    metrics.shed_requests.inc(reason)
+    return HTTPException(
+        status_code=503,
+        detail="The chatbot is over capacity. Please try again shortly.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after or 1)))}
+    )
+
+async def run_chain(question: str, chat_history: list):
+    """Run the chain for one question, sharing the execution with identical concurrent requests.
+
+    Returns ``(response, shared)``. Only the execution holds a chat_limiter
+    slot, so requests that join it neither queue nor count against the
+    limit; a QueueFullError, LoadShedError or any other failure reaches all
+    of them.
+    """
+    async def execute():
+        budget, timeout = upstream_budget(question, chat_history)
+        try:
+            async with chat_limiter.slot(timeout=timeout):
+                return await chain.ainvoke({
+                    "input": question,
+                    "chat_history": chat_history
+                }, config={"callbacks": [stage_timer]})
+        finally:
+            release_upstream(budget)
+
+    if chat_flights is None:
+        return await execute(), False
+    key = (normalize_question(question), tuple(tuple(message) for message in chat_history))
+    response, shared = await chat_flights.run(key, execute)
+    if shared:
+        metrics.coalesced_requests.inc()
+    return response, shared
+
+async def lookup_cached_answer(question: str):
+    """Embed the question and check the answer cache.
+
+    Returns ``(cached_response, question_vector)``; the vector is handed back
+    so the answer can be stored under it after a miss.
+    """
+    if not answer_cache.enabled:
+        return None, None
+    try:
+        vector = await embeddings.aembed_query(question)
+    except Exception as e:
+        # The cache is an optimisation; never fail the request because of it
+        logger.warning(f"Skipping answer cache, could not embed question: {str(e)}")
+        return None, None
+    return answer_cache.lookup(vector, question), vector
 
 @app.post("/chat")
 async def chat(request: ChatRequest) -> ChatResponse:
@@ -51,16 +389,28 @@ async def chat(request: ChatRequest) -> ChatResponse:
         if not chain:
             raise HTTPException(
                 status_code=503,
-                detail="Chatbot service unavailable. Please try again later."
+                detail="Chatbot service unavailable. Please try again later.",
+                headers={"Retry-After": "5"}
             )
             
         # Log incoming request
         logger.info(f"Received chat request: {request.question}")
+
+        session_id, chat_history, seeded = load_history(request)
+
+        # A follow-up question depends on the history, so only standalone
+        # questions go through the answer cache
+        cached, question_vector = None, None
+        if not chat_history:
+            cached, question_vector = await lookup_cached_answer(request.question)
+        if cached is not None:
+            logger.info("Answer cache hit")
+            cached = cached.model_copy(update={"session_id": session_id})
+            remember_turn(session_id, request.question, cached.answer, compact=not seeded)
+            log_interaction(request, cached)
+            return cached
             
-        response = chain.invoke({
-            "input": request.question,
-            "chat_history": []
-        })
+        response, shared = await run_chain(request.question, chat_history)
         
         if not response or "answer" not in response:
             logger.error(f"Invalid response from chain: {response}")
@@ -72,14 +422,191 @@ async def chat(request: ChatRequest) -> ChatResponse:
         # Convert Document objects to strings for the context
         context_strings = [str(doc) for doc in response.get("context", [])]
         
-        return ChatResponse(
+        chat_response = ChatResponse(
             answer=response["answer"],
-            context=context_strings
+            context=context_strings,
+            session_id=session_id
         )
+        # The request whose execution was shared has already cached the answer
+        if question_vector is not None and not shared:
+            answer_cache.store(request.question, question_vector, chat_response)
+        remember_turn(session_id, request.question, chat_response.answer, compact=not seeded)
+        log_interaction(request, chat_response)
+        
+        return chat_response
         
+    except QueueFullError as e:
+        logger.warning(f"Rejecting chat request, queue full: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many chat requests in progress. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
+    except LoadShedError as e:
+        raise shed_response(e.reason, str(e), e.retry_after)
+    except HTTPException:
+        raise
     except Exception as e:
+        # OpenAI still throttling after the SDK's own retries, or a call refused for the SLO
+        if is_rate_limit_error(e):
+            raise shed_response(upstream_error_reason(e), str(e), retry_after_seconds(e))
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Server error: {str(e)}"
         )
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_chat_events(request: ChatRequest, session_id: str, chat_history: list, question_vector=None,
+                             compact: bool = True, budget=None):
+    """Run the chain in streaming mode and translate its output into SSE frames.
+
+    Emits a ``context`` event as soon as retrieval finishes, one ``token``
+    event per answer chunk from the LLM, then a ``done`` event carrying the
+    full ChatResponse. Failures are reported as an ``error`` event because the
+    200 status line has already been sent by then. ``budget`` is released
+    once the answer has streamed, before the turn is remembered.
+    """
+    question = request.question
+    answer_parts = []
+    context_strings = []
+    try:
+        try:
+            async for chunk in chain.astream({
+                "input": question,
+                "chat_history": chat_history
+            }, config={"callbacks": [stage_timer]}):
+                if "context" in chunk:
+                    context_strings = [str(doc) for doc in chunk["context"]]
+                    yield sse_event("context", {"context": context_strings})
+                if "answer" in chunk and chunk["answer"]:
+                    answer_parts.append(chunk["answer"])
+                    yield sse_event("token", {"token": chunk["answer"]})
+        finally:
+            release_upstream(budget)
+
+        response = ChatResponse(answer="".join(answer_parts), context=context_strings, session_id=session_id)
+        if question_vector is not None:
+            answer_cache.store(question, question_vector, response)
+        remember_turn(session_id, question, response.answer, compact=compact)
+        log_interaction(request, response)
+        yield sse_event("done", response.model_dump())
+
+    except Exception as e:
+        logger.error(f"Error in chat stream: {str(e)}")
+        metrics.errors.inc("/chat/stream")
+        yield sse_event("error", {"detail": f"Server error: {str(e)}"})
+
+async def stream_cached_events(response: ChatResponse):
+    """Replay a cached answer using the same event sequence as a live stream."""
+    yield sse_event("context", {"context": response.context or []})
+    yield sse_event("token", {"token": response.answer})
+    yield sse_event("done", response.model_dump())
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    if not chain:
+        raise HTTPException(
+            status_code=503,
+            detail="Chatbot service unavailable. Please try again later.",
+            headers={"Retry-After": "5"}
+        )
+
+    logger.info(f"Received streaming chat request: {request.question}")
+
+    session_id, chat_history, seeded = load_history(request)
+
+    cached, question_vector = None, None
+    if not chat_history:
+        cached, question_vector = await lookup_cached_answer(request.question)
+    if cached is not None:
+        logger.info("Answer cache hit")
+        cached = cached.model_copy(update={"session_id": session_id})
+        remember_turn(session_id, request.question, cached.answer, compact=not seeded)
+        log_interaction(request, cached)
+        return StreamingResponse(
+            stream_cached_events(cached),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    budget = None
+    try:
+        budget, timeout = upstream_budget(request.question, chat_history)
+        await chat_limiter.acquire(timeout=timeout)
+    except QueueFullError as e:
+        release_upstream(budget)
+        logger.warning(f"Rejecting streaming chat request, queue full: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many chat requests in progress. Please try again shortly.",
+            headers={"Retry-After": "1"}
+        )
+    except LoadShedError as e:
+        release_upstream(budget)
+        raise shed_response(e.reason, str(e), e.retry_after)
+
+    def finish():
+        chat_limiter.release()
+        release_upstream(budget)
+
+    # The slot is held for the life of the stream and released once the
+    # response has finished sending (or the client has gone away)
+    return StreamingResponse(
+        stream_chat_events(request, session_id, chat_history, question_vector, compact=not seeded, budget=budget),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(finish)
+    )
+
+@app.post("/chat/batch")
+async def chat_batch(request: Request) -> StreamingResponse:
+    """Answer a JSONL body of questions and stream JSONL results back.
+
+    Each input line is ``{"id": ..., "question": ...}``. One result line is
+    written per question as soon as it completes, in completion order, with
+    the answer, context, latency and any error. History and the answer cache
+    are not used, so every question is answered afresh.
+    """
+    if not chain:
+        raise HTTPException(
+            status_code=503,
+            detail="Chatbot service unavailable. Please try again later.",
+            headers={"Retry-After": "5"}
+        )
+
+    try:
+        items = parse_questions((await request.body()).decode("utf-8").splitlines())
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        await batch_limiter.acquire()
+    except QueueFullError as e:
+        logger.warning(f"Rejecting batch request, batch already running: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail="A batch is already running. Please try again once it finishes.",
+            headers={"Retry-After": "60"}
+        )
+
+    logger.info(f"Received batch of {len(items)} questions")
+
+    async def result_lines():
+        async for result in answer_questions(
+            chain, items, embeddings,
+            max_concurrency=batch_concurrency,
+            embed_batch_size=batch_embed_size,
+            callbacks=[stage_timer]
+        ):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(
+        result_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(batch_limiter.release)
+    )
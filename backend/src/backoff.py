@@ -0,0 +1,56 @@
+import logging
+import random
+import time
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Recognise rate-limit errors from OpenAI, Pinecone or anything reporting HTTP 429."""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status == 429:
+        return True
+    message = str(error).lower()
+    return "rate_limit" in message or "rate limit" in message
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read a Retry-After hint from the error's HTTP response, if it carries one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def retry_with_backoff(fn: Callable[[], T], max_retries: int = 6, base_delay: float = 1.0,
+                       max_delay: float = 60.0, retry_on: Callable[[Exception], bool] = is_rate_limit_error,
+                       on_retry: Optional[Callable[[Exception, float], None]] = None) -> T:
+    """Call ``fn`` and retry with exponential backoff and full jitter.
+
+    Only errors for which ``retry_on`` returns True are retried (rate limits by
+    default); anything else, or the last failure after ``max_retries`` retries,
+    is raised. A Retry-After hint from the server takes precedence over the
+    computed delay. ``on_retry`` is told about every retry and its delay,
+    which is how callers shrink batch sizes or count throttling.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries or not retry_on(e):
+                raise
+            delay = retry_after_seconds(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            logger.warning(f"Attempt {attempt + 1} failed ({str(e)}), retrying in {delay:.2f}s")
+            if on_retry:
+                on_retry(e, delay)
+            time.sleep(delay)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from itertools import islice
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the result queue
+_DONE = object()
+
+
+def parse_questions(lines: Iterable[str]) -> List[Dict]:
+    """Parse JSONL questions: one ``{"question": ..., "id": ...}`` object per line.
+
+    ``id`` is optional and defaults to the line number. Blank lines are
+    skipped; anything else that is not a question raises ValueError naming
+    the line, so a bad file fails before any question is answered.
+    """
+    items = []
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {line_number} is not valid JSON: {str(e)}")
+        if not isinstance(record, dict) or not str(record.get("question") or "").strip():
+            raise ValueError(f"Line {line_number} has no question")
+        items.append({"id": str(record.get("id", line_number)), "question": record["question"]})
+    return items
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """IDs already answered without error in a previous, possibly interrupted, run."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of a killed run may be cut short
+                continue
+            if record.get("error") is None:
+                done.add(str(record.get("id")))
+            else:
+                done.discard(str(record.get("id")))
+    return done
+
+
+async def prefetch_embeddings(embeddings, questions: List[str]) -> None:
+    """Embed a window of questions in one call.
+
+    The query embeddings are backed by the embedding cache, which keys
+    documents and queries alike, so the retriever's per-question
+    ``aembed_query`` then becomes a cache hit instead of an API call.
+    """
+    try:
+        await embeddings.aembed_documents(questions)
+    except Exception as e:
+        # Only an optimisation; each question is still embedded on its own
+        logger.warning(f"Could not prefetch {len(questions)} question embeddings: {str(e)}")
+
+
+async def answer_one(chain, item: Dict, callbacks: Optional[list] = None) -> Dict:
+    start = time.perf_counter()
+    result = {"id": item["id"], "question": item["question"], "answer": None, "context": None, "error": None}
+    try:
+        response = await chain.ainvoke({
+            "input": item["question"],
+            "chat_history": []
+        }, config={"callbacks": callbacks or []})
+        result["answer"] = response["answer"]
+        result["context"] = [str(doc) for doc in response.get("context", [])]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {str(e)}"
+    result["latency_seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+async def answer_questions(chain, items: Iterable[Dict], embeddings=None, max_concurrency: int = 8,
+                           embed_batch_size: int = 100, callbacks: Optional[list] = None) -> AsyncIterator[Dict]:
+    """Answer questions through the retrieval chain, yielding results as they complete.
+
+    At most ``max_concurrency`` chain runs are in flight. Questions are taken
+    in windows of ``embed_batch_size`` whose embeddings are fetched in a
+    single call before the window is started; the next window is only
+    embedded once the in-flight runs drop to ``max_concurrency``, so
+    embedding overlaps with answering without racing ahead of it. A failed
+    question yields a result with ``error`` set and does not stop the run.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results: asyncio.Queue = asyncio.Queue()
+    pending: Set[asyncio.Task] = set()
+
+    async def answer(item: Dict) -> None:
+        async with semaphore:
+            results.put_nowait(await answer_one(chain, item, callbacks))
+
+    async def produce() -> None:
+        try:
+            iterator = iter(items)
+            while True:
+                window = list(islice(iterator, embed_batch_size))
+                if not window:
+                    break
+                while len(pending) > max_concurrency:
+                    await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if embeddings is not None:
+                    await prefetch_embeddings(embeddings, [item["question"] for item in window])
+                for item in window:
+                    task = asyncio.create_task(answer(item))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            results.put_nowait(_DONE)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            result = await results.get()
+            if result is _DONE:
+                break
+            yield result
+        # Surface an unexpected failure in the producer itself
+        await producer
+    finally:
+        # The consumer went away early (e.g. the client disconnected)
+        producer.cancel()
+        for task in list(pending):
+            task.cancel()
+
+
+async def run_batch_file(chain, input_path: str, output_path: str, embeddings=None, max_concurrency: int = 8,
+                         embed_batch_size: int = 100, resume: bool = True, callbacks: Optional[list] = None) -> Dict:
+    """Answer every question in a JSONL file, appending results to ``output_path``.
+
+    With ``resume`` the questions already answered without error in
+    ``output_path`` are skipped, so an interrupted run picks up where it
+    stopped and failed questions are retried; for an ID that appears more
+    than once the last line wins. Each result is flushed as soon as it is
+    written.
+    """
+    with open(input_path, encoding="utf-8") as f:
+        items = parse_questions(f)
+
+    done = completed_ids(output_path) if resume else set()
+    todo = [item for item in items if item["id"] not in done]
+    stats = {"total": len(items), "skipped": len(items) - len(todo), "answered": 0, "errors": 0}
+    logger.info(f"Answering {len(todo)} questions, {stats['skipped']} already done in {output_path}")
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        async for result in answer_questions(chain, todo, embeddings, max_concurrency, embed_batch_size, callbacks):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if result["error"] is None:
+                stats["answered"] += 1
+            else:
+                stats["errors"] += 1
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return stats
@@ -0,0 +1,158 @@
+import logging
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from .chunk import chunk_for_embedding, create_moon_chunks, read_moons_data
+from .local_index import metadata_mask
+from .routing import DEFAULT_MOONS_PATH, MoonRouter
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word and number tokens; "S/2003 J 2" -> ["s", "2003", "j", "2"]."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index.
+
+    Postings are stored CSR-style in three flat arrays: ``offsets`` (one
+    slot per term), ``postings`` (int32 document numbers) and ``weights``
+    (float32). Each weight is the full BM25 contribution of the term to the
+    document, precomputed at build time, so a query is one slice and one
+    scatter-add per query term followed by a partial sort, with no Python
+    loop over documents. Metadata filters take the same shape as
+    LocalVectorStore's.
+    """
+
+    def __init__(self, ids: List[str], texts: List[str], metadatas: Optional[List[dict]] = None,
+                 k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._ids = list(ids)
+        self._texts = list(texts)
+        self._metadatas = list(metadatas or [{} for _ in self._ids])
+        self._field_cache: Dict[str, np.ndarray] = {}
+
+        self._vocab: Dict[str, int] = {}
+        term_docs: List[List[int]] = []
+        term_freqs: List[List[int]] = []
+        lengths = np.zeros(len(self._texts), dtype=np.float32)
+        for doc, text in enumerate(self._texts):
+            tokens = tokenize(text)
+            lengths[doc] = len(tokens)
+            for term, freq in Counter(tokens).items():
+                term_id = self._vocab.setdefault(term, len(self._vocab))
+                if term_id == len(term_docs):
+                    term_docs.append([])
+                    term_freqs.append([])
+                term_docs[term_id].append(doc)
+                term_freqs[term_id].append(freq)
+
+        self._offsets = np.zeros(len(term_docs) + 1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum([len(docs) for docs in term_docs])
+        self._postings = np.fromiter((d for docs in term_docs for d in docs), dtype=np.int32,
+                                     count=int(self._offsets[-1]))
+        tf = np.fromiter((f for freqs in term_freqs for f in freqs), dtype=np.float32,
+                         count=int(self._offsets[-1]))
+
+        n = len(self._texts)
+        average_length = float(lengths.mean()) if n else 0.0
+        df = np.diff(self._offsets).astype(np.float32)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths[self._postings] / (average_length or 1.0))
+        self._weights = (np.repeat(idf, np.diff(self._offsets)) * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Dict], **kwargs) -> "BM25Index":
+        """Index records from chunk_for_embedding with the metadata the vector stores keep."""
+        chunks = list(chunks)
+        return cls(
+            ids=[chunk["id"] for chunk in chunks],
+            texts=[chunk["text"] for chunk in chunks],
+            metadatas=[{
+                "moon_name": chunk["metadata"]["moon_name"],
+                "source_url": chunk["source_url"],
+                "content_hash": chunk["metadata"]["content_hash"]
+            } for chunk in chunks],
+            **kwargs
+        )
+
+    @classmethod
+    def from_tsv(cls, file_path: str = DEFAULT_MOONS_PATH, **kwargs) -> "BM25Index":
+        """Chunk the TSV the way the ingestion scripts do and index the chunks."""
+        index = cls.from_chunks(chunk_for_embedding(create_moon_chunks(read_moons_data(file_path))), **kwargs)
+        logger.info(f"Built BM25 index over {len(index)} chunks, {len(index._vocab)} terms")
+        return index
+
+    def _field(self, name: str) -> np.ndarray:
+        if name not in self._field_cache:
+            self._field_cache[name] = np.array(
+                [metadata.get(name) for metadata in self._metadatas], dtype=object
+            )
+        return self._field_cache[name]
+
+    def search(self, query: str, k: int = 4, filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """Top ``k`` documents sharing at least one term with the query, best first."""
+        term_ids = {self._vocab[term] for term in tokenize(query) if term in self._vocab}
+        if not term_ids or not self._ids:
+            return []
+
+        scores = np.zeros(len(self._ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            # A term lists each document once, so plain fancy-index addition is safe
+            scores[self._postings[start:end]] += self._weights[start:end]
+        if filter:
+            scores[~metadata_mask(filter, self._field, len(self._ids))] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(id=self._ids[i], page_content=self._texts[i], metadata=dict(self._metadatas[i])), float(scores[i]))
+            for i in top
+        ]
+
+
+class BM25Retriever(BaseRetriever):
+    """Retriever over a BM25Index, optionally narrowed by MoonRouter like the vector side."""
+
+    index: BM25Index
+    k: int = 4
+    router: Optional[MoonRouter] = None
+
+    def _search(self, query: str) -> List[Document]:
+        if self.router is not None:
+            decision = self.router.route(query)
+            if decision.filter is not None:
+                results = self.index.search(query, k=decision.k, filter=decision.filter)
+                if results:
+                    return [doc for doc, _ in results]
+        return [doc for doc, _ in self.index.search(query, k=self.k)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self._search(query)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        # Well under a millisecond; not worth a thread hop
+        return self._search(query)
@@ -1,18 +1,36 @@
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain import hub
 from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
 from dotenv import load_dotenv
 import os
 from langchain.globals import set_debug
 from typing import Dict, Any, List
 import logging
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from galileo_observe import ObserveWorkflows
+import argparse
+import asyncio
+import sys
 import uuid
-from dataclasses import dataclass
+
+# The chatbot is part of the src package; run as a file, its relative imports cannot resolve
+if not __package__:
+    sys.exit("Run the chatbot from the backend directory with: python -m src.chatbot")
+
+from .models import Message
+from .clients import CHAT_MODEL, EMBEDDING_MODEL, chat_model, openai_embeddings, pinecone_index
+from .batch import run_batch_file
+from .conversation import ConversationMemory, InMemoryConversationStore
+from .embedding_cache import CachedEmbeddings
+from .local_index import LocalVectorStore, DEFAULT_INDEX_PATH
+from .observability import BatchExporter
+from .routing import MoonRouter, RoutedRetriever
+from .bm25 import BM25Index, BM25Retriever
+from .hybrid import HybridRetriever
+from .compression import CompressingRetriever, ContextCompressor
+from .rerank import LocalReranker, PineconeVectors, RerankCache, RerankingRetriever
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,19 +39,19 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-@dataclass
-class Message:
-    role: str
-    content: str
-    metadata: Dict[str, Any] = None
+# Reranked lists of the chain built by init_chatbot; the API clears it with the answer cache
+rerank_cache = None
 
 class JupiterObserver:
     _instance = None
     _workflow = None
 
     def __new__(cls):
-        if cls._instance is None:
+        # One per process: a copy inherited through fork would share the
+        # parent's thread_id and has lost its exporter thread
+        if cls._instance is None or cls._instance._pid != os.getpid():
             cls._instance = super(JupiterObserver, cls).__new__(cls)
+            cls._instance._pid = os.getpid()
         return cls._instance
 
     def __init__(self):
@@ -41,10 +59,19 @@ class JupiterObserver:
             # Set Galileo console URL only
             os.environ["GALILEO_CONSOLE_URL"] = "https://console.acme.rungalileo.io"
             
-            self.observe_logger = ObserveWorkflows(project_name="JupiterAtlasObs")
+            self.project_name = "JupiterAtlasObs"
             self.current_workflow = None
             self.thread_id = str(uuid.uuid4())
             self.initialized = False
+            
+            # Interactions are uploaded in batches from a background thread
+            self.exporter = BatchExporter(
+                self._upload_batch,
+                max_batch_size=int(os.getenv("GALILEO_EXPORT_BATCH_SIZE", "50")),
+                flush_interval=float(os.getenv("GALILEO_EXPORT_INTERVAL_SECONDS", "5")),
+                max_queue_size=int(os.getenv("GALILEO_EXPORT_QUEUE_SIZE", "1000")),
+                name="galileo-exporter"
+            )
     
     def init_workflow(self) -> bool:
         try:
@@ -63,12 +90,43 @@ class JupiterObserver:
     
     def process_interaction(self, question: str, context: List[str], 
                           response: Dict[str, Any], messages: List[Message]) -> None:
+        """Queue an interaction for upload to Galileo.
+
+        Only plain data is captured here; the workflow objects are built and
+        uploaded in batches on the exporter's thread, so the caller never
+        waits on Galileo and a Galileo outage cannot fail a chat request.
+        """
         try:
-            self.current_workflow = self.observe_logger.add_workflow(
+            # Convert messages list to a formatted string
+            messages_str = "\n".join([
+                f"{msg.role}: {msg.content}" 
+                for msg in messages
+            ])
+            
+            self.exporter.submit({
+                "question": question,
+                "context": [str(doc) for doc in context or []],
+                "answer": response.get("answer", ""),
+                "messages": messages_str,
+                "message_count": len(messages)
+            })
+        except Exception as e:
+            logger.error(f"❌ Error processing interaction: {str(e)}")
+    
+    def _upload_batch(self, interactions: List[Dict[str, Any]]) -> None:
+        # A fresh client per batch, so nothing from a failed upload is carried
+        # over when the exporter retries the whole batch
+        observe_logger = ObserveWorkflows(project_name=self.project_name)
+        
+        for interaction in interactions:
+            question = interaction["question"]
+            context = interaction["context"]
+            
+            self.current_workflow = observe_logger.add_workflow(
                 input={"question": question},
                 metadata={
                     "thread_id": self.thread_id,
-                    "message_count": str(len(messages))
+                    "message_count": str(interaction["message_count"])
                 }
             )
             
@@ -76,89 +134,200 @@ class JupiterObserver:
                 self.current_workflow.add_retriever(
                     input=question,
                     documents=[{
-                        "content": str(doc),
+                        "content": doc,
                         "metadata": {"source": "jupiter_moons"}
                     } for doc in context]
                 )
             
-            # Convert messages list to a formatted string
-            messages_str = "\n".join([
-                f"{msg.role}: {msg.content}" 
-                for msg in messages
-            ])
-            
             self.current_workflow.add_llm(
                 input=question,
-                output=response.get("answer", ""),
-                model="gpt-4",
+                output=interaction["answer"],
+                model=CHAT_MODEL,
                 metadata={
                     "env": "production",
                     "thread_id": self.thread_id,
-                    "messages": messages_str  # Now a string instead of a list
+                    "messages": interaction["messages"]
                 }
             )
             
             self.current_workflow.conclude(
                 output={
-                    "final_answer": response.get("answer", ""),
+                    "final_answer": interaction["answer"],
                     "context_used": bool(context)
                 }
             )
-            
-            self.observe_logger.upload_workflows()
-            logger.info(f"✅ Workflow completed and uploaded for thread {self.thread_id}")
-            
-        except Exception as e:
-            logger.error(f"❌ Error processing interaction: {str(e)}")
+        
+        observe_logger.upload_workflows()
+        logger.info(f"✅ {len(interactions)} workflows uploaded for thread {self.thread_id}")
+    
+    def flush(self) -> None:
+        """Upload everything queued so far."""
+        self.exporter.flush()
+    
+    def shutdown(self) -> None:
+        """Upload what is still queued and stop the exporter thread."""
+        self.exporter.shutdown()
 
-def init_chatbot():
+def init_query_embeddings():
+    """Create the embeddings used to embed questions at query time.
+
+    Backed by the on-disk embedding cache, so a repeated question (and the
+    second embedding of the same question by the retriever) costs no API call.
+    """
+    return CachedEmbeddings(openai_embeddings(model=EMBEDDING_MODEL))
+
+def init_vector_store(embeddings):
+    """Create the vector store selected by VECTOR_BACKEND.
+
+    "pinecone" (the default) queries the jupitermoons-2 index over the network;
+    "local" loads the in-process NumPy index written by
+    ``python vector_store.py --backend local`` from LOCAL_INDEX_PATH.
+    """
+    backend = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    
+    if backend == "local":
+        vector_store = LocalVectorStore.load(DEFAULT_INDEX_PATH, embeddings)
+        logger.info(f"Loaded local vector index with {len(vector_store)} vectors from {DEFAULT_INDEX_PATH}")
+        return vector_store
+    
+    if backend == "pinecone":
+        # The shared index handle keeps its connections open between queries
+        return PineconeVectorStore(
+            index=pinecone_index("jupitermoons-2"),
+            namespace="moonvector",
+            embedding=embeddings
+        )
+    
+    raise ValueError(f"Unknown VECTOR_BACKEND '{backend}', expected 'pinecone' or 'local'")
+
+def init_chatbot(embeddings=None):
     """Initialize the chatbot with better error handling"""
+    global rerank_cache
     try:
         # Check for required environment variables
-        required_vars = ['OPENAI_API_KEY', 'PINECONE_API_KEY', 'PINECONE_ENVIRONMENT']
+        required_vars = ['OPENAI_API_KEY']
+        if os.getenv("VECTOR_BACKEND", "pinecone").lower() == "pinecone":
+            required_vars += ['PINECONE_API_KEY', 'PINECONE_ENVIRONMENT']
         missing_vars = [var for var in required_vars if not os.getenv(var)]
         
         if missing_vars:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
         
-        # Initialize Pinecone
-        pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
-        
         # Initialize vector store
-        vector_store = PineconeVectorStore(
-            index_name="jupitermoons-2",
-            namespace="moonvector",
-            embedding=OpenAIEmbeddings()
-        )
+        embeddings = embeddings or init_query_embeddings()
+        vector_store = init_vector_store(embeddings)
         
-        # Create retriever
-        retriever = vector_store.as_retriever()
+        # With reranking on, every retriever fetches RERANK_OVERFETCH times
+        # its usual k and the reranker picks the final k from those candidates
+        reranking = os.getenv("RERANKING", "on").lower() != "off"
+        overfetch = max(1, int(os.getenv("RERANK_OVERFETCH", "5"))) if reranking else 1
+        
+        # Create retriever; questions naming a moon only search that moon's vectors
+        router = None
+        if os.getenv("RETRIEVAL_ROUTING", "on").lower() == "off":
+            retriever = vector_store.as_retriever(search_kwargs={"k": 4 * overfetch})
+        else:
+            router = MoonRouter.from_tsv()
+            retriever = RoutedRetriever(vector_store=vector_store, router=router.scaled(overfetch))
+        
+        # Fuse with BM25 so exact names and numbers are found even when the
+        # embedding misses them
+        if os.getenv("HYBRID_RETRIEVAL", "on").lower() != "off":
+            lexical = BM25Retriever(
+                index=BM25Index.from_tsv(),
+                k=4 * overfetch,
+                router=router.scaled(overfetch) if router is not None else None
+            )
+            retriever = HybridRetriever(retrievers=[retriever, lexical])
+        
+        if reranking:
+            rerank_cache = RerankCache(
+                max_size=int(os.getenv("RERANK_CACHE_SIZE", "1024")),
+                ttl_seconds=float(os.getenv("RERANK_CACHE_TTL_SECONDS", "600"))
+            )
+            # Candidates are scored against the vectors the store already holds
+            if isinstance(vector_store, LocalVectorStore):
+                stored_vectors = vector_store
+            else:
+                stored_vectors = PineconeVectors(pinecone_index("jupitermoons-2"), namespace="moonvector")
+            retriever = RerankingRetriever(
+                base_retriever=retriever,
+                reranker=LocalReranker(
+                    embeddings,
+                    vectors=stored_vectors,
+                    lexical_weight=float(os.getenv("RERANK_LEXICAL_WEIGHT", "0.3"))
+                ),
+                k=4,
+                router=router,
+                cache=rerank_cache
+            )
         
         # Initialize LLM
-        llm = ChatOpenAI(
-            model_name="gpt-4",
+        llm = chat_model(
+            model_name=CHAT_MODEL,
             temperature=0.7
         )
         
-        # Create the chain
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert on Jupiter's moons. Provide accurate, scientific information."),
-            MessagesPlaceholder(variable_name="chat_history", optional=True),
-            ("human", "Context: {context}\n\nQuestion: {input}"),
-        ])
-        
-        combine_docs_chain = create_stuff_documents_chain(
-            llm,
-            prompt,
-            document_variable_name="context"
-        )
-        
-        return create_retrieval_chain(retriever, combine_docs_chain)
+        return build_chain(retriever, llm)
         
     except Exception as e:
         logger.error(f"Error initializing chatbot: {str(e)}")
         raise RuntimeError(f"Failed to initialize chatbot: {str(e)}")
 
+def build_chain(retriever, llm):
+    """Assemble the retrieval chain from a retriever and a chat model.
+
+    Kept separate from init_chatbot so the same prompt and chain layout can be
+    driven by local stand-ins (see backend/benchmarks).
+    """
+    # Cut the retrieved chunks down to the sentences relevant to the question
+    # before they are stuffed into the prompt
+    if os.getenv("CONTEXT_COMPRESSION", "on").lower() != "off":
+        retriever = CompressingRetriever(
+            base_retriever=retriever,
+            compressor=ContextCompressor(max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "800")))
+        )
+    
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are an expert on Jupiter's moons. Provide accurate, scientific information."),
+        MessagesPlaceholder(variable_name="chat_history", optional=True),
+        ("human", "Context: {context}\n\nQuestion: {input}"),
+    ])
+    
+    combine_docs_chain = create_stuff_documents_chain(
+        llm,
+        prompt,
+        document_variable_name="context"
+    )
+    
+    return create_retrieval_chain(retriever, combine_docs_chain)
+
+def init_summarizer():
+    """Create the summarizer that folds old conversation turns into a rolling summary."""
+    llm = chat_model(
+        model_name=os.getenv("CONVERSATION_SUMMARY_MODEL", "gpt-3.5-turbo"),
+        temperature=0
+    )
+    return build_summarizer(llm)
+
+def build_summarizer(llm):
+    """Wrap a chat model as an async ``summarize(summary, messages)`` for ConversationMemory."""
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You condense conversations about Jupiter's moons. Merge the existing summary "
+                   "and the new messages into one summary of at most 150 words. Keep the moons, "
+                   "facts and open questions a follow-up question could refer to."),
+        ("human", "Existing summary:\n{summary}\n\nNew messages:\n{messages}"),
+    ])
+    chain = prompt | llm | StrOutputParser()
+    
+    async def summarize(summary: str, messages: List[Message]) -> str:
+        return await chain.ainvoke({
+            "summary": summary or "(none)",
+            "messages": "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+        })
+    
+    return summarize
+
 def chat_with_moons():
     """Interactive chat function about Jupiter's moons with enhanced error handling and user experience."""
     try:
@@ -167,8 +336,16 @@ def chat_with_moons():
         observer = JupiterObserver()
         galileo_enabled = observer.init_workflow()
         
-        # Track conversation history
+        # Track conversation history; the prompt gets a bounded, summarized view of it
         messages = []
+        memory = ConversationMemory(
+            InMemoryConversationStore(max_sessions=1),
+            max_tokens=int(os.getenv("CONVERSATION_HISTORY_TOKENS", "1000")),
+            summarize=init_summarizer()
+        )
+        session_id = observer.thread_id
+        # One loop for every compaction, so the pooled async connections stay usable
+        loop = asyncio.new_event_loop()
         
         if galileo_enabled:
             print("\n✅ Galileo observation enabled")
@@ -196,8 +373,10 @@ def chat_with_moons():
                 # Get response
                 response = chain.invoke({
                     "input": question,
-                    "chat_history": []
+                    "chat_history": memory.history(session_id)
                 })
+                if memory.append(session_id, question, response["answer"]):
+                    loop.run_until_complete(memory.compact(session_id))
                 
                 # Add assistant message to history
                 messages.append(Message(
@@ -223,10 +402,48 @@ def chat_with_moons():
             except Exception as e:
                 logger.error(f"Error processing question: {str(e)}")
                 print("\nI apologize, but I encountered an error processing your question. Please try again.")
+        
+        # Upload whatever is still queued before exiting
+        observer.shutdown()
+        loop.close()
                 
     except Exception as e:
         logger.error(f"Fatal error in chat session: {str(e)}")
         print("\nI apologize, but I encountered a serious error and need to shut down. Please restart the application.")
 
+def answer_batch(input_path: str, output_path: str, max_concurrency: int = 8,
+                 embed_batch_size: int = 100, resume: bool = True) -> Dict[str, Any]:
+    """Answer a JSONL file of questions offline, writing JSONL results.
+
+    See ``batch.run_batch_file``: questions run through the retrieval chain
+    with bounded parallelism, their embeddings are fetched in batches, and
+    an interrupted run resumes from the output file.
+    """
+    embeddings = init_query_embeddings()
+    chain = init_chatbot(embeddings)
+    return asyncio.run(run_batch_file(
+        chain, input_path, output_path,
+        embeddings=embeddings,
+        max_concurrency=max_concurrency,
+        embed_batch_size=embed_batch_size,
+        resume=resume
+    ))
+
 if __name__ == "__main__":
-    chat_with_moons()
+    parser = argparse.ArgumentParser(
+        prog="python -m src.chatbot",
+        description="Chat about Jupiter's moons, or answer a file of questions. Run from the backend directory."
+    )
+    parser.add_argument("--batch", metavar="INPUT", help="JSONL file of {\"id\", \"question\"} objects to answer")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=8, help="questions answered at once")
+    parser.add_argument("--embed-batch-size", type=int, default=100, help="questions embedded per API call")
+    parser.add_argument("--no-resume", action="store_true", help="overwrite the output instead of resuming from it")
+    args = parser.parse_args()
+    
+    if args.batch:
+        stats = answer_batch(args.batch, args.output, args.concurrency, args.embed_batch_size, not args.no_resume)
+        print(f"\n✅ {stats['answered']} answered, {stats['errors']} errors, "
+              f"{stats['skipped']} skipped in {stats['seconds']}s -> {args.output}")
+    else:
+        chat_with_moons()
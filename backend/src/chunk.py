@@ -1,7 +1,18 @@
+import argparse
+import hashlib
+import re
+from collections import defaultdict
+from itertools import islice
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator
 from dataclasses import dataclass
-from langchain_text_splitters import MarkdownHeaderTextSplitter
+from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+
+try:
+    from .tokens import count_tokens
+except ImportError:
+    # Run as a script from src/, outside the package
+    from tokens import count_tokens
 
 @dataclass
 class MoonChunk:
@@ -10,48 +21,79 @@ class MoonChunk:
     metadata: Dict
     source_url: str
 
+def content_hash(text: str) -> str:
+    """Return the SHA-256 hex digest used to detect changed chunk content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_id(moon_name: str, index: int) -> str:
+    """Build a stable vector ID from the moon name and the chunk's position within that moon.
+
+    e.g. ("S/2003 J 2", 0) -> "s-2003-j-2-0". The ID does not depend on where
+    the moon appears in the TSV, so adding or reordering rows for one moon
+    leaves every other moon's IDs untouched.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "-", moon_name.lower()).strip("-")
+    return f"{slug}-{index}"
+
 def read_moons_data(file_path: str) -> pd.DataFrame:
     """Read the TSV file and return a DataFrame."""
     return pd.read_csv(file_path, sep='\t')
 
 def create_moon_chunks(df: pd.DataFrame) -> List[MoonChunk]:
-    """Create chunks organized by moon with combined related information."""
-    moon_chunks = []
+    """Create chunks organized by moon with combined related information.
     
-    # Group by moon name to combine related information
-    for moon_name, group in df.groupby('Moon Name'):
-        # Combine all content for this moon
-        combined_content = []
-        
-        for _, row in group.iterrows():
-            combined_content.append(f"{row['Document Title']}:\n{row['Document Content']}")
-        
-        # Create a comprehensive chunk for this moon
-        content = f"# {moon_name}\n\n" + "\n\n".join(combined_content)
-        
-        # Create metadata
-        metadata = {
-            "moon_name": moon_name,
-            "document_count": len(group),
-            "source_urls": group['Source URL'].unique().tolist()
-        }
-        
-        # Use the first source URL as primary source
-        primary_source = group['Source URL'].iloc[0]
-        
-        moon_chunks.append(
-            MoonChunk(
-                moon_name=moon_name,
-                content=content,
-                metadata=metadata,
-                source_url=primary_source
-            )
+    Entries are built with vectorized string operations and joined per moon
+    with a single groupby aggregation rather than iterating over rows.
+    """
+    if df.empty:
+        return []
+    
+    entries = df['Document Title'].astype(str) + ":\n" + df['Document Content'].astype(str)
+    grouped = entries.groupby(df['Moon Name'], sort=True)
+    
+    # Combine all content for each moon
+    combined_content = grouped.agg("\n\n".join)
+    document_counts = grouped.size()
+    source_urls = df.groupby('Moon Name', sort=True)['Source URL'].unique()
+    
+    # Use the first source URL as primary source
+    primary_sources = df.drop_duplicates('Moon Name').set_index('Moon Name')['Source URL']
+    
+    return [
+        MoonChunk(
+            moon_name=moon_name,
+            content=f"# {moon_name}\n\n{content}",
+            metadata={
+                "moon_name": moon_name,
+                "document_count": int(document_counts[moon_name]),
+                "source_urls": source_urls[moon_name].tolist()
+            },
+            source_url=primary_sources[moon_name]
         )
+        for moon_name, content in combined_content.items()
+    ]
+
+def iter_moon_chunks(file_path: str, rows_per_block: int = 100_000) -> Iterator[MoonChunk]:
+    """Stream moon chunks from a TSV of any size with bounded memory.
     
-    return moon_chunks
+    The file is read ``rows_per_block`` rows at a time and each block is
+    aggregated per moon with create_moon_chunks, so peak memory depends on the
+    block size, not the file size. A moon whose rows span several blocks
+    yields one chunk per block; for files smaller than a block the output is
+    identical to create_moon_chunks(read_moons_data(file_path)).
+    """
+    for block in pd.read_csv(file_path, sep='\t', chunksize=rows_per_block):
+        yield from create_moon_chunks(block)
 
-def chunk_for_embedding(moon_chunks: List[MoonChunk], chunk_size: int = 500):
-    """Further chunk the moon content if needed for optimal embedding size."""
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    """Yield successive lists of ``size`` items from any iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def iter_chunks_for_embedding(moon_chunks: Iterable[MoonChunk], chunk_size: int = 500,
+                              chunk_overlap: int = 50) -> Iterator[Dict]:
+    """Generator version of chunk_for_embedding for streaming pipelines."""
     text_splitter = MarkdownHeaderTextSplitter(
         headers_to_split_on=[
             ("#", "moon_name"),
@@ -59,33 +101,98 @@ def chunk_for_embedding(moon_chunks: List[MoonChunk], chunk_size: int = 500):
         strip_headers=False
     )
     
-    final_chunks = []
+    # Chunk positions are counted per moon across the whole stream so IDs stay
+    # unique when a moon arrives in several blocks
+    next_index = defaultdict(int)
     
     for moon in moon_chunks:
-        # Split if content is too large
-        splits = text_splitter.split_text(moon.content)
+        # Every piece repeats the moon's header line so it embeds with its
+        # subject; reserve room for it inside the token budget
+        header = f"# {moon.moon_name}"
+        budget = max(chunk_size - count_tokens(header + "\n"), 1)
+        token_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=budget,
+            chunk_overlap=min(chunk_overlap, budget // 2),
+            length_function=count_tokens,
+            separators=["\n", ". ", " ", ""]
+        )
         
-        for split in splits:
-            # Preserve the original metadata while adding the split content
-            metadata = moon.metadata.copy()
-            metadata.update(split.metadata)
-            
-            final_chunks.append({
-                "text": split.page_content,
-                "metadata": metadata,
-                "source_url": moon.source_url
-            })
+        # Split on the moon header first, then down to the token budget
+        for split in text_splitter.split_text(moon.content):
+            for piece in token_splitter.split_text(split.page_content):
+                text = piece if piece.startswith(header) else f"{header}\n{piece}"
+                
+                # Preserve the original metadata while adding the split content
+                metadata = moon.metadata.copy()
+                metadata.update(split.metadata)
+                metadata["content_hash"] = content_hash(text)
+                metadata["token_count"] = count_tokens(text)
+                
+                index = next_index[moon.moon_name]
+                next_index[moon.moon_name] += 1
+                metadata["chunk_index"] = index
+                
+                yield {
+                    "id": chunk_id(moon.moon_name, index),
+                    "text": text,
+                    "metadata": metadata,
+                    "source_url": moon.source_url
+                }
+
+def chunk_for_embedding(moon_chunks: List[MoonChunk], chunk_size: int = 500, chunk_overlap: int = 50):
+    """Further chunk the moon content if needed for optimal embedding size.
+    
+    Args:
+        moon_chunks: Per-moon chunks from create_moon_chunks
+        chunk_size: Maximum tokens (cl100k_base) per chunk, header included
+        chunk_overlap: Tokens shared between consecutive chunks of the same moon
+    """
+    return list(iter_chunks_for_embedding(moon_chunks, chunk_size, chunk_overlap))
+
+def token_report(chunks: List[Dict], k: int = 4) -> Dict:
+    """Summarise the token distribution of embedding chunks.
     
-    return final_chunks
+    ``context_tokens_at_k`` estimates what the retriever's top-``k`` adds to
+    every GPT-4 prompt (the retriever returns 4 documents by default), which is
+    the number that drives generation latency and cost.
+    """
+    counts = pd.Series([chunk["metadata"]["token_count"] for chunk in chunks], dtype="int64")
+    if counts.empty:
+        return {"chunks": 0}
+    return {
+        "chunks": int(counts.size),
+        "total_tokens": int(counts.sum()),
+        "min": int(counts.min()),
+        "mean": float(counts.mean()),
+        "p50": float(counts.quantile(0.5)),
+        "p90": float(counts.quantile(0.9)),
+        "p99": float(counts.quantile(0.99)),
+        "max": int(counts.max()),
+        "context_tokens_at_k": float(counts.mean() * min(k, counts.size)),
+    }
 
 def main():
+    parser = argparse.ArgumentParser(description="Chunk the moon data and report token counts per chunk.")
+    parser.add_argument("--file", default="jupiter_moons.tsv")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[500],
+                        help="token budgets to compare, e.g. --chunk-sizes 128 256 500 1000")
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    args = parser.parse_args()
+    
     # Read and process the data
-    df = read_moons_data('jupiter_moons.tsv')
+    df = read_moons_data(args.file)
     moon_chunks = create_moon_chunks(df)
-    final_chunks = chunk_for_embedding(moon_chunks)
+    
+    print(f"{'chunk_size':>10} {'chunks':>7} {'total':>8} {'min':>5} {'mean':>7} {'p50':>6} "
+          f"{'p90':>6} {'p99':>6} {'max':>5} {'ctx@k=4':>8}")
+    for chunk_size in args.chunk_sizes:
+        final_chunks = chunk_for_embedding(moon_chunks, chunk_size, args.chunk_overlap)
+        report = token_report(final_chunks)
+        print(f"{chunk_size:>10} {report['chunks']:>7} {report['total_tokens']:>8} {report['min']:>5} "
+              f"{report['mean']:>7.1f} {report['p50']:>6.0f} {report['p90']:>6.0f} {report['p99']:>6.0f} "
+              f"{report['max']:>5} {report['context_tokens_at_k']:>8.0f}")
     
     # Print example chunk for verification
-    print(f"Created {len(final_chunks)} chunks")
     print("\nExample chunk:")
     print(final_chunks[0])
 
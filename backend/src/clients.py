@@ -0,0 +1,679 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Mapping, Optional
+
+import httpx
+
+try:
+    from .tokens import estimate_tokens
+except ImportError:
+    # Imported by the scripts in src/, outside the package
+    from tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = "gpt-4"
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# listener(client, event, seconds); event is "request", "connect" or "tls",
+# or "ratelimit_wait" and "throttled" with the model name as the client
+Listener = Callable[[str, str, float], None]
+
+
+class ConnectionStats:
+    """Requests, new connections and TLS handshakes seen by one client."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.tls_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, event: str, seconds: float = 0.0) -> None:
+        with self._lock:
+            if event == "request":
+                self.requests += 1
+            elif event == "connect":
+                self.connections += 1
+            elif event == "tls":
+                self.tls_handshakes += 1
+                self.tls_seconds += seconds
+        _notify(self.name, event, seconds)
+
+    def tracer(self) -> Callable[[str, dict], None]:
+        """httpcore trace callback for one request."""
+        started: Dict[str, float] = {}
+
+        def trace(event: str, info: dict) -> None:
+            step, _, phase = event.rpartition(".")
+            if phase == "started":
+                started[step] = time.perf_counter()
+            elif phase == "complete":
+                elapsed = time.perf_counter() - started.pop(step, time.perf_counter())
+                if step == "connection.connect_tcp":
+                    self.record("connect", elapsed)
+                elif step == "connection.start_tls":
+                    self.record("tls", elapsed)
+
+        return trace
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections,
+            "tls_handshakes": self.tls_handshakes,
+            "tls_seconds": round(self.tls_seconds, 3),
+            # Share of requests that went out on an already open connection
+            "reuse_rate": 1 - self.connections / self.requests if self.requests else None,
+        }
+
+
+_lock = threading.RLock()
+_clients: Dict[str, object] = {}
+_stats: Dict[str, ConnectionStats] = {}
+_listeners: List[Listener] = []
+_pid = None
+
+
+def add_listener(listener: Listener) -> None:
+    """Call ``listener(client, event, seconds)`` for every request, connect and TLS handshake."""
+    _listeners.append(listener)
+
+
+def connection_stats() -> dict:
+    return {name: stats.stats() for name, stats in _stats.items()}
+
+
+def _notify(client: str, event: str, seconds: float) -> None:
+    for listener in list(_listeners):
+        listener(client, event, seconds)
+
+
+def _shared(key: str, create: Callable[[], object]):
+    """Return the process's instance of ``key``, creating it on first use.
+
+    Clients are shared so that connections are reused: every ChatOpenAI and
+    OpenAIEmbeddings goes through one pooled httpx client, and Pinecone
+    index handles keep their urllib3 pools open. Instances inherited through
+    fork are discarded, since their sockets and threads belong to the parent.
+    """
+    global _pid
+    with _lock:
+        if _pid != os.getpid():
+            _clients.clear()
+            _stats.clear()
+            _pid = os.getpid()
+        if key not in _clients:
+            _clients[key] = create()
+        return _clients[key]
+
+
+def _stats_for(name: str) -> ConnectionStats:
+    if name not in _stats:
+        _stats[name] = ConnectionStats(name)
+    return _stats[name]
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("HTTP_TIMEOUT", "60")),
+        connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    )
+
+
+def _http_settings() -> dict:
+    http2 = os.getenv("HTTP2", "on").lower() != "off"
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.info("h2 is not installed, pooled HTTP clients fall back to HTTP/1.1")
+        http2 = False
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+        ),
+        "timeout": _timeout(),
+    }
+
+
+class TokenBucket:
+    """A budget of ``per_minute`` units, refilled continuously.
+
+    Reservations may take the level below zero. That debt is the queue in
+    front of the next caller: it waits until the refill has paid it back.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A single request bigger than the whole budget waits for a full bucket, not forever
+        amount = min(amount, self.capacity)
+        return max(0.0, amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def resize(self, per_minute: float, now: float) -> None:
+        self._refill(now)
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+    def cap(self, remaining: float, now: float) -> None:
+        """Lower the level to what upstream says is left; other processes share the quota."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+def parse_reset(value: str) -> Optional[float]:
+    """Seconds in an OpenAI reset header such as "20ms", "1.5s" or "6m0s"."""
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value or "")
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+class UpstreamDeadlineError(Exception):
+    """A call the rate limit would hold for ``wait`` seconds, past its request's deadline."""
+
+    def __init__(self, message: str, wait: float):
+        super().__init__(message)
+        self.wait = wait
+
+
+class UpstreamLimiter:
+    """Requests and tokens per minute for one OpenAI model, shared by everything in the process.
+
+    Every request to the model reserves one request and its estimated tokens
+    and waits until both buckets have room, so bursts are spread out instead
+    of being answered with 429s. The limits follow the x-ratelimit-* headers
+    of each response, and a 429 blocks the model until its Retry-After.
+    ``response_seconds`` tracks how long the model takes to answer, so a
+    reservation with a deadline is refused when the answer could not arrive
+    by then.
+    """
+
+    def __init__(self, model: str, requests_per_minute: float, tokens_per_minute: float):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+        self.response_seconds = 0.0
+        self.admitted = 0
+        self.throttled = 0
+        self.refused = 0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _state(self) -> Iterator[float]:
+        """Hold the buckets for one update; yields the current time on the buckets' clock."""
+        with self._lock:
+            yield time.monotonic()
+
+    def reserve(self, tokens: float, deadline: Optional[float] = None) -> float:
+        """Reserve one request and ``tokens`` tokens; return the seconds to wait before sending.
+
+        With a ``deadline`` (time.monotonic()), nothing is reserved and
+        UpstreamDeadlineError is raised if the wait plus ``response_seconds``
+        would end after it.
+        """
+        with self._state() as now:
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now), self.blocked_until - now)
+            self._check_deadline(wait, deadline)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.admitted += 1
+            self.waited_seconds += wait
+        if wait > 0:
+            _notify(self.model, "ratelimit_wait", wait)
+        return wait
+
+    def wait_reserved(self, ready_at: float, deadline: float) -> float:
+        """Seconds until a call reserved earlier may be sent at ``ready_at``, checked against ``deadline``."""
+        wait = max(0.0, ready_at - time.monotonic())
+        self._check_deadline(wait, deadline)
+        return wait
+
+    def _check_deadline(self, wait: float, deadline: Optional[float]) -> None:
+        if deadline is not None and time.monotonic() + wait + self.response_seconds > deadline:
+            self.refused += 1
+            raise UpstreamDeadlineError(f"{self.model} rate limit would delay the answer by {wait:.1f}s", wait)
+
+    def refund(self, tokens: float, requests: int = 1) -> None:
+        """Give back a reservation whose request was never sent, or the tokens it over-estimated."""
+        with self._state() as now:
+            for bucket, amount in ((self.requests, requests), (self.tokens, tokens)):
+                bucket._refill(now)
+                bucket.level = min(bucket.capacity, bucket.level + min(amount, bucket.capacity))
+
+    def observe(self, status_code: int, headers: Mapping[str, str], seconds: Optional[float] = None) -> None:
+        """Adapt to the rate-limit headers of a response from this model, received ``seconds`` after sending."""
+        if seconds is not None and status_code < 400:
+            # Moving average, so one slow answer does not shed the next requests
+            self.response_seconds = seconds if not self.response_seconds else (
+                0.8 * self.response_seconds + 0.2 * seconds
+            )
+        with self._state() as now:
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                try:
+                    limit = headers.get(f"x-ratelimit-limit-{kind}")
+                    if limit is not None and float(limit) > 0 and float(limit) != bucket.capacity:
+                        logger.info(f"{self.model}: upstream limit is {limit} {kind} per minute")
+                        bucket.resize(float(limit), now)
+                    remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                    if remaining is not None:
+                        bucket.cap(float(remaining), now)
+                except ValueError:
+                    continue
+            if status_code == 429:
+                self.throttled += 1
+                retry_after = headers.get("retry-after")
+                try:
+                    delay = float(retry_after) if retry_after is not None else None
+                except ValueError:
+                    delay = None
+                if delay is None:
+                    delay = parse_reset(headers.get("x-ratelimit-reset-requests", "")) or 1.0
+                self.blocked_until = max(self.blocked_until, now + delay)
+        if status_code == 429:
+            _notify(self.model, "throttled", 0.0)
+
+    def stats(self) -> dict:
+        with self._state() as now:
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                "requests_per_minute": self.requests.capacity,
+                "tokens_per_minute": self.tokens.capacity,
+                "requests_available": round(self.requests.level, 1),
+                "tokens_available": round(self.tokens.level),
+                "blocked_for": round(max(0.0, self.blocked_until - now), 3),
+                "response_seconds": round(self.response_seconds, 3),
+                "admitted": self.admitted,
+                "throttled": self.throttled,
+                "refused": self.refused,
+                "waited_seconds": round(self.waited_seconds, 3),
+            }
+
+
+class SQLiteUpstreamLimiter(UpstreamLimiter):
+    """UpstreamLimiter whose buckets live in a SQLite file shared by every worker process.
+
+    Each update is one short write transaction that loads the model's row,
+    applies the change and writes it back, so N workers together stay within
+    the quota instead of each spending all of it. The buckets run on the
+    wall clock, since monotonic clocks are not comparable between
+    processes. The counters and ``response_seconds`` stay per process.
+    """
+
+    def __init__(self, path: str, model: str, requests_per_minute: float, tokens_per_minute: float):
+        super().__init__(model, requests_per_minute, tokens_per_minute)
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Transactions are opened explicitly; workers wait for the write lock rather than fail
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " model TEXT PRIMARY KEY,"
+            " requests_capacity REAL NOT NULL,"
+            " requests_level REAL NOT NULL,"
+            " tokens_capacity REAL NOT NULL,"
+            " tokens_level REAL NOT NULL,"
+            " blocked_until REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        # The first worker to start sets the budget; the others join it
+        self._conn.execute(
+            "INSERT OR IGNORE INTO rate_limits VALUES (?, ?, ?, ?, ?, 0, ?)",
+            (model, self.requests.capacity, self.requests.capacity, self.tokens.capacity, self.tokens.capacity,
+             time.time())
+        )
+
+    @contextmanager
+    def _state(self) -> Iterator[float]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT requests_capacity, requests_level, tokens_capacity, tokens_level, blocked_until,"
+                    " updated_at FROM rate_limits WHERE model = ?",
+                    (self.model,)
+                ).fetchone()
+                (self.requests.capacity, self.requests.level, self.tokens.capacity, self.tokens.level,
+                 self.blocked_until, updated_at) = row
+                self.requests._updated = self.tokens._updated = updated_at
+                now = max(time.time(), updated_at)
+                self.requests._refill(now)
+                self.tokens._refill(now)
+                yield now
+                self._conn.execute(
+                    "UPDATE rate_limits SET requests_capacity = ?, requests_level = ?, tokens_capacity = ?,"
+                    " tokens_level = ?, blocked_until = ?, updated_at = ? WHERE model = ?",
+                    (self.requests.capacity, self.requests.level, self.tokens.capacity, self.tokens.level,
+                     self.blocked_until, now, self.model)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+_rate_limit_path: Optional[str] = None
+
+
+def share_rate_limits(path: Optional[str]) -> None:
+    """Keep every model's rate-limit buckets in the SQLite file at ``path``, shared by the processes using it.
+
+    Call before the first OpenAI request; None goes back to per-process buckets.
+    """
+    global _rate_limit_path
+    _rate_limit_path = path
+
+
+def rate_limiting_enabled() -> bool:
+    return os.getenv("UPSTREAM_RATE_LIMITING", "on").lower() != "off"
+
+
+def completion_token_estimate() -> int:
+    """Tokens assumed for an answer whose length is not capped with max_tokens."""
+    return int(os.getenv("OPENAI_COMPLETION_TOKEN_ESTIMATE", "500"))
+
+
+def rate_limiter(model: str) -> UpstreamLimiter:
+    """The process's limiter for ``model``.
+
+    Starts from OPENAI_EMBEDDING_RPM/TPM or OPENAI_CHAT_RPM/TPM and adapts
+    to the limits OpenAI reports. After ``share_rate_limits`` the buckets
+    are shared with the other processes using the same file.
+    """
+    kind = "EMBEDDING" if "embedding" in model else "CHAT"
+    defaults = {"EMBEDDING": ("3000", "1000000"), "CHAT": ("500", "30000")}[kind]
+    requests_per_minute = float(os.getenv(f"OPENAI_{kind}_RPM", defaults[0]))
+    tokens_per_minute = float(os.getenv(f"OPENAI_{kind}_TPM", defaults[1]))
+    if _rate_limit_path:
+        return _shared(f"ratelimit:{model}", lambda: SQLiteUpstreamLimiter(
+            _rate_limit_path, model, requests_per_minute, tokens_per_minute
+        ))
+    return _shared(f"ratelimit:{model}", lambda: UpstreamLimiter(model, requests_per_minute, tokens_per_minute))
+
+
+def rate_limiters() -> dict:
+    return {key.split(":", 1)[1]: limiter.stats() for key, limiter in list(_clients.items())
+            if key.startswith("ratelimit:")}
+
+
+def _request_cost(request: httpx.Request) -> Optional[tuple]:
+    """``(model, tokens)`` for an OpenAI chat or embeddings request, None for anything else."""
+    path = request.url.path
+    if not path.endswith(("/chat/completions", "/embeddings")):
+        return None
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return None
+    if "messages" in body:
+        prompt = sum(estimate_tokens(str(message.get("content") or "")) for message in body["messages"])
+        completion = body.get("max_completion_tokens") or body.get("max_tokens") or completion_token_estimate()
+        return body.get("model", CHAT_MODEL), prompt + int(completion)
+    # langchain sends embedding inputs as token id lists, the SDK as strings
+    inputs = body.get("input") or []
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    tokens = sum(len(item) if isinstance(item, list) else estimate_tokens(item) for item in inputs)
+    return body.get("model", EMBEDDING_MODEL), tokens
+
+
+class UpstreamBudget:
+    """The OpenAI side of one API request: its deadline and the call reserved when it was admitted.
+
+    Made current by ``reserve_upstream``. Until ``release_upstream`` closes
+    it, the request's calls must be answerable by ``deadline``: one that the
+    rate limit would hold longer is answered with a 429 on the spot instead
+    of being sent, and so is an upstream 429 whose Retry-After runs past it.
+    """
+
+    def __init__(self, model: str, tokens: float, deadline: float, ready_at: float):
+        self.model = model
+        self.tokens = tokens
+        self.deadline = deadline
+        # When the reserved call may be sent; None once it has been used
+        self.ready_at: Optional[float] = ready_at
+        self.closed = False
+
+
+_budget: ContextVar[Optional[UpstreamBudget]] = ContextVar("upstream_budget", default=None)
+
+
+def reserve_upstream(model: str, tokens: float, deadline: float) -> UpstreamBudget:
+    """Reserve the first call to ``model`` for the current request and bind it to ``deadline``.
+
+    Reserving when the request is admitted, rather than when it reaches
+    OpenAI, counts every queued request against the quota at once. Raises
+    UpstreamDeadlineError when the answer could not arrive by the deadline.
+    """
+    limiter = rate_limiter(model)
+    wait = limiter.reserve(tokens, deadline=deadline)
+    budget = UpstreamBudget(model, tokens, deadline, time.monotonic() + wait)
+    _budget.set(budget)
+    return budget
+
+
+def release_upstream(budget: Optional[UpstreamBudget]) -> None:
+    """End a request's budget, refunding its reservation if the call was never sent."""
+    if budget is None or budget.closed:
+        return
+    budget.closed = True
+    if budget.ready_at is not None:
+        rate_limiter(budget.model).refund(budget.tokens)
+
+
+def _upstream_wait(model: str, tokens: float) -> float:
+    """Seconds to hold a call to ``model``; raises UpstreamDeadlineError if it would miss its request's deadline."""
+    limiter = rate_limiter(model)
+    budget = _budget.get()
+    if budget is None or budget.closed:
+        return limiter.reserve(tokens)
+    if budget.model != model or budget.ready_at is None:
+        return limiter.reserve(tokens, deadline=budget.deadline)
+    wait = limiter.wait_reserved(budget.ready_at, budget.deadline)
+    budget.ready_at = None
+    if tokens < budget.tokens:
+        # Admission had to assume the largest context; the prompt is known now
+        limiter.refund(budget.tokens - tokens, requests=0)
+    return wait
+
+
+def _refusal(request: httpx.Request, error: UpstreamDeadlineError) -> httpx.Response:
+    # Shaped like OpenAI's own 429; x-should-retry stops the SDK retrying it
+    return httpx.Response(
+        429,
+        headers={"retry-after": f"{max(error.wait, 1.0):.0f}", "x-should-retry": "false"},
+        json={"error": {"message": str(error), "type": "requests", "code": "rate_limit_exceeded"}},
+        request=request,
+        extensions={"upstream_refused": True},
+    )
+
+
+def _observe(model: str, response: httpx.Response, seconds: float) -> None:
+    rate_limiter(model).observe(response.status_code, response.headers, seconds)
+    budget = _budget.get()
+    if response.status_code == 429 and budget is not None and not budget.closed:
+        # Waiting out a Retry-After that ends past the deadline only delays the 503
+        try:
+            retry_after = float(response.headers.get("retry-after", "0"))
+        except ValueError:
+            retry_after = 0.0
+        if time.monotonic() + retry_after > budget.deadline:
+            response.headers["x-should-retry"] = "false"
+
+
+def was_refused(error: Exception) -> bool:
+    """True for the 429 answered locally because a call would have missed its request's deadline."""
+    response = getattr(error, "response", None)
+    return bool(getattr(response, "extensions", {}).get("upstream_refused"))
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Holds each OpenAI call for its reservation from the model's UpstreamLimiter, then sends it."""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        cost = _request_cost(request) if rate_limiting_enabled() else None
+        if not cost:
+            return self.transport.handle_request(request)
+        try:
+            wait = _upstream_wait(*cost)
+        except UpstreamDeadlineError as e:
+            return _refusal(request, e)
+        if wait > 0:
+            time.sleep(wait)
+        start = time.monotonic()
+        response = self.transport.handle_request(request)
+        _observe(cost[0], response, time.monotonic() - start)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """RateLimitedTransport for the async client; waits without blocking the event loop."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        cost = _request_cost(request) if rate_limiting_enabled() else None
+        if not cost:
+            return await self.transport.handle_async_request(request)
+        try:
+            wait = _upstream_wait(*cost)
+        except UpstreamDeadlineError as e:
+            return _refusal(request, e)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        start = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        _observe(cost[0], response, time.monotonic() - start)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def http_client(name: str = "openai") -> httpx.Client:
+    """The process's pooled synchronous httpx client for ``name``."""
+    def create():
+        stats = _stats_for(name)
+        settings = _http_settings()
+        transport = RateLimitedTransport(
+            httpx.HTTPTransport(http2=settings.pop("http2"), limits=settings.pop("limits"))
+        )
+
+        def on_request(request: httpx.Request) -> None:
+            stats.record("request")
+            request.extensions["trace"] = stats.tracer()
+
+        return httpx.Client(transport=transport, event_hooks={"request": [on_request]}, **settings)
+
+    return _shared(f"{name}:sync", create)
+
+
+def async_http_client(name: str = "openai") -> httpx.AsyncClient:
+    """The process's pooled async httpx client for ``name``.
+
+    Its connections belong to the event loop that opened them, so callers
+    should drive it from a single loop (as the API server and
+    ``asyncio.run`` of a whole batch do).
+    """
+    def create():
+        stats = _stats_for(name)
+        settings = _http_settings()
+        transport = AsyncRateLimitedTransport(
+            httpx.AsyncHTTPTransport(http2=settings.pop("http2"), limits=settings.pop("limits"))
+        )
+
+        async def on_request(request: httpx.Request) -> None:
+            stats.record("request")
+            trace = stats.tracer()
+
+            async def async_trace(event: str, info: dict) -> None:
+                trace(event, info)
+
+            request.extensions["trace"] = async_trace
+
+        return httpx.AsyncClient(transport=transport, event_hooks={"request": [on_request]}, **settings)
+
+    return _shared(f"{name}:async", create)
+
+
+def _openai_settings(kwargs: dict) -> dict:
+    return {
+        "http_client": http_client(),
+        "http_async_client": async_http_client(),
+        # langchain passes its own timeout to the SDK, which would replace the client's
+        "timeout": _timeout(),
+        "max_retries": int(os.getenv("OPENAI_MAX_RETRIES", "3")),
+        **kwargs,
+    }
+
+
+def chat_model(**kwargs):
+    """A ChatOpenAI that shares the process's connection pool."""
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(**_openai_settings(kwargs))
+
+
+def openai_embeddings(**kwargs):
+    """An OpenAIEmbeddings that shares the process's connection pool."""
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(**_openai_settings(kwargs))
+
+
+def pinecone_client():
+    """The process's Pinecone client."""
+    def create():
+        from pinecone import Pinecone
+        return Pinecone(
+            api_key=os.getenv("PINECONE_API_KEY"),
+            pool_threads=int(os.getenv("PINECONE_POOL_THREADS", "4"))
+        )
+
+    return _shared("pinecone", create)
+
+
+def pinecone_index(index_name: str):
+    """The process's handle on ``index_name``, reused so its connections stay open."""
+    return _shared(
+        f"pinecone:{index_name}",
+        lambda: pinecone_client().Index(index_name, pool_threads=int(os.getenv("PINECONE_POOL_THREADS", "4")))
+    )
@@ -0,0 +1,159 @@
+import logging
+import math
+import re
+from collections import Counter
+from typing import List, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from .bm25 import tokenize
+from .hybrid import document_key
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by can do does did for from has have how i in is it its me of on or tell "
+    "that the their there this to was were what when where which who why will with you about".split()
+)
+
+
+def split_units(text: str) -> Tuple[str, List[str]]:
+    """Split a chunk into its ``# Moon`` header and sentence units.
+
+    A "Title:" line is kept with the first sentence after it, so a selected
+    sentence still says which document it came from.
+    """
+    header = ""
+    units = []
+    title = ""
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("# ") and not header and not units:
+            header = line
+            continue
+        if line.endswith(":"):
+            title = line + " "
+            continue
+        for sentence in SENTENCE_END.split(line):
+            if sentence:
+                units.append(title + sentence)
+                title = ""
+    return header, units
+
+
+class ContextCompressor:
+    """Shrink retrieved documents to the sentences that matter for the question.
+
+    Documents and sentences repeated across chunks (chunk overlap, or the
+    same chunk from two retrievers) are dropped. Each remaining sentence is
+    scored by the idf-weighted overlap of its terms with the question, idf
+    taken over the sentences of this request, and divided by the square root
+    of its length. The best sentences are kept until ``max_tokens`` is
+    reached, then put back in document order under their moon header. A
+    question sharing no terms with any sentence keeps each document's
+    leading sentences instead. No model calls are made.
+    """
+
+    def __init__(self, max_tokens: int = 800):
+        self.max_tokens = max_tokens
+
+    def compress(self, documents: List[Document], question: str) -> List[Document]:
+        seen_documents, seen_sentences = set(), set()
+        parsed = []
+        for doc in documents:
+            key = document_key(doc)
+            if key in seen_documents:
+                continue
+            seen_documents.add(key)
+            header, units = split_units(doc.page_content)
+            fresh = []
+            for unit in units:
+                normalized = " ".join(tokenize(unit))
+                if normalized and normalized not in seen_sentences:
+                    seen_sentences.add(normalized)
+                    fresh.append(unit)
+            parsed.append((doc, header, fresh))
+
+        # (doc position, unit position, text, terms)
+        candidates = [
+            (d, u, unit, set(tokenize(unit)))
+            for d, (_, _, units) in enumerate(parsed)
+            for u, unit in enumerate(units)
+        ]
+        query_terms = set(tokenize(question)) - STOP_WORDS
+        document_frequency = Counter(term for *_, terms in candidates for term in terms & query_terms)
+
+        def score(candidate) -> float:
+            terms = candidate[3]
+            overlap = sum(math.log(1 + len(candidates) / document_frequency[t]) for t in terms & query_terms)
+            return overlap / math.sqrt(len(terms) or 1)
+
+        scored = [(score(c), c) for c in candidates]
+        if any(s > 0 for s, _ in scored):
+            scored = [(s, c) for s, c in scored if s > 0]
+            # Best first; ties go to higher-ranked documents and earlier sentences
+            scored.sort(key=lambda item: (-item[0], item[1][0], item[1][1]))
+        else:
+            scored.sort(key=lambda item: (item[1][1], item[1][0]))
+
+        budget = self.max_tokens
+        with_header = set()
+        kept = set()
+        for _, (d, u, unit, _) in scored:
+            cost = estimate_tokens(unit)
+            # A document's header is paid for with its first kept sentence
+            header = parsed[d][1]
+            if header and d not in with_header:
+                cost += estimate_tokens(header)
+            if cost > budget:
+                continue
+            budget -= cost
+            with_header.add(d)
+            kept.add((d, u))
+
+        compressed = []
+        for d, (doc, header, units) in enumerate(parsed):
+            sentences = [unit for u, unit in enumerate(units) if (d, u) in kept]
+            if sentences:
+                text = "\n".join(([header] if header else []) + sentences)
+                compressed.append(Document(id=doc.id, page_content=text, metadata=dict(doc.metadata)))
+        return compressed
+
+
+class CompressingRetriever(BaseRetriever):
+    """Retriever that passes another retriever's documents through a ContextCompressor.
+
+    Logs the context tokens before and after compression for every question.
+    """
+
+    base_retriever: BaseRetriever
+    compressor: ContextCompressor
+
+    def _compress(self, documents: List[Document], query: str) -> List[Document]:
+        compressed = self.compressor.compress(documents, query)
+        before = sum(estimate_tokens(doc.page_content) for doc in documents)
+        after = sum(estimate_tokens(doc.page_content) for doc in compressed)
+        logger.info(f"Context compressed from {before} to {after} tokens ({before - after} saved)")
+        return compressed
+
+    # The base retriever runs as a child of this one so events it sends (such
+    # as reranking's) reach the callbacks; the stage timing folds nested
+    # retriever runs into a single "retrieve" span that includes compression
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        documents = self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+        return self._compress(documents, query)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        documents = await self.base_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+        return self._compress(documents, query)
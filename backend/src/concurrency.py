@@ -0,0 +1,203 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class QueueFullError(Exception):
+    """Raised when a request arrives while every slot and queue position is taken."""
+
+
+class LoadShedError(Exception):
+    """Raised when a request could not be served within its latency budget.
+
+    ``retry_after`` is the number of seconds after which capacity is
+    expected; ``reason`` labels what ran out.
+    """
+
+    def __init__(self, message: str, retry_after: float, reason: str = "overloaded"):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """Bound the number of chain executions running at once.
+
+    Up to ``max_concurrency`` callers run at the same time and up to
+    ``max_queue`` more wait for a slot. Anything beyond that is rejected
+    immediately with QueueFullError instead of piling up on the event loop.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max(0, max_queue)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._active = 0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """Wait for a slot; every successful call must be paired with release().
+
+        With ``timeout``, a caller still queued after that many seconds gets
+        a LoadShedError instead of a slot.
+        """
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            raise QueueFullError(
+                f"{self._active} requests in progress and {self._waiting} queued"
+            )
+
+        self._waiting += 1
+        try:
+            # A free slot is taken directly, without wait_for's extra task
+            if timeout is None or not self._semaphore.locked():
+                await self._semaphore.acquire()
+            else:
+                await asyncio.wait_for(self._semaphore.acquire(), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            raise LoadShedError(f"No slot free within {timeout:.1f}s", retry_after=max(1.0, timeout),
+                                reason="queue_timeout")
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+
+    def release(self) -> None:
+        self._active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        await self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "waiting": self._waiting,
+        }
+
+
+class SingleFlight:
+    """Run one execution per key at a time and share its outcome.
+
+    A caller arriving while an execution with the same key is in flight
+    awaits that execution instead of starting its own, and receives the
+    same result or the same exception. The execution runs as its own task,
+    so a caller that goes away (and is cancelled) does not cancel it for
+    the others.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.coalesced = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True when another caller's execution was joined."""
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            # Mark the exception as retrieved even if every caller has gone away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
+
+
+class FileSlotLimiter:
+    """ConcurrencyLimiter without a queue whose slots are shared by every worker process.
+
+    Each slot is a lock file under ``directory``, held with ``flock`` while
+    in use, so ``max_concurrency`` applies to the whole deployment rather
+    than to each worker. The kernel drops the lock if a worker dies, so a
+    crashed request never leaks its slot. Unix only.
+    """
+
+    def __init__(self, directory: str, name: str, max_concurrency: int):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        import fcntl
+        self._fcntl = fcntl
+        self.max_concurrency = max_concurrency
+        self.max_queue = 0
+        os.makedirs(directory, exist_ok=True)
+        self._paths = [os.path.join(directory, f"{name}.{i}.lock") for i in range(max_concurrency)]
+        self._held: List[int] = []
+
+    @property
+    def active(self) -> int:
+        """Slots held across all workers."""
+        return sum(1 for path in self._paths if self._is_locked(path))
+
+    def _is_locked(self, path: str) -> bool:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._fcntl.flock(fd, self._fcntl.LOCK_SH | self._fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+
+    async def acquire(self) -> None:
+        """Take a free slot or raise QueueFullError; pair with release()."""
+        for path in self._paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                self._fcntl.flock(fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            self._held.append(fd)
+            return
+        raise QueueFullError(f"all {self.max_concurrency} slots are in use across workers")
+
+    def release(self) -> None:
+        # Slots are interchangeable, so any one this process holds will do
+        fd = self._held.pop()
+        self._fcntl.flock(fd, self._fcntl.LOCK_UN)
+        os.close(fd)
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": 0,
+            "active": self.active,
+            "waiting": 0,
+            "shared": True,
+        }
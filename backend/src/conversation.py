@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .models import Message
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONVERSATION_PATH = os.getenv(
+    "CONVERSATION_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conversations.sqlite")
+)
+
+Summarizer = Callable[[str, List[Message]], Awaitable[str]]
+
+
+@dataclass
+class Conversation:
+    summary: str = ""
+    messages: List[Message] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+
+class InMemoryConversationStore:
+    """Conversations kept in process memory.
+
+    The least recently used session is evicted once ``max_sessions`` is
+    reached, and sessions idle for longer than ``ttl_seconds`` are dropped
+    when next read.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 86400):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+
+    def _is_expired(self, conversation: Conversation, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - conversation.updated_at > self.ttl_seconds
+
+    def get(self, session_id: str) -> Optional[Conversation]:
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is None:
+                return None
+            if self._is_expired(conversation, time.time()):
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return Conversation(conversation.summary, list(conversation.messages), conversation.updated_at)
+
+    def put(self, session_id: str, conversation: Conversation) -> None:
+        conversation.updated_at = time.time()
+        with self._lock:
+            self._sessions[session_id] = conversation
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteConversationStore:
+    """Conversations persisted in a SQLite file, so they survive restarts.
+
+    One row per session holding the rolling summary and the recent messages
+    as JSON. Sessions idle for longer than ``ttl_seconds`` are deleted.
+    """
+
+    def __init__(self, path: str = DEFAULT_CONVERSATION_PATH, ttl_seconds: float = 86400):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " session_id TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL,"
+            " messages TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS conversations_updated_at ON conversations (updated_at)"
+        )
+        self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[Conversation]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, messages, updated_at FROM conversations WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        summary, messages, updated_at = row
+        if self.ttl_seconds > 0 and time.time() - updated_at > self.ttl_seconds:
+            self.delete(session_id)
+            return None
+        return Conversation(
+            summary=summary,
+            messages=[Message(role=m["role"], content=m["content"]) for m in json.loads(messages)],
+            updated_at=updated_at
+        )
+
+    def put(self, session_id: str, conversation: Conversation) -> None:
+        conversation.updated_at = time.time()
+        messages = json.dumps([{"role": m.role, "content": m.content} for m in conversation.messages])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversations (session_id, summary, messages, updated_at)"
+                " VALUES (?, ?, ?, ?)",
+                (session_id, conversation.summary, messages, conversation.updated_at)
+            )
+            if self.ttl_seconds > 0:
+                self._conn.execute(
+                    "DELETE FROM conversations WHERE updated_at < ?",
+                    (conversation.updated_at - self.ttl_seconds,)
+                )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM conversations WHERE session_id = ?", (session_id,)
+            ).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "sessions": sessions,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class ConversationMemory:
+    """Chat history per session, bounded by a token budget.
+
+    ``history`` returns the rolling summary plus as many of the most recent
+    messages as fit in ``max_tokens``, so the prompt stays the same size no
+    matter how long the conversation gets. Once the stored messages exceed
+    the budget, ``compact`` folds the oldest ones into the summary with
+    ``summarize`` until the rest fit in half of it; that runs after the
+    answer has been sent, off the request path. Without a summarizer, or if
+    it fails, the oldest messages are simply dropped.
+    """
+
+    def __init__(self, store, max_tokens: int = 1000, summarize: Optional[Summarizer] = None):
+        self.store = store
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.summaries = 0
+        self.summary_failures = 0
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def _tokens(self, message: Message) -> int:
+        # A few tokens of per-message overhead in the chat format
+        return estimate_tokens(message.content) + 4
+
+    def _total_tokens(self, messages: List[Message]) -> int:
+        return sum(self._tokens(message) for message in messages)
+
+    def exists(self, session_id: str) -> bool:
+        return self.store.get(session_id) is not None
+
+    def seed(self, session_id: str, messages: List[Message]) -> None:
+        """Start a session from a transcript the client sent along."""
+        messages = [Message(role=m.role, content=m.content) for m in messages]
+        self.store.put(session_id, Conversation(messages=messages))
+
+    def history(self, session_id: str) -> List[Tuple[str, str]]:
+        """The chat history to prompt with, as ``(role, content)`` pairs."""
+        conversation = self.store.get(session_id)
+        if conversation is None:
+            return []
+
+        history = []
+        budget = self.max_tokens
+        if conversation.summary:
+            summary = f"Summary of the earlier conversation: {conversation.summary}"
+            budget -= estimate_tokens(summary)
+            history.append(("system", summary))
+
+        recent = []
+        for message in reversed(conversation.messages):
+            budget -= self._tokens(message)
+            if budget < 0:
+                break
+            recent.append((message.role, message.content))
+        return history + recent[::-1]
+
+    def append(self, session_id: str, question: str, answer: str) -> bool:
+        """Record a question and its answer. Returns True when the session needs compacting."""
+        conversation = self.store.get(session_id) or Conversation()
+        conversation.messages.append(Message(role="user", content=question))
+        conversation.messages.append(Message(role="assistant", content=answer))
+        self.store.put(session_id, conversation)
+        return self._total_tokens(conversation.messages) > self.max_tokens
+
+    def schedule_compaction(self, session_id: str) -> None:
+        """Compact the session in the background, at most once at a time."""
+        if session_id in self._pending:
+            return
+        task = asyncio.get_running_loop().create_task(self.compact(session_id))
+        self._pending[session_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(session_id, None))
+
+    async def compact(self, session_id: str) -> None:
+        conversation = self.store.get(session_id)
+        if conversation is None:
+            return
+
+        # Fold whole turns from the front until the rest fits in half the budget
+        remaining = self._total_tokens(conversation.messages)
+        fold = 0
+        while fold < len(conversation.messages) and remaining > self.max_tokens // 2:
+            remaining -= self._tokens(conversation.messages[fold])
+            fold += 1
+        if fold % 2 and fold < len(conversation.messages):
+            remaining -= self._tokens(conversation.messages[fold])
+            fold += 1
+        if fold == 0:
+            return
+
+        folded = conversation.messages[:fold]
+        summary = conversation.summary
+        if self.summarize is not None:
+            try:
+                summary = await self.summarize(conversation.summary, folded)
+                self.summaries += 1
+            except Exception as e:
+                self.summary_failures += 1
+                logger.warning(f"Could not summarize conversation {session_id}, dropping old turns: {str(e)}")
+
+        # Turns may have been appended while the summary was written; keep them
+        latest = self.store.get(session_id)
+        if latest is None:
+            return
+        latest.summary = summary
+        latest.messages = latest.messages[fold:]
+        self.store.put(session_id, latest)
+
+    def delete(self, session_id: str) -> bool:
+        return self.store.delete(session_id)
+
+    def stats(self) -> dict:
+        return {
+            **self.store.stats(),
+            "max_tokens": self.max_tokens,
+            "summarizer": self.summarize is not None,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "compacting": len(self._pending),
+        }
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "embedding_cache.sqlite")
+)
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an Embeddings object with a persistent SQLite cache.
+
+    Vectors are keyed on the SHA-256 of the model name plus the text and stored
+    as raw float32 blobs, so re-embedding an unchanged corpus or a repeated
+    question costs no API calls. Only texts missing from the cache are sent to
+    the wrapped embeddings, in a single batch.
+    """
+
+    def __init__(self, underlying: Embeddings, cache_path: str = DEFAULT_CACHE_PATH,
+                 model_name: Optional[str] = None):
+        self.underlying = underlying
+        self.model_name = model_name or getattr(underlying, "model", None) or type(underlying).__name__
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _load(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _save(self, keys: List[str], vectors: List[List[float]]) -> None:
+        rows = []
+        for key, vector in zip(keys, vectors):
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((key, self.model_name, array.shape[0], array.tobytes()))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def _partition(self, texts: List[str]):
+        keys = [self._key(text) for text in texts]
+        cached = self._load(list(set(keys)))
+        missing = list(dict.fromkeys(key for key in keys if key not in cached))
+        self.hits += len(keys) - sum(1 for key in keys if key not in cached)
+        self.misses += len(missing)
+        return keys, cached, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._partition(texts)
+        if missing:
+            text_for_key = dict(zip(keys, texts))
+            vectors = self.underlying.embed_documents([text_for_key[key] for key in missing])
+            self._save(missing, vectors)
+            cached.update(zip(missing, vectors))
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = self._load([key])
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+        self.misses += 1
+        vector = self.underlying.embed_query(text)
+        self._save([key], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._partition(texts)
+        if missing:
+            text_for_key = dict(zip(keys, texts))
+            vectors = await self.underlying.aembed_documents([text_for_key[key] for key in missing])
+            self._save(missing, vectors)
+            cached.update(zip(missing, vectors))
+        return [list(cached[key]) for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = self._load([key])
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+        self.misses += 1
+        vector = await self.underlying.aembed_query(text)
+        self._save([key], [vector])
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "model": self.model_name,
+            "path": self.cache_path,
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,16 +1,21 @@
-from pinecone import Pinecone, ServerlessSpec
+from pinecone import ServerlessSpec
 from dotenv import load_dotenv
-import os
-from chunk import read_moons_data, create_moon_chunks, chunk_for_embedding
+import argparse
+from typing import Dict, Iterable, List, Optional
+from clients import pinecone_client, pinecone_index
+from chunk import iter_moon_chunks, iter_chunks_for_embedding
 from main import create_embeddings
+from pipeline import run_pipeline, PipelineReport
 
 # Load environment variables
 load_dotenv()
 
+NAMESPACE = "moonvector"
+
 def init_pinecone():
     """Initialize Pinecone client and create index if it doesn't exist."""
     
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    pc = pinecone_client()
     
     # Index configuration
     INDEX_NAME = "jupitermoons-2"
@@ -33,47 +38,128 @@ def init_pinecone():
         print(f"Created new index: {INDEX_NAME}")
     
     # Get the index
-    index = pc.Index(INDEX_NAME)
-    return index
+    return pinecone_index(INDEX_NAME)
+
+def upsert_documents(index, chunks: Iterable[Dict], embeddings, namespace: Optional[str] = None,
+                     embed_workers: int = 4, upsert_workers: int = 2) -> PipelineReport:
+    """Embed and upsert documents into Pinecone index.
+    
+    ``chunks`` may be any iterable, including the generator from
+    chunk.iter_chunks_for_embedding. Embedding and upserting run concurrently
+    through pipeline.run_pipeline, so only a few batches are in flight at once.
+    """
+    report = run_pipeline(
+        chunks, embeddings, index,
+        namespace=namespace,
+        embed_workers=embed_workers,
+        upsert_workers=upsert_workers
+    )
+    print(
+        f"Upserted {report.chunks} chunks in {report.upserts} batches in {report.seconds:.1f}s "
+        f"({report.chunks_per_second:.1f} chunks/s, {report.retries} retries, "
+        f"final embedding batch size {report.final_batch_size})"
+    )
+    return report
+
+def list_vector_ids(index, namespace: str) -> List[str]:
+    """Return every vector ID in the namespace, following Pinecone's pagination."""
+    vector_ids = []
+    for page in index.list(namespace=namespace):
+        vector_ids.extend(page)
+    return vector_ids
+
+def fetch_content_hashes(index, vector_ids: List[str], namespace: str, batch_size: int = 100) -> Dict[str, str]:
+    """Fetch the stored content_hash metadata for each vector ID."""
+    hashes = {}
+    for i in range(0, len(vector_ids), batch_size):
+        response = index.fetch(ids=vector_ids[i:i + batch_size], namespace=namespace)
+        for vector_id, vector in response.vectors.items():
+            hashes[vector_id] = (vector.metadata or {}).get("content_hash")
+    return hashes
+
+def sync_documents(index, chunks: Iterable[Dict], embeddings, namespace: str = NAMESPACE,
+                   embed_workers: int = 4, upsert_workers: int = 2) -> Dict[str, int]:
+    """Bring a namespace in line with the chunks, touching only what changed.
+
+    Chunk IDs are stable (see chunk.chunk_id) and each vector stores the
+    content_hash of its text, so the diff against the namespace is exact:
+    new IDs are added, IDs whose hash differs are re-embedded and overwritten,
+    IDs no longer produced by the chunker are deleted and the rest are skipped
+    without any embedding or upsert calls. ``chunks`` is consumed as a stream;
+    only the stored hashes and the batches in flight are held in memory.
 
-def upsert_documents(index, chunks, embeddings):
-    """Embed and upsert documents into Pinecone index."""
+    Returns:
+        Counts of added, updated, deleted and skipped vectors
+    """
+    existing = fetch_content_hashes(index, list_vector_ids(index, namespace), namespace)
+    report = {"added": 0, "updated": 0, "deleted": 0, "skipped": 0}
+    seen_ids = set()
     
-    batch_size = 100
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i + batch_size]
-        
-        # Create embeddings for the batch
-        texts = [chunk["text"] for chunk in batch]
-        embedded_batch = embeddings.embed_documents(texts)
-        
-        # Prepare vectors for upserting
-        vectors = []
-        for j, embedding in enumerate(embedded_batch):
-            vectors.append({
-                "id": f"moon_{i+j}",
-                "values": embedding,
-                "metadata": batch[j]["metadata"]
-            })
-        
-        # Upsert to Pinecone
-        index.upsert(vectors=vectors)
-        print(f"Upserted batch {i//batch_size + 1}")
+    def changed_chunks():
+        for chunk in chunks:
+            seen_ids.add(chunk["id"])
+            if chunk["id"] not in existing:
+                report["added"] += 1
+            elif existing[chunk["id"]] != chunk["metadata"]["content_hash"]:
+                report["updated"] += 1
+            else:
+                report["skipped"] += 1
+                continue
+            yield chunk
+    
+    upsert_documents(
+        index, changed_chunks(), embeddings,
+        namespace=namespace,
+        embed_workers=embed_workers,
+        upsert_workers=upsert_workers
+    )
+    
+    # Pinecone accepts up to 1000 IDs per delete
+    stale_ids = [vector_id for vector_id in existing if vector_id not in seen_ids]
+    for i in range(0, len(stale_ids), 1000):
+        index.delete(ids=stale_ids[i:i + 1000], namespace=namespace)
+    report["deleted"] = len(stale_ids)
+    
+    return report
 
 def main():
+    parser = argparse.ArgumentParser(description="Embed the moon data and upsert it into Pinecone.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"only embed new or changed chunks and delete stale ones in the '{NAMESPACE}' namespace"
+    )
+    parser.add_argument("--embed-workers", type=int, default=4, help="concurrent embedding requests")
+    parser.add_argument("--upsert-workers", type=int, default=2, help="concurrent upsert requests")
+    args = parser.parse_args()
+    
     # Initialize Pinecone and get index
     index = init_pinecone()
     
     # Create embeddings object
     embeddings = create_embeddings()
     
-    # Process moon data
-    df = read_moons_data('jupiter_moons.tsv')
-    moon_chunks = create_moon_chunks(df)
-    final_chunks = chunk_for_embedding(moon_chunks)
+    # Process moon data as a stream so large TSVs never sit in memory whole
+    final_chunks = iter_chunks_for_embedding(iter_moon_chunks('jupiter_moons.tsv'))
+    
+    if args.incremental:
+        report = sync_documents(
+            index, final_chunks, embeddings,
+            embed_workers=args.embed_workers,
+            upsert_workers=args.upsert_workers
+        )
+        print(
+            f"Synced namespace {NAMESPACE}: {report['added']} added, {report['updated']} updated, "
+            f"{report['deleted']} deleted, {report['skipped']} skipped"
+        )
+        return
     
     # Upsert documents to Pinecone
-    upsert_documents(index, final_chunks, embeddings)
+    upsert_documents(
+        index, final_chunks, embeddings,
+        embed_workers=args.embed_workers,
+        upsert_workers=args.upsert_workers
+    )
     print("Completed upserting all documents to Pinecone")
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+def document_key(doc: Document) -> str:
+    # Pinecone does not always hand back the vector ID, but every chunk carries
+    # its content hash, so the same chunk from either side shares a key
+    return doc.metadata.get("content_hash") or doc.id or doc.page_content
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[List[Document]], weights: Optional[Sequence[float]] = None,
+                           c: int = 60) -> List[Document]:
+    """Merge ranked lists by summing ``weight / (c + rank)`` per document, best first.
+
+    Only ranks are used, so vector similarities and BM25 scores never need
+    to be put on the same scale.
+    """
+    weights = weights or [1.0] * len(result_lists)
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for weight, results in zip(weights, result_lists):
+        for rank, doc in enumerate(results, start=1):
+            key = document_key(doc)
+            scores[key] = scores.get(key, 0.0) + weight / (c + rank)
+            documents.setdefault(key, doc)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """Run several retrievers on the same query and fuse their results with RRF.
+
+    Returns as many documents as the longest input list unless ``k`` is set,
+    so a routed vector retriever's k still decides the context size. The
+    async path queries every retriever concurrently.
+    """
+
+    retrievers: List[BaseRetriever]
+    weights: Optional[List[float]] = None
+    c: int = 60
+    k: Optional[int] = None
+
+    def _fuse(self, result_lists: List[List[Document]]) -> List[Document]:
+        fused = reciprocal_rank_fusion(result_lists, self.weights, self.c)
+        return fused[:self.k or max((len(results) for results in result_lists), default=0)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        config = {"callbacks": run_manager.get_child()}
+        return self._fuse([retriever.invoke(query, config=config) for retriever in self.retrievers])
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        config = {"callbacks": run_manager.get_child()}
+        result_lists = await asyncio.gather(
+            *(retriever.ainvoke(query, config=config) for retriever in self.retrievers)
+        )
+        return self._fuse(list(result_lists))
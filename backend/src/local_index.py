@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "LOCAL_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "local_index")
+)
+
+
+def metadata_mask(filter: dict, field: Callable[[str], np.ndarray], size: int) -> np.ndarray:
+    """Evaluate a Pinecone-style metadata filter to a boolean mask over ``size`` rows.
+
+    ``field(name)`` returns the values of one metadata field as an object array.
+    """
+    mask = np.ones(size, dtype=bool)
+    for name, condition in filter.items():
+        values = field(name)
+        if isinstance(condition, dict):
+            if "$in" in condition:
+                mask &= np.isin(values, list(condition["$in"]))
+            elif "$eq" in condition:
+                mask &= values == condition["$eq"]
+            else:
+                raise ValueError(f"Unsupported filter operator in {condition}")
+        else:
+            mask &= values == condition
+    return mask
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store doing exact cosine top-k with NumPy.
+
+    Vectors are kept L2-normalised in one float32 matrix, so a query is a
+    single matrix-vector product followed by a partial sort. ``save`` writes
+    the matrix to ``<path>.npy`` and ids/texts/metadata to ``<path>.json``;
+    ``load`` memory-maps the matrix so start-up cost does not grow with the
+    corpus. Metadata filters use the same shape as Pinecone's
+    (``{"moon_name": "Io"}`` or ``{"moon_name": {"$in": [...]}}``), so the
+    store is a drop-in replacement behind ``as_retriever``.
+    """
+
+    def __init__(self, embedding: Embeddings, vectors: Optional[np.ndarray] = None,
+                 ids: Optional[List[str]] = None, texts: Optional[List[str]] = None,
+                 metadatas: Optional[List[dict]] = None):
+        self._embedding = embedding
+        self._vectors = vectors
+        self._ids = list(ids or [])
+        self._texts = list(texts or [])
+        self._metadatas = list(metadatas or [{} for _ in self._ids])
+        self._field_cache: Dict[str, np.ndarray] = {}
+        self._rows: Optional[Dict[str, int]] = None
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids is not None else [str(len(self._ids) + i) for i in range(len(texts))]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        vectors = self._normalize(self._embedding.embed_documents(texts))
+
+        # Re-adding an existing ID replaces it, matching Pinecone's upsert semantics
+        existing = set(self._ids)
+        self.delete([vector_id for vector_id in ids if vector_id in existing])
+
+        self._vectors = vectors if self._vectors is None or not len(self._ids) else np.vstack([self._vectors, vectors])
+        self._ids.extend(ids)
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas)
+        self._field_cache.clear()
+        self._rows = None
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return True
+        drop = set(ids)
+        keep = [i for i, vector_id in enumerate(self._ids) if vector_id not in drop]
+        if len(keep) == len(self._ids):
+            return True
+        self._vectors = np.ascontiguousarray(self._vectors[keep])
+        self._ids = [self._ids[i] for i in keep]
+        self._texts = [self._texts[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+        self._field_cache.clear()
+        self._rows = None
+        return True
+
+    def get_vectors(self, ids: List[Optional[str]]) -> List[Optional[np.ndarray]]:
+        """The stored (normalised) vector for each id, or None where it is not in the store."""
+        if self._rows is None:
+            self._rows = {vector_id: i for i, vector_id in enumerate(self._ids)}
+        return [self._vectors[self._rows[vector_id]] if vector_id in self._rows else None for vector_id in ids]
+
+    async def aget_vectors(self, ids: List[Optional[str]]) -> List[Optional[np.ndarray]]:
+        return self.get_vectors(ids)
+
+    def _field(self, name: str) -> np.ndarray:
+        if name not in self._field_cache:
+            self._field_cache[name] = np.array(
+                [metadata.get(name) for metadata in self._metadatas], dtype=object
+            )
+        return self._field_cache[name]
+
+    def _filter_mask(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        if not filter:
+            return None
+        return metadata_mask(filter, self._field, len(self._ids))
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        if not self._ids:
+            return []
+        query = self._normalize(embedding)[0]
+        mask = self._filter_mask(filter)
+        if mask is None:
+            rows = None
+            scores = self._vectors @ query
+        else:
+            # Only score the rows that pass the filter, so a narrow filter is cheap
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                return []
+            scores = self._vectors[rows] @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        indices = top if rows is None else rows[top]
+        return [
+            (Document(id=self._ids[i], page_content=self._texts[i], metadata=dict(self._metadatas[i])), float(score))
+            for i, score in zip(indices, scores[top])
+        ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                          **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k, filter)
+
+    async def asimilarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                 **kwargs: Any) -> List[Document]:
+        # The search itself is microseconds; only the query embedding needs awaiting
+        vector = await self._embedding.aembed_query(query)
+        return self.similarity_search_by_vector(vector, k, filter)
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None,
+                                            **kwargs: Any) -> List[Tuple[Document, float]]:
+        vector = await self._embedding.aembed_query(query)
+        return self.similarity_search_with_score_by_vector(vector, k, filter)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def save(self, path: str = DEFAULT_INDEX_PATH, model_name: Optional[str] = None) -> None:
+        """Write ``<path>.npy`` (float32 matrix) and ``<path>.json`` (ids, texts, metadata)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        vectors = self._vectors if self._vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        np.save(f"{path}.npy", np.ascontiguousarray(vectors, dtype=np.float32))
+        with open(f"{path}.json", "w") as f:
+            json.dump({
+                "model": model_name or getattr(self._embedding, "model_name", None)
+                         or getattr(self._embedding, "model", None),
+                "dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                "ids": self._ids,
+                "texts": self._texts,
+                "metadatas": self._metadatas,
+            }, f)
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, mmap: bool = True) -> "LocalVectorStore":
+        """Load a store written by ``save``, memory-mapping the vectors by default."""
+        with open(f"{path}.json") as f:
+            sidecar = json.load(f)
+        vectors = np.load(f"{path}.npy", mmap_mode="r" if mmap else None)
+        if len(sidecar["ids"]) != vectors.shape[0]:
+            raise ValueError(
+                f"Local index {path} is inconsistent: {vectors.shape[0]} vectors "
+                f"but {len(sidecar['ids'])} ids"
+            )
+
+        model = getattr(embedding, "model_name", None) or getattr(embedding, "model", None)
+        if sidecar.get("model") and model and sidecar["model"] != model:
+            logger.warning(f"Local index {path} was built with {sidecar['model']}, querying with {model}")
+
+        return cls(embedding, vectors=vectors, ids=sidecar["ids"],
+                   texts=sidecar["texts"], metadatas=sidecar["metadatas"])
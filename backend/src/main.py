@@ -1,22 +1,27 @@
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
 import os
-from typing import List, Optional
+from typing import Callable, List, Optional
+from langchain_core.embeddings import Embeddings
+from backoff import retry_with_backoff
+from clients import openai_embeddings
+from embedding_cache import CachedEmbeddings, DEFAULT_CACHE_PATH
 
 # Load environment variables
 load_dotenv()
 
-def create_embeddings(batch_size: Optional[int] = 1000):
+def create_embeddings(batch_size: Optional[int] = 1000, cache_path: Optional[str] = DEFAULT_CACHE_PATH):
     """Create and return a LangChain OpenAI embeddings object with enhanced configuration.
     
     Args:
         batch_size: Number of texts to process in each batch for efficiency
+        cache_path: SQLite file used to cache vectors between runs; None disables caching
         
     Returns:
-        OpenAIEmbeddings: Configured embeddings object
+        CachedEmbeddings wrapping the configured OpenAIEmbeddings, or the bare
+        OpenAIEmbeddings object when caching is disabled
     """
     
-    embeddings = OpenAIEmbeddings(
+    embeddings = openai_embeddings(
         openai_api_key=os.getenv("OPENAI_API_KEY"),
         model="text-embedding-ada-002",  # Latest embedding model
         chunk_size=batch_size,
@@ -25,32 +30,35 @@ def create_embeddings(batch_size: Optional[int] = 1000):
         show_progress_bar=True  # Show progress for large batches
     )
     
+    if cache_path:
+        return CachedEmbeddings(embeddings, cache_path=cache_path)
     return embeddings
 
-def embed_with_error_handling(texts: List[str], embeddings: OpenAIEmbeddings):
+def embed_with_error_handling(texts: List[str], embeddings: Embeddings, max_retries: int = 6,
+                              on_retry: Optional[Callable[[Exception, float], None]] = None):
     """Embed texts with error handling and retries.
     
+    Requests are paced by the process's OpenAI rate limiter (see
+    clients.rate_limiter), so most bursts never reach the rate limit.
+    Rate-limit errors that still happen are retried with exponential
+    backoff and jitter (honouring Retry-After when the API sends it) instead
+    of a single retry at half the batch size; callers that want to adapt
+    their batch size pass ``on_retry``.
+    
     Args:
         texts: List of texts to embed
-        embeddings: OpenAIEmbeddings object
+        embeddings: OpenAIEmbeddings, or CachedEmbeddings wrapping it
+        max_retries: Retries before the rate-limit error is raised
+        on_retry: Called with the error and the backoff delay before each retry
         
     Returns:
         List of embeddings vectors
     """
-    try:
-        return embeddings.embed_documents(texts)
-    except Exception as e:
-        print(f"Error during embedding: {str(e)}")
-        # Retry with smaller batches if we hit rate limits
-        if "rate_limit" in str(e).lower():
-            print("Rate limit hit, retrying with smaller batches...")
-            results = []
-            batch_size = len(texts) // 2
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                results.extend(embeddings.embed_documents(batch))
-            return results
-        raise
+    return retry_with_backoff(
+        lambda: embeddings.embed_documents(texts),
+        max_retries=max_retries,
+        on_retry=on_retry
+    )
 
 def main():
     # Create the embeddings object
@@ -0,0 +1,271 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans a cached embedding lookup up to a slow GPT-4 answer
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in items]
+
+
+class Gauge(Counter):
+    """A value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    """Fixed-bucket histogram per label set.
+
+    Observing is a bisect and three additions under a lock, and memory does
+    not grow with traffic. Quantiles are estimated from the buckets by linear
+    interpolation, the way Prometheus' histogram_quantile() does, and are
+    exposed as a companion ``<name>_quantile`` gauge so p50/p95/p99 can be
+    read straight off ``/metrics``.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, quantiles: Sequence[float] = QUANTILES):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.quantiles = tuple(quantiles)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def quantile(self, q: float, *label_values: str) -> Optional[float]:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None or series[2] == 0:
+                return None
+            counts, _, total = list(series[0]), series[1], series[2]
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    # Beyond the last bound there is nothing to interpolate towards
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(series[0]), series[1], series[2])) for key, series in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+    def render_quantiles(self) -> List[str]:
+        with self._lock:
+            keys = sorted(self._series)
+        lines = []
+        for key in keys:
+            for q in self.quantiles:
+                value = self.quantile(q, *key)
+                if value is not None:
+                    labels = _format_labels(self.labels, key, f'quantile="{q:g}"')
+                    lines.append(f"{self.name}_quantile{labels} {value:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the server's metrics and renders them in the Prometheus text format."""
+
+    def __init__(self, prefix: str = "jupiter"):
+        self.prefix = prefix
+        self._metrics: List[Any] = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), **kwargs) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help, labels, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+            if isinstance(metric, Histogram) and metric.quantiles:
+                lines.append(f"# HELP {metric.name}_quantile {metric.help} (estimated quantiles)")
+                lines.append(f"# TYPE {metric.name}_quantile gauge")
+                lines.extend(metric.render_quantiles())
+        return "\n".join(lines) + "\n"
+
+
+class ChatMetrics:
+    """The metrics reported by the chat API."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        self.request_latency = self.registry.histogram(
+            "request_latency_seconds", "Time to complete an HTTP request, including streamed bodies", ["endpoint"])
+        self.requests = self.registry.counter(
+            "requests_total", "HTTP requests by endpoint and status code", ["endpoint", "status"])
+        self.requests_in_flight = self.registry.gauge(
+            "requests_in_flight", "HTTP requests currently being served", ["endpoint"])
+        self.errors = self.registry.counter(
+            "errors_total", "Requests that failed with a 5xx status or a streamed error event", ["endpoint"])
+        self.stage_latency = self.registry.histogram(
+            "stage_latency_seconds", "Time spent in each stage of the retrieval chain", ["stage"])
+        self.stage_errors = self.registry.counter(
+            "stage_errors_total", "Exceptions raised inside a chain stage", ["stage"])
+        self.llm_tokens = self.registry.counter(
+            "llm_tokens_total", "Tokens sent to and generated by the chat model", ["kind"])
+        self.retrieved_documents = self.registry.histogram(
+            "retrieved_documents", "Documents returned per retrieval",
+            buckets=(0, 1, 2, 4, 8, 16, 32, 64), quantiles=())
+        self.rerank_candidates = self.registry.histogram(
+            "rerank_candidates", "Candidates fetched for reranking per retrieval",
+            buckets=(0, 1, 2, 4, 8, 16, 32, 64), quantiles=())
+        self.reranked_documents = self.registry.histogram(
+            "reranked_documents", "Documents kept by the reranker per retrieval",
+            buckets=(0, 1, 2, 4, 8, 16, 32, 64), quantiles=())
+        self.rerank_cache_hits = self.registry.counter(
+            "rerank_cache_hits_total", "Retrievals whose reranked list came from the rerank cache")
+        self.coalesced_requests = self.registry.counter(
+            "coalesced_requests_total", "Chat requests answered by joining an identical in-flight chain execution")
+        self.http_client_requests = self.registry.counter(
+            "http_client_requests_total", "Requests sent by the pooled OpenAI HTTP clients", ["client"])
+        self.http_client_connections = self.registry.counter(
+            "http_client_connections_total", "New connections opened; the rest reused a pooled one", ["client"])
+        self.shed_requests = self.registry.counter(
+            "shed_requests_total", "Chat requests answered 503 to protect the latency SLO", ["reason"])
+        self.upstream_wait = self.registry.histogram(
+            "upstream_ratelimit_wait_seconds", "Time OpenAI requests waited for rate-limit capacity", ["model"],
+            quantiles=())
+        self.upstream_throttled = self.registry.counter(
+            "upstream_throttled_total", "429 responses from OpenAI", ["model"])
+        self.tls_handshake_latency = self.registry.histogram(
+            "http_client_tls_handshake_seconds", "Time spent in TLS handshakes for new connections", ["client"],
+            quantiles=())
+
+    def observe_connection(self, client: str, event: str, seconds: float) -> None:
+        """Listener for ``clients.add_listener``."""
+        if event == "request":
+            self.http_client_requests.inc(client)
+        elif event == "connect":
+            self.http_client_connections.inc(client)
+        elif event == "tls":
+            self.tls_handshake_latency.observe(seconds, client)
+        elif event == "ratelimit_wait":
+            self.upstream_wait.observe(seconds, client)
+        elif event == "throttled":
+            self.upstream_throttled.inc(client)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests, in-flight requests and latency per endpoint.
+
+    Written against raw ASGI rather than BaseHTTPMiddleware so that a
+    streamed response is timed until its last byte, not its headers.
+    Unknown paths share the "other" label to keep cardinality bounded.
+    """
+
+    def __init__(self, app, metrics: ChatMetrics):
+        self.app = app
+        self.metrics = metrics
+        self._paths = None
+
+    def _endpoint(self, scope) -> str:
+        if self._paths is None:
+            self._paths = {getattr(route, "path", None) for route in scope["app"].routes}
+        return scope["path"] if scope["path"] in self._paths else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        endpoint = self._endpoint(scope)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.requests_in_flight.inc(endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.requests_in_flight.dec(endpoint)
+            self.metrics.request_latency.observe(time.perf_counter() - start, endpoint)
+            self.metrics.requests.inc(endpoint, str(status))
+            if status >= 500:
+                self.metrics.errors.inc(endpoint)
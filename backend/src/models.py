@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass
+class Message:
+    role: str
+    content: str
+    metadata: Dict[str, Any] = None
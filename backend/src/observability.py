@@ -0,0 +1,128 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchExporter:
+    """Export records from a background thread in batches.
+
+    ``submit`` only enqueues, so callers never wait on the network. The worker
+    hands ``export_batch`` up to ``max_batch_size`` records at a time, at least
+    every ``flush_interval`` seconds. When the queue is full new records are
+    dropped (or, with ``block_timeout`` > 0, the caller waits that long for
+    room first). A failing export is retried with backoff up to
+    ``max_retries`` times and then dropped, so an unreachable backend costs
+    data, never availability. ``shutdown`` flushes whatever is left.
+    """
+
+    def __init__(self, export_batch: Callable[[List[Any]], None], max_batch_size: int = 50,
+                 flush_interval: float = 5.0, max_queue_size: int = 1000, block_timeout: float = 0.0,
+                 max_retries: int = 3, name: str = "batch-exporter"):
+        self.export_batch = export_batch
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.name = name
+        self.submitted = 0
+        self.exported = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._flush_requested = threading.Event()
+        self._flushed = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None and not self._stopping.is_set():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, record: Any) -> bool:
+        """Queue a record for export. Returns False if it was dropped."""
+        if self._stopping.is_set():
+            self.dropped += 1
+            return False
+        self._ensure_started()
+        try:
+            if self.block_timeout > 0:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"{self.name}: queue full, dropping record")
+            return False
+        self.submitted += 1
+        if self._queue.qsize() >= self.max_batch_size:
+            self._flush_requested.set()
+        return True
+
+    def _drain(self) -> List[Any]:
+        batch = []
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: List[Any]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.export_batch(batch)
+                self.exported += len(batch)
+                return
+            except Exception as e:
+                logger.error(f"{self.name}: export of {len(batch)} records failed (attempt {attempt + 1}): {str(e)}")
+                if attempt < self.max_retries and not self._stopping.is_set():
+                    time.sleep(min(30.0, 0.5 * 2 ** attempt))
+        self.failed_batches += 1
+        self.dropped += len(batch)
+
+    def _run(self) -> None:
+        while True:
+            self._flush_requested.wait(timeout=self.flush_interval)
+            self._flush_requested.clear()
+
+            while batch := self._drain():
+                self._export(batch)
+
+            with self._flushed:
+                self._flushed.notify_all()
+
+            if self._stopping.is_set() and self._queue.empty():
+                return
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Export everything queued so far and wait for it (up to ``timeout``)."""
+        if self._thread is None:
+            return
+        with self._flushed:
+            self._flush_requested.set()
+            self._flushed.wait(timeout=timeout)
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop accepting records, export what is queued and stop the worker."""
+        self._stopping.set()
+        self._flush_requested.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "submitted": self.submitted,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
@@ -0,0 +1,197 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from backoff import retry_with_backoff
+from main import embed_with_error_handling
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a queue for one consumer
+_DONE = object()
+
+
+class AdaptiveBatchSize:
+    """Additive-increase / multiplicative-decrease controller for embedding batch sizes.
+
+    Every successful call grows the batch by ``step`` up to ``maximum``; every
+    rate-limit halves it down to ``minimum``, so throughput settles just below
+    the provider's limit instead of repeatedly tripping it.
+    """
+
+    def __init__(self, initial: int = 100, minimum: int = 1, maximum: int = 1000, step: int = 10):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.step = step
+        self._current = max(minimum, min(initial, maximum))
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        return self._current
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._current = min(self.maximum, self._current + self.step)
+
+    def on_rate_limit(self) -> None:
+        with self._lock:
+            self._current = max(self.minimum, self._current // 2)
+
+
+@dataclass
+class PipelineReport:
+    chunks: int = 0
+    batches: int = 0
+    upserts: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    final_batch_size: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+
+def to_vector(chunk: Dict, embedding: List[float]) -> Dict:
+    """Build the Pinecone record for a chunk.
+
+    "text" is where PineconeVectorStore reads page content from, so it is
+    stored alongside the chunk metadata.
+    """
+    return {
+        "id": chunk["id"],
+        "values": embedding,
+        "metadata": {**chunk["metadata"], "text": chunk["text"], "source_url": chunk["source_url"]}
+    }
+
+
+def run_pipeline(chunks: Iterable[Dict], embeddings, index, namespace: Optional[str] = None,
+                 embed_workers: int = 4, upsert_workers: int = 2, queue_size: int = 8,
+                 batch_size: Optional[AdaptiveBatchSize] = None, upsert_batch_size: int = 100,
+                 max_retries: int = 6) -> PipelineReport:
+    """Embed and upsert chunks with overlapping network calls.
+
+    The calling thread reads ``chunks`` and cuts them into batches sized by
+    the adaptive controller. ``embed_workers`` threads embed batches while
+    ``upsert_workers`` threads upsert the results, connected by queues holding
+    at most ``queue_size`` batches, so a slow stage applies backpressure
+    instead of buffering the corpus. Rate limits are retried with exponential
+    backoff and shrink subsequent embedding batches. The first unrecoverable
+    error stops the pipeline and is re-raised once the workers have exited.
+    """
+    batch_size = batch_size or AdaptiveBatchSize()
+    embed_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    upsert_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    report = PipelineReport()
+    report_lock = threading.Lock()
+    failures: List[BaseException] = []
+    upsert_kwargs = {"namespace": namespace} if namespace is not None else {}
+
+    def count_retry(error: Exception, delay: float) -> None:
+        with report_lock:
+            report.retries += 1
+
+    def fail(error: BaseException) -> None:
+        with report_lock:
+            failures.append(error)
+            report.errors.append(str(error))
+        stop.set()
+
+    def put(target: "queue.Queue", item) -> bool:
+        # Blocking put that gives up once the pipeline is stopping
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def embed_worker() -> None:
+        while True:
+            batch = embed_queue.get()
+            if batch is _DONE:
+                return
+            if stop.is_set():
+                continue
+            try:
+                def on_retry(error: Exception, delay: float) -> None:
+                    batch_size.on_rate_limit()
+                    count_retry(error, delay)
+
+                vectors = embed_with_error_handling(
+                    [chunk["text"] for chunk in batch], embeddings,
+                    max_retries=max_retries, on_retry=on_retry
+                )
+                batch_size.on_success()
+                records = [to_vector(chunk, vector) for chunk, vector in zip(batch, vectors)]
+                for i in range(0, len(records), upsert_batch_size):
+                    if not put(upsert_queue, records[i:i + upsert_batch_size]):
+                        break
+            except Exception as e:
+                logger.error(f"Embedding batch failed: {str(e)}")
+                fail(e)
+
+    def upsert_worker() -> None:
+        while True:
+            records = upsert_queue.get()
+            if records is _DONE:
+                return
+            if stop.is_set():
+                continue
+            try:
+                retry_with_backoff(
+                    lambda: index.upsert(vectors=records, **upsert_kwargs),
+                    max_retries=max_retries, on_retry=count_retry
+                )
+                with report_lock:
+                    report.chunks += len(records)
+                    report.upserts += 1
+            except Exception as e:
+                logger.error(f"Upsert failed: {str(e)}")
+                fail(e)
+
+    embedders = [threading.Thread(target=embed_worker, daemon=True) for _ in range(embed_workers)]
+    upserters = [threading.Thread(target=upsert_worker, daemon=True) for _ in range(upsert_workers)]
+    for thread in embedders + upserters:
+        thread.start()
+
+    start = time.perf_counter()
+    try:
+        iterator = iter(chunks)
+        batch = []
+        for chunk in iterator:
+            if stop.is_set():
+                break
+            batch.append(chunk)
+            if len(batch) >= batch_size.current:
+                if not put(embed_queue, batch):
+                    break
+                report.batches += 1
+                batch = []
+        if batch and not stop.is_set() and put(embed_queue, batch):
+            report.batches += 1
+    except BaseException as e:
+        fail(e)
+    finally:
+        # Shut the stages down in order: embedders drain first, then upserters
+        for _ in embedders:
+            embed_queue.put(_DONE)
+        for thread in embedders:
+            thread.join()
+        for _ in upserters:
+            upsert_queue.put(_DONE)
+        for thread in upserters:
+            thread.join()
+
+    report.seconds = time.perf_counter() - start
+    report.final_batch_size = batch_size.current
+    if failures:
+        raise failures[0]
+    return report
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.callbacks.manager import adispatch_custom_event, dispatch_custom_event
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from .bm25 import tokenize
+from .compression import STOP_WORDS
+from .routing import MoonRouter
+
+logger = logging.getLogger(__name__)
+
+
+class PineconeVectors:
+    """Look up the stored vectors of Pinecone candidates by id with one ``fetch``."""
+
+    def __init__(self, index, namespace: str):
+        self.index = index
+        self.namespace = namespace
+
+    def get_vectors(self, ids: List[Optional[str]]) -> List[Optional[List[float]]]:
+        wanted = [vector_id for vector_id in ids if vector_id]
+        fetched = self.index.fetch(ids=wanted, namespace=self.namespace).vectors if wanted else {}
+        return [fetched[vector_id].values if vector_id in fetched else None for vector_id in ids]
+
+    async def aget_vectors(self, ids: List[Optional[str]]) -> List[Optional[List[float]]]:
+        return await asyncio.to_thread(self.get_vectors, ids)
+
+
+class LocalReranker:
+    """Score (question, candidate) pairs on the CPU, with no model call.
+
+    The score is the cosine similarity between the question and candidate
+    embeddings plus ``lexical_weight`` times the share of the question's
+    content words that the candidate contains. Candidate vectors are read
+    by id from ``vectors`` (LocalVectorStore or PineconeVectors), so only
+    the question is embedded, and that is an embedding-cache hit because
+    the retriever has just embedded it. Candidates missing from the store
+    fall back to the embeddings. Scoring is one matrix-vector product.
+    """
+
+    def __init__(self, embeddings: Embeddings, vectors: Any = None, lexical_weight: float = 0.3):
+        self.embeddings = embeddings
+        self.vectors = vectors
+        self.lexical_weight = lexical_weight
+
+    @staticmethod
+    def _missing(vectors: List[Any]) -> List[int]:
+        return [i for i, vector in enumerate(vectors) if vector is None]
+
+    def _scores(self, query: str, documents: List[Document], query_vector: List[float],
+                vectors: List[Any]) -> np.ndarray:
+        matrix = np.asarray([query_vector] + list(vectors), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1)
+        matrix /= np.where(norms == 0, 1.0, norms)[:, None]
+        query_vector, candidates = matrix[0], matrix[1:]
+        scores = candidates @ query_vector
+
+        terms = sorted(set(tokenize(query)) - STOP_WORDS)
+        if terms and self.lexical_weight:
+            present = np.array(
+                [[term in words for term in terms] for words in (set(tokenize(d.page_content)) for d in documents)],
+                dtype=np.float32
+            )
+            scores += self.lexical_weight * present.mean(axis=1)
+        return scores
+
+    def rank(self, query: str, documents: List[Document]) -> np.ndarray:
+        """Candidate positions, best first."""
+        query_vector = self.embeddings.embed_query(query)
+        vectors = (self.vectors.get_vectors([doc.id for doc in documents]) if self.vectors is not None
+                   else [None] * len(documents))
+        missing = self._missing(vectors)
+        if missing:
+            embedded = self.embeddings.embed_documents([documents[i].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return np.argsort(-self._scores(query, documents, query_vector, vectors), kind="stable")
+
+    async def arank(self, query: str, documents: List[Document]) -> np.ndarray:
+        if self.vectors is not None:
+            query_vector, vectors = await asyncio.gather(
+                self.embeddings.aembed_query(query), self.vectors.aget_vectors([doc.id for doc in documents])
+            )
+        else:
+            query_vector, vectors = await self.embeddings.aembed_query(query), [None] * len(documents)
+        missing = self._missing(vectors)
+        if missing:
+            embedded = await self.embeddings.aembed_documents([documents[i].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return np.argsort(-self._scores(query, documents, query_vector, vectors), kind="stable")
+
+
+class RerankCache:
+    """Reranked documents per (normalized question, k), LRU-bounded with a TTL."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[Document]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, k: int) -> Tuple[str, int]:
+        return " ".join(query.lower().split()), k
+
+    def get(self, key: Tuple[str, int]) -> Optional[List[Document]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl_seconds > 0 and time.monotonic() - entry[0] > self.ttl_seconds):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: Tuple[str, int], documents: List[Document]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(documents))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RerankingRetriever(BaseRetriever):
+    """Over-fetch with ``base_retriever``, then keep the ``k`` candidates the reranker likes best.
+
+    With a ``router``, k is the router's decision for the question (e.g. 2
+    chunks per named moon), so reranking keeps the context sizes retrieval
+    had before over-fetching. Reranked lists are cached per question. Every
+    request logs the candidate count, the k kept and the rerank time, and
+    sends them as a "rerank" custom event for the stage metrics.
+    """
+
+    base_retriever: BaseRetriever
+    reranker: Any
+    k: int = 4
+    router: Optional[MoonRouter] = None
+    cache: Optional[RerankCache] = None
+
+    def _k(self, query: str) -> int:
+        return self.router.route(query).k if self.router is not None else self.k
+
+    def _select(self, key: Tuple[str, int], candidates: List[Document], order, seconds: float) -> dict:
+        documents = [candidates[i] for i in order[:key[1]]]
+        if self.cache is not None:
+            self.cache.put(key, documents)
+        logger.info(f"Reranked {len(candidates)} candidates to {len(documents)} in {seconds * 1000:.1f} ms")
+        return {"documents": documents, "candidates": len(candidates), "k": len(documents),
+                "seconds": seconds, "cached": False}
+
+    def _cached(self, key: Tuple[str, int]) -> Optional[dict]:
+        documents = self.cache.get(key) if self.cache is not None else None
+        if documents is None:
+            return None
+        logger.info(f"Reranked list of {len(documents)} served from cache")
+        return {"documents": documents, "candidates": None, "k": len(documents), "seconds": 0.0, "cached": True}
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        key = RerankCache.key(query, self._k(query))
+        result = self._cached(key)
+        if result is None:
+            candidates = self.base_retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            start = time.perf_counter()
+            order = self.reranker.rank(query, candidates) if candidates else []
+            result = self._select(key, candidates, order, time.perf_counter() - start)
+        documents = result.pop("documents")
+        dispatch_custom_event("rerank", result, config={"callbacks": run_manager.get_child()})
+        return documents
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        key = RerankCache.key(query, self._k(query))
+        result = self._cached(key)
+        if result is None:
+            candidates = await self.base_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+            start = time.perf_counter()
+            order = await self.reranker.arank(query, candidates) if candidates else []
+            result = self._select(key, candidates, order, time.perf_counter() - start)
+        documents = result.pop("documents")
+        await adispatch_custom_event("rerank", result, config={"callbacks": run_manager.get_child()})
+        return documents
@@ -1,69 +1,282 @@
-from pinecone import Pinecone
 from dotenv import load_dotenv
-import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
 import json
-from pprint import pprint
+import os
+import shutil
+import numpy as np
+from backoff import retry_with_backoff
+from clients import pinecone_index
 
 # Load environment variables
 load_dotenv()
 
-def review_vectors():
-    """Review individual vectors from the Pinecone index."""
-    
-    # Initialize Pinecone
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-    
-    # Configuration
-    INDEX_NAME = "jupitermoons-2"
-    NAMESPACE = "moonvector"
-    
-    # Get the index
-    index = pc.Index(INDEX_NAME)
-    
-    # List all vector IDs in the namespace and convert to list
-    vector_ids = list(index.list(namespace=NAMESPACE))
-    
-    print(f"Found {len(vector_ids)} vectors in namespace {NAMESPACE}\n")
-    
-    # Query each vector and display its contents
-    for vector_id in vector_ids:
+INDEX_NAME = "jupitermoons-2"
+NAMESPACE = "moonvector"
+EXPECTED_DIMENSION = 1536  # text-embedding-ada-002
+
+def iter_id_batches(index, namespace: str, batch_size: int = 100) -> Iterator[List[str]]:
+    """Walk the namespace's ID pages and regroup them into fetch-sized batches."""
+    batch = []
+    for page in index.list(namespace=namespace):
+        batch.extend(page)
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+    if batch:
+        yield batch
+
+def fetch_batch(index, vector_ids: List[str], namespace: str) -> List[Tuple[str, List[float], Dict]]:
+    """Fetch many vectors in one request, retrying rate limits with backoff."""
+    response = retry_with_backoff(lambda: index.fetch(ids=vector_ids, namespace=namespace))
+    return [
+        (vector_id, list(vector.values), dict(vector.metadata or {}))
+        for vector_id, vector in response.vectors.items()
+    ]
+
+def iter_vectors(index, namespace: str = NAMESPACE, batch_size: int = 100,
+                 workers: int = 8) -> Iterator[List[Tuple[str, List[float], Dict]]]:
+    """Yield fetched batches of ``(id, values, metadata)`` as they arrive.
+
+    ID pages are listed lazily and fetched by a thread pool with at most
+    ``2 * workers`` requests outstanding, so memory stays bounded however
+    large the namespace is. Batches come back in completion order.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for vector_ids in iter_id_batches(index, namespace, batch_size):
+            pending.add(executor.submit(fetch_batch, index, vector_ids, namespace))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+class NpyWriter:
+    """Stream vectors to ``<path>.npy`` and ids/metadata to ``<path>.jsonl``, row for row.
+
+    The row count is unknown until the end, so rows go to a raw scratch file
+    first; ``close`` writes the .npy header, copies the rows behind it and
+    only then renames both files into place. ``discard`` deletes the partial
+    files instead, so a failed export never leaves a complete-looking one.
+    With ``records=False`` only the matrix is written.
+    """
+
+    def __init__(self, path: str, records: bool = True):
+        self.path = path
+        self.rows = 0
+        self.dimension = None
+        self._raw = open(f"{path}.npy.rows", "wb")
+        self._jsonl = open(f"{path}.jsonl.partial", "w", encoding="utf-8") if records else None
+
+    def write(self, batch: List[Tuple[str, List[float], Dict]]) -> None:
+        for vector_id, values, metadata in batch:
+            if self.dimension is None:
+                self.dimension = len(values)
+            if len(values) != self.dimension:
+                raise ValueError(f"Vector {vector_id} has {len(values)} dimensions, expected {self.dimension}")
+            self._raw.write(np.asarray(values, dtype="<f4").tobytes())
+            if self._jsonl is not None:
+                self._jsonl.write(json.dumps({"id": vector_id, "metadata": metadata}) + "\n")
+            self.rows += 1
+
+    def close(self) -> None:
+        self._raw.close()
+        if self._jsonl is not None:
+            self._jsonl.close()
+            os.replace(f"{self.path}.jsonl.partial", f"{self.path}.jsonl")
+        header = {"descr": "<f4", "fortran_order": False, "shape": (self.rows, self.dimension or 0)}
+        with open(f"{self.path}.npy.partial", "wb") as out, open(f"{self.path}.npy.rows", "rb") as raw:
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(raw, out, 1 << 20)
+        os.remove(f"{self.path}.npy.rows")
+        os.replace(f"{self.path}.npy.partial", f"{self.path}.npy")
+
+    def discard(self) -> None:
+        self._raw.close()
+        if self._jsonl is not None:
+            self._jsonl.close()
+        for suffix in (".npy.rows", ".npy.partial", ".jsonl.partial"):
+            if os.path.exists(f"{self.path}{suffix}"):
+                os.remove(f"{self.path}{suffix}")
+
+class ParquetWriter:
+    """Stream vectors to ``<path>.parquet``, one row group per fetched batch."""
+
+    def __init__(self, path: str):
         try:
-            query_response = index.fetch(
-                ids=[vector_id[0]],
-                namespace=NAMESPACE
-            )
-            
-            # Print raw response for debugging
-            print(f"Raw response type: {type(query_response)}")
-            print(f"Raw response: {query_response}")
-            
-            # Skip if no response
-            if not query_response:
-                print(f"No data found for Vector ID: {vector_id[0]}")
-                continue
-            
-            # Format the response
-            formatted_response = {
-                "id": vector_id[0],
-                "metadata": query_response.get("vectors", {}).get(vector_id[0], {}).get("metadata", {}),
-                "values": query_response.get("vectors", {}).get(vector_id[0], {}).get("values", [])
-            }
-            
-            # Truncate vector values for readability
-            if formatted_response["values"]:
-                formatted_response["values"] = {
-                    "first_5": formatted_response["values"][:5],
-                    "last_5": formatted_response["values"][-5:],
-                    "total_dimensions": len(formatted_response["values"])
-                }
-            
-            print(f"\nVector ID: {vector_id[0]}")
-            pprint(formatted_response, indent=2)
-            print("\n" + "="*80 + "\n")
-            
-        except Exception as e:
-            print(f"Error processing Vector ID {vector_id[0]}: {str(e)}")
-            continue
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet export needs pyarrow (pip install pyarrow); use --format npy instead")
+        self.pa = pa
+        self.path = path
+        self.rows = 0
+        self._schema = pa.schema([
+            ("id", pa.string()),
+            ("moon_name", pa.string()),
+            ("content_hash", pa.string()),
+            ("metadata", pa.string()),
+            ("values", pa.list_(pa.float32())),
+        ])
+        self._writer = pq.ParquetWriter(f"{path}.parquet.partial", self._schema)
+
+    def write(self, batch: List[Tuple[str, List[float], Dict]]) -> None:
+        if not batch:
+            return
+        ids, values, metadatas = zip(*batch)
+        self._writer.write_table(self.pa.table({
+            "id": list(ids),
+            "moon_name": [m.get("moon_name") for m in metadatas],
+            "content_hash": [m.get("content_hash") for m in metadatas],
+            "metadata": [json.dumps(m) for m in metadatas],
+            "values": [np.asarray(v, dtype=np.float32) for v in values],
+        }, schema=self._schema))
+        self.rows += len(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+        os.replace(f"{self.path}.parquet.partial", f"{self.path}.parquet")
+
+    def discard(self) -> None:
+        self._writer.close()
+        os.remove(f"{self.path}.parquet.partial")
+
+def export_vectors(index, path: str, namespace: str = NAMESPACE, format: str = "npy",
+                   batch_size: int = 100, workers: int = 8) -> int:
+    """Export every vector and its metadata in the namespace. Returns the row count.
+
+    The export appears under ``path`` only once every vector has been
+    written; if fetching fails part way, the partial files are deleted.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    writer = ParquetWriter(path) if format == "parquet" else NpyWriter(path)
+    try:
+        for batch in iter_vectors(index, namespace, batch_size, workers):
+            writer.write(batch)
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
+    return writer.rows
+
+def load_export(path: str) -> Tuple[np.ndarray, List[str], List[Dict]]:
+    """Read an export back as ``(matrix, ids, metadatas)``; the .npy matrix is memory-mapped."""
+    if os.path.exists(f"{path}.parquet"):
+        import pyarrow.parquet as pq
+        table = pq.read_table(f"{path}.parquet")
+        values = table.column("values").combine_chunks()
+        dimension = len(values[0]) if len(values) else 0
+        matrix = values.flatten().to_numpy().reshape(len(values), dimension)
+        return matrix, table.column("id").to_pylist(), [json.loads(m) for m in table.column("metadata").to_pylist()]
+
+    matrix = np.load(f"{path}.npy", mmap_mode="r")
+    ids, metadatas = [], []
+    with open(f"{path}.jsonl", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            ids.append(record["id"])
+            metadatas.append(record["metadata"])
+    return matrix, ids, metadatas
+
+def summarize_export(matrix: np.ndarray, ids: List[str], metadatas: List[Dict],
+                     expected_dimension: Optional[int] = EXPECTED_DIMENSION, block_size: int = 4096) -> Dict:
+    """Health checks over an exported matrix, computed block-wise with NumPy.
+
+    Reports the dimension, norm statistics (ada-002 vectors are unit length,
+    so anything else points at corrupt or foreign vectors), non-finite and
+    zero rows, duplicate content by content_hash, byte-identical vectors
+    and vectors per moon. ``block_size`` rows are held at a time; the row
+    fingerprint needs 8 bytes per value of a block in temporaries.
+    """
+    rows, dimension = matrix.shape if matrix.ndim == 2 else (0, 0)
+    norms = np.empty(rows, dtype=np.float32)
+    finite = np.empty(rows, dtype=bool)
+    row_hashes = np.empty(rows, dtype=np.uint64)
+    for start in range(0, rows, block_size):
+        block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+        finite[start:start + len(block)] = np.isfinite(block).all(axis=1)
+        norms[start:start + len(block)] = np.linalg.norm(np.nan_to_num(block), axis=1)
+        # Cheap row fingerprint: identical vectors always collide, others almost never
+        row_hashes[start:start + len(block)] = block.view(np.uint32).astype(np.uint64) @ (
+            np.arange(1, dimension + 1, dtype=np.uint64) * np.uint64(2654435761)
+        )
+
+    hashes = np.array([m.get("content_hash") or "" for m in metadatas], dtype=object)
+    unique_hashes, hash_counts = np.unique(hashes[hashes != ""], return_counts=True)
+    duplicate_hashes = set(unique_hashes[hash_counts > 1])
+    _, vector_counts = np.unique(row_hashes, return_counts=True)
+    moons, moon_counts = np.unique(
+        np.array([m.get("moon_name") or "(none)" for m in metadatas], dtype=object), return_counts=True
+    )
+
+    return {
+        "vectors": rows,
+        "dimension": int(dimension),
+        "dimension_ok": expected_dimension is None or dimension == expected_dimension,
+        "norm_min": float(norms.min()) if rows else None,
+        "norm_mean": float(norms.mean()) if rows else None,
+        "norm_max": float(norms.max()) if rows else None,
+        "not_unit_norm": int((np.abs(norms - 1.0) > 1e-3).sum()),
+        "zero_vectors": int((norms == 0).sum()),
+        "non_finite_vectors": int((~finite).sum()),
+        "missing_content_hash": int((hashes == "").sum()),
+        "duplicate_content_hashes": int(len(duplicate_hashes)),
+        "vectors_with_duplicate_content": int(hash_counts[hash_counts > 1].sum()),
+        # Approximate: counted by row fingerprint, see above
+        "duplicate_vectors": int((vector_counts[vector_counts > 1] - 1).sum()),
+        "duplicate_content_ids": sorted(
+            vector_id for vector_id, h in zip(ids, hashes) if h in duplicate_hashes
+        )[:20],
+        "per_moon": {str(moon): int(count) for moon, count in zip(moons, moon_counts)},
+    }
+
+def print_summary(summary: Dict) -> None:
+    per_moon = summary.pop("per_moon")
+    for key, value in summary.items():
+        print(f"{key:>32}: {value}")
+    print(f"{'vectors per moon':>32}:")
+    for moon, count in sorted(per_moon.items(), key=lambda item: -item[1]):
+        print(f"{moon:>32}: {count}")
+
+def review_vectors(limit: Optional[int] = 20, batch_size: int = 100, workers: int = 8):
+    """Review vectors from the Pinecone index, one line per vector."""
+
+    index = pinecone_index(INDEX_NAME)
+
+    shown = 0
+    for batch in iter_vectors(index, NAMESPACE, batch_size, workers):
+        for vector_id, values, metadata in batch:
+            norm = float(np.linalg.norm(values)) if values else 0.0
+            print(f"{vector_id:<40} {str(metadata.get('moon_name')):<20} dims={len(values):<5} norm={norm:.4f}")
+            shown += 1
+            if limit and shown >= limit:
+                print(f"\n... showing the first {limit}; use --export and --summary to audit the namespace")
+                return
 
 if __name__ == "__main__":
-    review_vectors()
+    parser = argparse.ArgumentParser(description=f"Inspect or export the vectors in the '{NAMESPACE}' namespace.")
+    parser.add_argument("--export", metavar="PATH", help="export every vector to PATH.npy + PATH.jsonl (or PATH.parquet)")
+    parser.add_argument("--format", choices=["npy", "parquet"], default="npy")
+    parser.add_argument("--summary", nargs="?", const=True, metavar="PATH",
+                        help="print health checks for the export at PATH, or for the new one with --export")
+    parser.add_argument("--limit", type=int, default=20, help="vectors to list without --export; 0 lists all")
+    parser.add_argument("--batch-size", type=int, default=100, help="vector IDs per fetch request")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent fetch requests")
+    args = parser.parse_args()
+
+    if args.export:
+        index = pinecone_index(INDEX_NAME)
+        rows = export_vectors(index, args.export, NAMESPACE, args.format, args.batch_size, args.workers)
+        print(f"Exported {rows} vectors from {NAMESPACE} to {args.export}")
+    if args.summary:
+        path = args.summary if isinstance(args.summary, str) else args.export
+        if not path:
+            parser.error("--summary needs a PATH unless it is combined with --export")
+        print_summary(summarize_export(*load_export(path)))
+    elif not args.export:
+        review_vectors(args.limit, args.batch_size, args.workers)
@@ -0,0 +1,115 @@
+import copy
+import csv
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MOONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jupiter_moons.tsv")
+
+
+def load_moon_names(file_path: str = DEFAULT_MOONS_PATH) -> List[str]:
+    """Read the distinct moon names from the ``Moon Name`` column of the TSV."""
+    with open(file_path, newline="", encoding="utf-8") as f:
+        names = [row["Moon Name"].strip() for row in csv.DictReader(f, delimiter="\t")]
+    return sorted({name for name in names if name})
+
+
+@dataclass
+class RouteDecision:
+    moons: List[str]
+    filter: Optional[dict]
+    k: int
+
+
+class MoonRouter:
+    """Detect the moons a question is about and narrow the search to them.
+
+    All names are compiled into one case-insensitive alternation, longest
+    first so "S/2003 J 19" wins over "S/2003 J 1", with word boundaries so
+    "Io" does not match inside "bio". Analysing a question is a single regex
+    scan. A question naming moons searches only their vectors with
+    ``k_per_moon`` results each (capped at ``max_k``); any other question
+    keeps the unfiltered top ``default_k``.
+    """
+
+    def __init__(self, moon_names: Iterable[str], default_k: int = 4, k_per_moon: int = 2, max_k: int = 6):
+        self.default_k = default_k
+        self.k_per_moon = k_per_moon
+        self.max_k = max_k
+        self._canonical = {name.lower(): name for name in moon_names}
+        alternation = "|".join(re.escape(name) for name in sorted(self._canonical, key=len, reverse=True))
+        self._pattern = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE) if alternation else None
+
+    @classmethod
+    def from_tsv(cls, file_path: str = DEFAULT_MOONS_PATH, **kwargs) -> "MoonRouter":
+        return cls(load_moon_names(file_path), **kwargs)
+
+    def scaled(self, factor: int) -> "MoonRouter":
+        """A copy with every k multiplied by ``factor``, for over-fetching candidates."""
+        router = copy.copy(self)
+        router.default_k *= factor
+        router.k_per_moon *= factor
+        router.max_k *= factor
+        return router
+
+    def detect(self, question: str) -> List[str]:
+        """Moons named in the question, in order of first mention."""
+        if self._pattern is None:
+            return []
+        found = (self._canonical[match.group(0).lower()] for match in self._pattern.finditer(question))
+        return list(dict.fromkeys(found))
+
+    def route(self, question: str) -> RouteDecision:
+        moons = self.detect(question)
+        if not moons:
+            return RouteDecision(moons=[], filter=None, k=self.default_k)
+        condition = moons[0] if len(moons) == 1 else {"$in": moons}
+        return RouteDecision(
+            moons=moons,
+            filter={"moon_name": condition},
+            k=min(self.max_k, self.k_per_moon * len(moons))
+        )
+
+
+class RoutedRetriever(BaseRetriever):
+    """Retriever that applies MoonRouter's filter and k before searching.
+
+    Works with any vector store that accepts Pinecone-style metadata filters
+    (Pinecone itself and LocalVectorStore). If a filtered search comes back
+    empty, e.g. for a moon that is not indexed yet, it falls back to the
+    unfiltered search.
+    """
+
+    vector_store: VectorStore
+    router: MoonRouter
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        decision = self.router.route(query)
+        if decision.filter is not None:
+            documents = self.vector_store.similarity_search(query, k=decision.k, filter=decision.filter)
+            if documents:
+                return documents
+            logger.info(f"No vectors for {decision.moons}, searching every moon")
+        return self.vector_store.similarity_search(query, k=self.router.default_k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        decision = self.router.route(query)
+        if decision.filter is not None:
+            documents = await self.vector_store.asimilarity_search(query, k=decision.k, filter=decision.filter)
+            if documents:
+                return documents
+            logger.info(f"No vectors for {decision.moons}, searching every moon")
+        return await self.vector_store.asimilarity_search(query, k=self.router.default_k)
@@ -0,0 +1,264 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+DEFAULT_ANSWER_CACHE_PATH = os.getenv(
+    "SEMANTIC_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "answer_cache.sqlite")
+)
+
+@dataclass
+class CacheEntry:
+    question: str
+    value: Any
+    created_at: float
+    scope: Any = None
+
+
+class SemanticCache:
+    """Answer cache keyed on question embeddings.
+
+    A lookup returns the stored value of the most similar cached question when
+    the cosine similarity reaches ``threshold``. Entries expire after
+    ``ttl_seconds`` and the least recently used entry is evicted once
+    ``max_size`` is reached. Vectors live in one preallocated float32 matrix so
+    a lookup is a single matrix-vector product over every slot.
+
+    Questions that differ only in a name embed almost identically, so with
+    ``scope`` set a hit must also have the same ``scope(question)`` as the
+    question being looked up (e.g. the moons it names).
+    """
+
+    def __init__(self, threshold: float = 0.95, max_size: int = 1000, ttl_seconds: float = 3600,
+                 scope: Optional[Callable[[str], Any]] = None):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.scope = scope
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._free_slots: List[int] = list(range(max_size - 1, -1, -1))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _normalize(self, vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _evict(self, slot: int) -> None:
+        del self._entries[slot]
+        self._vectors[slot] = 0.0
+        self._free_slots.append(slot)
+
+    def _is_expired(self, entry: CacheEntry, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _scope(self, question: Optional[str]) -> Any:
+        return self.scope(question) if self.scope is not None and question is not None else None
+
+    def lookup(self, vector, question: Optional[str] = None) -> Optional[Any]:
+        """Return the cached value for the closest question in the same scope, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        scope = self._scope(question)
+        with self._lock:
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            # Free slots hold zero vectors, so they can never clear a positive threshold
+            similarities = self._vectors @ self._normalize(vector)
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            entry = None
+            for slot in candidates[np.argsort(-similarities[candidates])]:
+                slot = int(slot)
+                if slot in self._entries and self._entries[slot].scope == scope:
+                    entry = self._entries[slot]
+                    break
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if self._is_expired(entry, time.monotonic()):
+                self._evict(slot)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return entry.value
+
+    def store(self, question: str, vector, value: Any, age: float = 0.0) -> None:
+        """Cache ``value`` under the question's vector; ``age`` counts towards its TTL."""
+        if not self.enabled:
+            return
+
+        vector = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+            now = time.monotonic()
+            for slot, entry in list(self._entries.items()):
+                if self._is_expired(entry, now):
+                    self._evict(slot)
+
+            if not self._free_slots:
+                oldest = next(iter(self._entries))
+                self._evict(oldest)
+                self.evictions += 1
+
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._entries[slot] = CacheEntry(question=question, value=value, created_at=now - age,
+                                             scope=self._scope(question))
+
+    def clear(self) -> int:
+        """Drop every entry, e.g. after the index is rebuilt. Returns how many were dropped."""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._free_slots = list(range(self.max_size - 1, -1, -1))
+            if self._vectors is not None:
+                self._vectors[:] = 0.0
+            return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "scoped": self.scope is not None,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SQLiteSemanticCache:
+    """SemanticCache shared by every worker process through a SQLite file.
+
+    Answers are written to the file and each process mirrors them into its
+    own in-memory SemanticCache, so a lookup is still one matrix-vector
+    product. Before every lookup the rows added since the last one are
+    pulled in, which is a single indexed query. ``clear`` bumps a
+    generation number that tells the other processes to drop their mirror.
+    Values are stored as text with ``dumps`` and rebuilt with ``loads``.
+    """
+
+    def __init__(self, path: str = DEFAULT_ANSWER_CACHE_PATH, threshold: float = 0.95, max_size: int = 1000,
+                 ttl_seconds: float = 3600, scope: Optional[Callable[[str], Any]] = None,
+                 dumps: Callable[[Any], str] = json.dumps, loads: Callable[[str], Any] = json.loads):
+        self.path = path
+        self.dumps = dumps
+        self.loads = loads
+        self._local = SemanticCache(threshold=threshold, max_size=max_size, ttl_seconds=ttl_seconds, scope=scope)
+        self._last_id = 0
+        self._generation = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Workers write at the same time; wait for the lock rather than fail
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # AUTOINCREMENT so ids are never reused and "id > last seen" stays correct
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " question TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0)")
+        self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self._local.enabled
+
+    def _sync(self) -> None:
+        """Pull answers stored by any process since the last sync into the local mirror."""
+        with self._lock:
+            generation = self._conn.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+            if generation != self._generation:
+                self._local.clear()
+                self._last_id = 0
+                self._generation = generation
+            rows = self._conn.execute(
+                "SELECT id, question, vector, value, created_at FROM answers WHERE id > ? ORDER BY id",
+                (self._last_id,)
+            ).fetchall()
+
+        now = time.time()
+        for row_id, question, blob, value, created_at in rows:
+            self._last_id = row_id
+            age = now - created_at
+            if self._local.ttl_seconds > 0 and age > self._local.ttl_seconds:
+                continue
+            self._local.store(question, np.frombuffer(blob, dtype=np.float32), self.loads(value), age=age)
+
+    def lookup(self, vector, question: Optional[str] = None) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        self._sync()
+        return self._local.lookup(vector, question)
+
+    def store(self, question: str, vector, value: Any) -> None:
+        if not self.enabled:
+            return
+
+        vector = np.asarray(vector, dtype=np.float32)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (question, vector, value, created_at) VALUES (?, ?, ?, ?)",
+                (question, vector.tobytes(), self.dumps(value), now)
+            )
+            # Keep the file to the newest max_size answers that have not expired
+            self._conn.execute(
+                "DELETE FROM answers WHERE id <= (SELECT MAX(id) FROM answers) - ? OR created_at < ?",
+                (self._local.max_size, now - self._local.ttl_seconds if self._local.ttl_seconds > 0 else 0)
+            )
+            self._conn.commit()
+        # Picked up into the local mirror, like everyone else's, on the next lookup
+
+    def clear(self) -> int:
+        """Drop every entry in every process. Returns how many were dropped."""
+        with self._lock:
+            dropped = self._conn.execute("DELETE FROM answers").rowcount
+            self._conn.execute("UPDATE generation SET value = value + 1 WHERE id = 0")
+            self._conn.commit()
+        self._sync()
+        return dropped
+
+    def stats(self) -> dict:
+        # Hits and misses are this process's; size is the shared file's
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {**self._local.stats(), "backend": "sqlite", "path": self.path, "size": size}
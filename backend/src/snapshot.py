@@ -0,0 +1,241 @@
+from dotenv import load_dotenv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+import numpy as np
+from backoff import retry_with_backoff
+from clients import pinecone_client, pinecone_index
+from review_vectors import INDEX_NAME, NAMESPACE, NpyWriter, iter_vectors
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+SNAPSHOT_FORMAT = 1
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# PineconeVectorStore keeps the chunk text in this metadata field
+TEXT_KEY = "text"
+
+def file_checksum(npy_path: str) -> str:
+    """SHA-256 of the raw float32 data of a .npy file, header excluded."""
+    digest = hashlib.sha256()
+    with open(npy_path, "rb") as f:
+        f.seek(np.load(npy_path, mmap_mode="r").offset)
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return f"sha256:{digest.hexdigest()}"
+
+def dump_namespace(index, path: str, namespace: str = NAMESPACE, model_name: str = EMBEDDING_MODEL,
+                   batch_size: int = 100, workers: int = 8) -> Dict:
+    """Write every vector in the namespace to a snapshot.
+
+    ``<path>.npy`` holds the float32 matrix and ``<path>.json`` the ids,
+    texts, metadata, embedding model and a checksum of the matrix. This is
+    the layout LocalVectorStore reads, so a snapshot can also be served
+    directly with VECTOR_BACKEND=local and LOCAL_INDEX_PATH=<path>. Vectors
+    are streamed to disk as they are fetched, and a failed dump leaves no
+    snapshot behind.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    ids, texts, metadatas = [], [], []
+    writer = NpyWriter(path, records=False)
+    try:
+        for batch in iter_vectors(index, namespace, batch_size, workers):
+            writer.write(batch)
+            for vector_id, _, metadata in batch:
+                ids.append(vector_id)
+                texts.append(metadata.pop(TEXT_KEY, ""))
+                metadatas.append(metadata)
+    except BaseException:
+        writer.discard()
+        raise
+    writer.close()
+
+    sidecar = {
+        "format": SNAPSHOT_FORMAT,
+        "model": model_name,
+        "dimension": writer.dimension or 0,
+        "count": len(ids),
+        "checksum": file_checksum(f"{path}.npy"),
+        "index_name": INDEX_NAME,
+        "namespace": namespace,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "ids": ids,
+        "texts": texts,
+        "metadatas": metadatas,
+    }
+    with open(f"{path}.json.partial", "w") as f:
+        json.dump(sidecar, f)
+    os.replace(f"{path}.json.partial", f"{path}.json")
+    return sidecar
+
+def load_snapshot(path: str, verify: bool = True):
+    """Return ``(matrix, sidecar)``; the matrix is memory-mapped.
+
+    Raises ValueError when the row count or the checksum does not match the
+    sidecar. Indexes saved by ``vector_store.py --backend local`` carry no
+    checksum and are accepted with a warning.
+    """
+    with open(f"{path}.json") as f:
+        sidecar = json.load(f)
+    matrix = np.load(f"{path}.npy", mmap_mode="r")
+    if matrix.shape[0] != len(sidecar["ids"]):
+        raise ValueError(f"Snapshot {path} is inconsistent: {matrix.shape[0]} vectors but {len(sidecar['ids'])} ids")
+    if verify:
+        if sidecar.get("checksum"):
+            checksum = file_checksum(f"{path}.npy")
+            if checksum != sidecar["checksum"]:
+                raise ValueError(f"Snapshot {path} is corrupt: checksum {checksum}, expected {sidecar['checksum']}")
+        else:
+            logger.warning(f"Snapshot {path} has no checksum, restoring unverified")
+    return matrix, sidecar
+
+def poll_until(condition: Callable[[], bool], timeout: float) -> bool:
+    """Call ``condition`` with backoff until it holds; False on timeout.
+
+    Pinecone applies writes a little after acknowledging them; polling
+    replaces a fixed sleep that is either too long or not long enough.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.5
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 10.0)
+    return True
+
+def wait_for_index_ready(pc, index_name: str = INDEX_NAME, timeout: float = 300.0) -> None:
+    """Block until Pinecone reports the index as ready to serve."""
+    if not poll_until(lambda: pc.describe_index(index_name).status["ready"], timeout):
+        raise TimeoutError(f"Index {index_name} not ready after {timeout:.0f}s")
+
+def vector_count(index, namespace: str) -> int:
+    namespaces = index.describe_index_stats()["namespaces"]
+    return namespaces.get(namespace, {}).get("vector_count", 0)
+
+def wait_for_vector_count(index, namespace: str, expected: int, timeout: float = 300.0) -> None:
+    """Poll the namespace until it reports exactly ``expected`` vectors.
+
+    Only meaningful when nothing else writes to the namespace, e.g. waiting
+    for 0 after ``delete_all`` or for a restore into an emptied namespace.
+    Upserts that overwrite existing ids leave the count unchanged; use
+    wait_for_vectors for those.
+    """
+    if not poll_until(lambda: vector_count(index, namespace) == expected, timeout):
+        raise TimeoutError(f"Namespace {namespace} shows {vector_count(index, namespace)} vectors, "
+                           f"expected {expected} after {timeout:.0f}s")
+
+def wait_for_vectors(index, namespace: str, expected: Dict[str, Dict], timeout: float = 300.0) -> None:
+    """Poll until every id in ``expected`` can be fetched with that metadata.
+
+    Callers pass their last upserted batch, mapping ids to (a subset of) the
+    metadata they wrote. Unlike the namespace count this also confirms upserts that
+    overwrite vectors already present, as in a rerun or a restore into a
+    populated namespace.
+    """
+    def visible() -> bool:
+        fetched = index.fetch(ids=list(expected), namespace=namespace).vectors
+        return all(
+            vector_id in fetched
+            and all((fetched[vector_id].metadata or {}).get(key) == value for key, value in metadata.items())
+            for vector_id, metadata in expected.items()
+        )
+
+    if not poll_until(visible, timeout):
+        raise TimeoutError(f"Upserts to namespace {namespace} not visible after {timeout:.0f}s")
+
+def restore_snapshot(index, path: str, namespace: str = NAMESPACE, batch_size: int = 100, workers: int = 4,
+                     replace: bool = False, expected_model: Optional[str] = EMBEDDING_MODEL,
+                     timeout: float = 300.0) -> int:
+    """Upsert a snapshot into a namespace without calling the embedding API.
+
+    The checksum is verified first, and a snapshot built with another
+    embedding model is refused because its vectors would not match query
+    embeddings. With ``replace`` the namespace is emptied first, and upserts
+    only start once the deletion has been applied. Batches are upserted by a
+    thread pool, then this waits until the restored vectors are visible:
+    an emptied namespace must report exactly the snapshot's count, otherwise
+    the last batch is fetched back. Returns the number of vectors restored.
+    """
+    matrix, sidecar = load_snapshot(path)
+    if expected_model and sidecar.get("model") and sidecar["model"] != expected_model:
+        raise ValueError(f"Snapshot {path} was built with {sidecar['model']}, expected {expected_model}")
+
+    if replace:
+        # delete_all is applied asynchronously and would also remove vectors upserted before it lands
+        index.delete(delete_all=True, namespace=namespace)
+        wait_for_vector_count(index, namespace, 0, timeout)
+
+    def metadata(i: int) -> Dict:
+        return {**sidecar["metadatas"][i], TEXT_KEY: sidecar["texts"][i]}
+
+    def upsert(start: int) -> int:
+        end = min(start + batch_size, len(sidecar["ids"]))
+        vectors = [{
+            "id": sidecar["ids"][i],
+            "values": matrix[i].tolist(),
+            "metadata": metadata(i)
+        } for i in range(start, end)]
+        retry_with_backoff(lambda: index.upsert(vectors=vectors, namespace=namespace))
+        return end - start
+
+    restored = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for start in range(0, len(sidecar["ids"]), batch_size):
+            pending.add(executor.submit(upsert, start))
+            # Keep only a few batches of vectors materialised at a time
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                restored += sum(future.result() for future in done)
+        restored += sum(future.result() for future in pending)
+
+    if replace:
+        wait_for_vector_count(index, namespace, restored, timeout)
+    elif restored:
+        last_batch = range(max(restored - batch_size, 0), restored)
+        wait_for_vectors(index, namespace, {sidecar["ids"][i]: metadata(i) for i in last_batch}, timeout)
+    return restored
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Snapshot and restore the '{INDEX_NAME}' index without re-embedding.")
+    parser.add_argument("--namespace", default=NAMESPACE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    dump = commands.add_parser("dump", help="write the namespace to PATH.npy + PATH.json")
+    dump.add_argument("path")
+    dump.add_argument("--workers", type=int, default=8, help="concurrent fetch requests")
+    restore = commands.add_parser("restore", help="upsert a snapshot into the namespace")
+    restore.add_argument("path")
+    restore.add_argument("--replace", action="store_true", help="delete everything in the namespace first")
+    restore.add_argument("--workers", type=int, default=4, help="concurrent upsert requests")
+    restore.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for the index to catch up")
+    verify = commands.add_parser("verify", help="check a snapshot's checksum")
+    verify.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        _, sidecar = load_snapshot(args.path)
+        print(f"OK: {sidecar['count']} vectors, {sidecar['dimension']} dims, model {sidecar['model']}")
+    else:
+        wait_for_index_ready(pinecone_client())
+        index = pinecone_index(INDEX_NAME)
+        start = time.perf_counter()
+        if args.command == "dump":
+            sidecar = dump_namespace(index, args.path, args.namespace, workers=args.workers)
+            print(f"Dumped {sidecar['count']} vectors from {args.namespace} to {args.path} "
+                  f"in {time.perf_counter() - start:.1f}s ({sidecar['checksum']})")
+        else:
+            restored = restore_snapshot(index, args.path, args.namespace, workers=args.workers,
+                                        replace=args.replace, timeout=args.timeout)
+            print(f"Restored {restored} vectors into {args.namespace} in {time.perf_counter() - start:.1f}s")
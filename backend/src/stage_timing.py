@@ -0,0 +1,147 @@
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+from .metrics import ChatMetrics
+
+
+class StageTimingHandler(BaseCallbackHandler):
+    """LangChain callback that times the retrieval, prompt and LLM stages of a chain.
+
+    Pass it in the run config (``config={"callbacks": [handler]}``); one
+    instance serves every request because state is keyed on run_id.
+    ``run_inline`` keeps the callbacks on the event loop instead of
+    dispatching each one to a thread pool, which matters at this call rate.
+    """
+
+    run_inline = True
+
+    def __init__(self, metrics: ChatMetrics):
+        self.metrics = metrics
+        self._started: Dict[UUID, Tuple[str, float]] = {}
+        self._inner_retrievers: Set[UUID] = set()
+        self._streamed_tokens: Dict[UUID, int] = {}
+
+    def _start(self, run_id: UUID, stage: str) -> None:
+        self._started[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id: UUID, error: bool = False) -> None:
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        stage, start = started
+        self.metrics.stage_latency.observe(time.perf_counter() - start, stage)
+        if error:
+            self.metrics.stage_errors.inc(stage)
+
+    def on_retriever_start(self, serialized, query, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                           **kwargs: Any) -> None:
+        # A retriever wrapped by another one, at any depth, is part of the outer "retrieve" span
+        if parent_run_id in self._inner_retrievers or self._started.get(parent_run_id, ("",))[0] == "retrieve":
+            self._inner_retrievers.add(run_id)
+        else:
+            self._start(run_id, "retrieve")
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs: Any) -> None:
+        self._inner_retrievers.discard(run_id)
+        if run_id in self._started:
+            self.metrics.retrieved_documents.observe(len(documents))
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._inner_retrievers.discard(run_id)
+        self._end(run_id, error=True)
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        # Sent by RerankingRetriever; reranking runs inside the "retrieve" span
+        # and is also reported as a stage of its own
+        if name != "rerank":
+            return
+        self.metrics.reranked_documents.observe(data["k"])
+        if data["cached"]:
+            self.metrics.rerank_cache_hits.inc()
+            return
+        self.metrics.rerank_candidates.observe(data["candidates"])
+        self.metrics.stage_latency.observe(data["seconds"], "rerank")
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, **kwargs: Any) -> None:
+        # Prompt templates report through the chain callbacks with run_type="prompt"
+        if kwargs.get("run_type") == "prompt":
+            self._start(run_id, "prompt")
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "llm")
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._streamed_tokens[run_id] = self._streamed_tokens.get(run_id, 0) + 1
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        streamed = self._streamed_tokens.pop(run_id, 0)
+        prompt_tokens, completion_tokens = _token_usage(response)
+        self.metrics.llm_tokens.inc("prompt", amount=prompt_tokens)
+        # Streamed responses usually carry no usage block; count the chunks instead
+        self.metrics.llm_tokens.inc("completion", amount=completion_tokens or streamed)
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        self._streamed_tokens.pop(run_id, None)
+        self._end(run_id, error=True)
+
+
+def _token_usage(response) -> Tuple[int, int]:
+    """Read prompt and completion token counts from an LLMResult."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+    return 0, 0
+
+
+class TimedEmbeddings(Embeddings):
+    """Records the "embed" stage around every query embedding."""
+
+    def __init__(self, underlying: Embeddings, metrics: ChatMetrics):
+        self.underlying = underlying
+        self.metrics = metrics
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        try:
+            return self.underlying.embed_query(text)
+        finally:
+            self.metrics.stage_latency.observe(time.perf_counter() - start, "embed")
+
+    async def aembed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        try:
+            return await self.underlying.aembed_query(text)
+        finally:
+            self.metrics.stage_latency.observe(time.perf_counter() - start, "embed")
+
+    def __getattr__(self, name: str):
+        # Expose stats() and friends of the wrapped embeddings
+        if name == "underlying":
+            raise AttributeError(name)
+        return getattr(self.underlying, name)
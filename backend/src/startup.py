@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentState:
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "pending"
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "seconds": round(self.seconds, 3) if self.seconds is not None else None,
+        }
+
+
+class Warmup:
+    """Initialise server components in the background and track their state.
+
+    ``run`` calls a blocking initialiser in a worker thread, so the event loop
+    keeps answering liveness probes while clients are created and heavy
+    modules are imported. Failures are retried with capped exponential
+    backoff and full jitter until they succeed or the task is cancelled;
+    meanwhile the component reports "retrying" with the last error.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.started = time.perf_counter()
+        self.components: Dict[str, ComponentState] = {}
+
+    def register(self, *names: str) -> None:
+        for name in names:
+            self.components.setdefault(name, ComponentState(name))
+
+    def disable(self, name: str, reason: str) -> None:
+        self.register(name)
+        self.components[name].status = "disabled"
+        self.components[name].error = reason
+
+    async def run(self, name: str, init: Callable[[], Any]) -> Any:
+        self.register(name)
+        state = self.components[name]
+        while True:
+            state.attempts += 1
+            try:
+                value = await asyncio.to_thread(init)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (state.attempts - 1)))
+                state.status = "retrying"
+                state.error = str(e)
+                logger.error(f"Initialising {name} failed (attempt {state.attempts}), retrying in {delay:.1f}s: {str(e)}")
+                await asyncio.sleep(delay)
+                continue
+            state.status = "ready"
+            state.error = None
+            state.seconds = time.perf_counter() - self.started
+            logger.info(f"{name} ready after {state.seconds:.2f}s")
+            return value
+
+    def is_ready(self, *names: str) -> bool:
+        return all(name in self.components and self.components[name].status == "ready" for name in names)
+
+    def stats(self) -> dict:
+        return {name: state.as_dict() for name, state in self.components.items()}
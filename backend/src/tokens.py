@@ -0,0 +1,58 @@
+import logging
+import os
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Tokenizer shared by text-embedding-ada-002 and GPT-4
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _load_encoding():
+    # Imported here so the API does not pay for tiktoken at start-up. tiktoken
+    # downloads the BPE file on first use; remember a failure rather than
+    # retrying the download on every count
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(ENCODING_NAME), None
+    except Exception as e:
+        logger.warning(f"Could not load {ENCODING_NAME} tokenizer: {str(e)}")
+        return None, e
+
+
+def has_encoding() -> bool:
+    return _load_encoding()[0] is not None
+
+
+def _estimate(text: str) -> int:
+    # Roughly four characters per token for English text
+    return (len(text) + 3) // 4
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens exactly, the way the embedding model and GPT-4 will.
+
+    Chunk boundaries, and with them content hashes and chunk IDs, follow these
+    counts, so a length estimate would re-chunk the corpus and no longer match
+    the ingested index. Without the tokenizer this raises RuntimeError unless
+    TOKENIZER_FALLBACK=estimate allows the estimate.
+    """
+    encoding, error = _load_encoding()
+    if encoding is None:
+        if os.getenv("TOKENIZER_FALLBACK", "").lower() != "estimate":
+            raise RuntimeError(
+                f"Could not load the {ENCODING_NAME} tokenizer: {str(error)}. On offline hosts, download it once "
+                f"and point TIKTOKEN_CACHE_DIR at it"
+            ) from error
+        return _estimate(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def estimate_tokens(text: str) -> int:
+    """count_tokens where an approximation will do (prompt budgets, rate-limit
+    reservations, logs); falls back to the length estimate and never raises."""
+    encoding, _ = _load_encoding()
+    if encoding is None:
+        return _estimate(text)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -1,10 +1,11 @@
 from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
 from dotenv import load_dotenv
-import os
-import time
+import argparse
 from chunk import read_moons_data, create_moon_chunks, chunk_for_embedding
 from main import create_embeddings
+from clients import pinecone_client, pinecone_index
+from local_index import LocalVectorStore, DEFAULT_INDEX_PATH
+from snapshot import wait_for_index_ready, wait_for_vectors
 
 # Load environment variables
 load_dotenv()
@@ -13,7 +14,7 @@ def create_vector_store():
     """Create and populate Pinecone vector store with Jupiter moons data."""
     
     # Initialize Pinecone
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    pc = pinecone_client()
     
     # Configuration
     INDEX_NAME = "jupitermoons-2"
@@ -27,24 +28,68 @@ def create_vector_store():
     moon_chunks = create_moon_chunks(df)
     final_chunks = chunk_for_embedding(moon_chunks)
     
+    wait_for_index_ready(pc, INDEX_NAME)
+    
     # Create vector store from documents
-    docsearch = PineconeVectorStore.from_texts(
+    index = pinecone_index(INDEX_NAME)
+    docsearch = PineconeVectorStore(index=index, embedding=embeddings, namespace=NAMESPACE)
+    ids = [chunk["id"] for chunk in final_chunks]
+    metadatas = [{
+        "moon_name": chunk["metadata"]["moon_name"],
+        "source_url": chunk["source_url"],
+        "content_hash": chunk["metadata"]["content_hash"]
+    } for chunk in final_chunks]
+    docsearch.add_texts(
         texts=[chunk["text"] for chunk in final_chunks],
-        embedding=embeddings,
-        index_name=INDEX_NAME,
-        namespace=NAMESPACE,
-        metadatas=[{
-            "moon_name": chunk["metadata"]["moon_name"],
-            "source_url": chunk["source_url"]
-        } for chunk in final_chunks]
+        ids=ids,
+        metadatas=metadatas
     )
     
-    time.sleep(5)
+    # Wait until the last batch is visible rather than sleeping. A rerun overwrites the same
+    # chunk ids, so the namespace's vector count would not show when the upserts have landed
+    wait_for_vectors(index, NAMESPACE, dict(zip(ids[-32:], metadatas[-32:])))
     
     # Print index statistics
     print("Index after upsert:")
-    print(pc.Index(INDEX_NAME).describe_index_stats())
+    print(index.describe_index_stats())
     print("\n")
 
+def create_local_vector_store(path: str = DEFAULT_INDEX_PATH):
+    """Build the in-process NumPy index from the same chunks and save it to disk."""
+    
+    # Create embeddings object
+    embeddings = create_embeddings()
+    
+    # Process moon data
+    df = read_moons_data('jupiter_moons.tsv')
+    moon_chunks = create_moon_chunks(df)
+    final_chunks = chunk_for_embedding(moon_chunks)
+    
+    store = LocalVectorStore.from_texts(
+        texts=[chunk["text"] for chunk in final_chunks],
+        embedding=embeddings,
+        ids=[chunk["id"] for chunk in final_chunks],
+        metadatas=[{
+            "moon_name": chunk["metadata"]["moon_name"],
+            "source_url": chunk["source_url"],
+            "content_hash": chunk["metadata"]["content_hash"]
+        } for chunk in final_chunks]
+    )
+    store.save(path)
+    
+    print(f"Saved local index with {len(store)} vectors to {path}.npy / {path}.json")
+
 if __name__ == "__main__":
-    create_vector_store()
+    parser = argparse.ArgumentParser(description="Create and populate the vector store with Jupiter moons data.")
+    parser.add_argument(
+        "--backend",
+        choices=["pinecone", "local"],
+        default="pinecone",
+        help="where to build the index; 'local' writes the NumPy index read when VECTOR_BACKEND=local"
+    )
+    args = parser.parse_args()
+    
+    if args.backend == "local":
+        create_local_vector_store()
+    else:
+        create_vector_store()
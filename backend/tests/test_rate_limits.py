@@ -0,0 +1,101 @@
+"""/chat under the chat model's rate limit keeps its latency SLO.
+
+The API runs in-process with its chain calling a real ChatOpenAI pointed at
+``benchmarks.fake_openai``, which enforces a small requests- and
+tokens-per-minute quota. A burst larger than the quota can serve within the
+SLO must be split into answers that arrive within it and requests shed
+straight away with a 503 and Retry-After.
+
+Run from the backend directory (needs uvicorn):
+
+    python -m pytest tests
+"""
+import asyncio
+import signal
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from benchmarks.bench_rate_limits import start_fake_openai, wait_until_up
+from benchmarks.bench_workers import free_port
+
+SLO_SECONDS = 3.0
+REQUESTS = 40
+CONCURRENCY = 20
+QUOTA = SimpleNamespace(rpm=60, tpm=40000, upstream_latency=0.2)
+
+
+@pytest.fixture(scope="module")
+def fake_openai():
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    upstream = start_fake_openai(port, QUOTA)
+    try:
+        wait_until_up(base_url)
+        yield base_url
+    finally:
+        upstream.send_signal(signal.SIGTERM)
+        upstream.wait(timeout=30)
+
+
+@pytest.fixture(scope="module")
+def api(fake_openai):
+    with pytest.MonkeyPatch.context() as env:
+        for name, value in {
+            "UPSTREAM_RATE_LIMITING": "on",
+            "CHAT_LATENCY_SLO_SECONDS": str(SLO_SECONDS),
+            "OPENAI_CHAT_RPM": str(QUOTA.rpm),
+            "OPENAI_CHAT_TPM": str(QUOTA.tpm),
+            "OPENAI_MAX_RETRIES": "2",
+            # Every question must reach the model
+            "SEMANTIC_CACHE_MAX_SIZE": "0",
+            "CHAT_COALESCING": "off",
+            "CHAT_MAX_CONCURRENCY": str(CONCURRENCY),
+            "CHAT_MAX_QUEUE": str(REQUESTS),
+        }.items():
+            env.setenv(name, value)
+
+        from src.clients import CHAT_MODEL, chat_model
+
+        from benchmarks.fakes import install_fake_chain
+
+        llm = chat_model(model_name=CHAT_MODEL, base_url=f"{fake_openai}/v1", api_key="fake")
+        yield install_fake_chain(retriever_latency=0.01, llm=llm)
+
+
+def send_burst(api) -> list:
+    """``(status, headers, seconds)`` for each of REQUESTS questions, CONCURRENCY at a time."""
+    async def burst():
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            async def one(i: int):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/chat", json={"question": f"How big is Ganymede? ({i})"})
+                    return response.status_code, response.headers, time.perf_counter() - start
+
+            return await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+
+    return asyncio.run(burst())
+
+
+def test_burst_is_answered_within_slo_or_shed(api, fake_openai):
+    results = send_burst(api)
+
+    answered = [seconds for status, _, seconds in results if status == 200]
+    shed = [(headers, seconds) for status, headers, seconds in results if status == 503]
+    assert len(answered) + len(shed) == REQUESTS, [status for status, _, _ in results]
+    assert answered, "no request was answered"
+    assert shed, "the burst exceeds the quota, so some requests must be shed"
+
+    assert max(answered) < SLO_SECONDS
+    for headers, seconds in shed:
+        assert int(headers["retry-after"]) >= 1
+        # Shed at admission or when the call is due, never after waiting out the SLO
+        assert seconds < SLO_SECONDS
+
+    # Pacing kept every call inside the quota rather than relying on 429s and retries
+    assert httpx.get(f"{fake_openai}/stats").json()["throttled"] == 0
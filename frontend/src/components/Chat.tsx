@@ -1,7 +1,7 @@
 'use client'
 import React, { useState, useRef } from 'react'
 import { Message } from '../types/chat'
-import { sendMessage } from '../lib/api'
+import { streamMessage } from '../lib/api'
 import axios from 'axios'
 
 export default function Chat() {
@@ -10,6 +10,8 @@ export default function Chat() {
     content: "JUPITER MOONS DATABASE ACCESSED. READY FOR QUERIES.",
   }])
   const [input, setInput] = useState('')
+  // Set from the first answer; the server keeps the history for this session
+  const [sessionId, setSessionId] = useState<string | undefined>()
   const [loading, setLoading] = useState(false)
   const messagesEndRef = useRef<HTMLDivElement>(null)
 
@@ -23,27 +25,38 @@ export default function Chat() {
       setMessages(prev => [...prev, userMessage])
       setInput('')
 
-      const response = await sendMessage(input, messages)
-      
+      // Render the answer as it streams in, then settle on the final payload
+      setMessages(prev => [...prev, { role: 'assistant', content: '' }])
+      const updateLast = (update: (message: Message) => Message) =>
+        setMessages(prev => [...prev.slice(0, -1), update(prev[prev.length - 1])])
+
+      const response = await streamMessage(input, sessionId, {
+        onToken: token => updateLast(message => ({ ...message, content: message.content + token }))
+      })
+      if (response.session_id) setSessionId(response.session_id)
+
       const botMessage: Message = {
         role: 'assistant',
         content: response.answer,
         metadata: { context_used: !!response.context }
       }
       
-      setMessages(prev => [...prev, botMessage])
+      updateLast(() => botMessage)
     } catch (error) {
       console.error('Error:', error)
 
       let errorMessage = "ERROR: Connection to Jupiter database failed. Please retry."
       if (axios.isAxiosError(error) && error.response) {
         errorMessage = `ERROR: ${error.response.data.detail || errorMessage}`
+      } else if (error instanceof Error) {
+        errorMessage = `ERROR: ${error.message}`
       }
 
-      setMessages(prev => [...prev, {
-        role: 'assistant',
-        content: errorMessage,
-      }])
+      // Replace the partially streamed answer, if any, with the error
+      setMessages(prev => [
+        ...prev.filter((message, i) => !(i === prev.length - 1 && message.role === 'assistant')),
+        { role: 'assistant', content: errorMessage }
+      ])
     } finally {
       setLoading(false)
     }
@@ -1,8 +1,10 @@
 import axios, { AxiosError } from 'axios';
-import { Message, ChatRequest, ChatResponse } from '../types/chat';
+import { ChatRequest, ChatResponse, StreamHandlers } from '../types/chat';
+
+const API_BASE_URL = 'https://jupiteratlas.onrender.com/';
 
 const api = axios.create({
-  baseURL: 'https://jupiteratlas.onrender.com/',
+  baseURL: API_BASE_URL,
   headers: {
     'Content-Type': 'application/json',
     'Accept': 'application/json'
@@ -20,14 +22,16 @@ api.interceptors.request.use(request => {
   return request;
 });
 
+// Only the new question is sent; the server holds the conversation under the
+// session_id returned with the previous answer.
 export const sendMessage = async (
   question: string,
-  messages: Message[]
+  sessionId?: string
 ): Promise<ChatResponse> => {
   try {
     const request: ChatRequest = {
       question,
-      messages,
+      session_id: sessionId,
     };
     
     // First try to check if the server is healthy
@@ -54,4 +58,76 @@ export const sendMessage = async (
     }
     throw error;
   }
+};
+
+// Streams the answer from /chat/stream as Server-Sent Events. Tokens are handed
+// to the callbacks as they arrive; the promise resolves with the full response
+// carried by the final "done" event. No overall timeout applies, so long answers
+// are not cut off the way they are with the 30s axios timeout on /chat.
+export const streamMessage = async (
+  question: string,
+  sessionId?: string,
+  handlers: StreamHandlers = {}
+): Promise<ChatResponse> => {
+  const request: ChatRequest = {
+    question,
+    session_id: sessionId,
+  };
+
+  const response = await fetch(new URL('chat/stream', API_BASE_URL), {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream'
+    },
+    body: JSON.stringify(request)
+  });
+
+  if (!response.ok || !response.body) {
+    let detail = response.statusText;
+    try {
+      detail = (await response.json()).detail || detail;
+    } catch {
+      // Non-JSON error body; keep the status text
+    }
+    throw new Error(`Connection failed: ${detail}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary: number;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+      const payload = JSON.parse(data);
+
+      if (event === 'context') {
+        handlers.onContext?.(payload.context);
+      } else if (event === 'token') {
+        handlers.onToken?.(payload.token);
+      } else if (event === 'done') {
+        return payload as ChatResponse;
+      } else if (event === 'error') {
+        throw new Error(payload.detail);
+      }
+    }
+  }
+
+  throw new Error('Connection closed before the answer was complete');
 };
\ No newline at end of file
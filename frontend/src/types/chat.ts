@@ -9,10 +9,18 @@ export interface Message {
 
 export interface ChatRequest {
     question: string;
-    messages: Message[];
+    // The server keeps the history; send back the session_id it returned
+    session_id?: string;
+    messages?: Message[];
 }
 
 export interface ChatResponse {
     answer: string;
     context?: string[];
+    session_id?: string;
+}
+
+export interface StreamHandlers {
+    onContext?: (context: string[]) => void;
+    onToken?: (token: string) => void;
 }
\ No newline at end of file